@@ -0,0 +1,126 @@
+'''
+Benchmark results, kept in a SQLite file so that runs from different
+commits and interpreters can be compared later.
+'''
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+SCHEMA_VERSION = 1
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    label TEXT,
+    git_commit TEXT,
+    python TEXT NOT NULL,
+    platform TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    benchmark TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_run ON samples (run);
+'''
+
+# benchmark -> its unit, and every sample
+Samples = Dict[str, Tuple[str, List[float]]]
+
+
+class Run(NamedTuple):
+    id: int
+    started: str
+    label: str | None
+    git_commit: str | None
+    python: str
+    platform: str
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    version = db.execute('PRAGMA user_version').fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        db.close()
+        raise ValueError(
+            f'{path} has results in format {version}, but this is format '
+            f'{SCHEMA_VERSION}',
+        )
+    with db:
+        db.executescript(SCHEMA)
+        db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return db
+
+
+def add_run(
+    db: sqlite3.Connection,
+    *,
+    started: str,
+    label: str | None,
+    git_commit: str | None,
+    python: str,
+    platform: str,
+) -> int:
+    with db:
+        cursor = db.execute(
+            'INSERT INTO runs (started, label, git_commit, python, platform) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (started, label, git_commit, python, platform),
+        )
+    assert cursor.lastrowid is not None
+    return cursor.lastrowid
+
+
+def add_samples(
+    db: sqlite3.Connection,
+    run: int,
+    benchmark: str,
+    unit: str,
+    values: Iterable[float],
+) -> None:
+    with db:
+        db.executemany(
+            'INSERT INTO samples (run, benchmark, unit, value) '
+            'VALUES (?, ?, ?, ?)',
+            [(run, benchmark, unit, value) for value in values],
+        )
+
+
+def runs(db: sqlite3.Connection) -> list[Run]:
+    rows = db.execute(
+        'SELECT id, started, label, git_commit, python, platform '
+        'FROM runs ORDER BY id',
+    )
+    return [Run(*row) for row in rows]
+
+
+def find_run(db: sqlite3.Connection, ref: str) -> Run:
+    '''
+    `ref` is a run's id, or a label (meaning the latest run with it), or
+    'latest', or 'previous' for the run before the latest
+    '''
+    all_runs = runs(db)
+    if ref in ('latest', 'previous'):
+        index = -1 if ref == 'latest' else -2
+        if len(all_runs) < -index:
+            raise LookupError(f'there is no {ref} run')
+        return all_runs[index]
+    for run in reversed(all_runs):
+        if str(run.id) == ref or run.label == ref:
+            return run
+    raise LookupError(f'no run has the id or label {ref!r}')
+
+
+def samples(db: sqlite3.Connection, run: int) -> Samples:
+    found: Samples = {}
+    rows = db.execute(
+        'SELECT benchmark, unit, value FROM samples WHERE run = ? '
+        'ORDER BY rowid',
+        (run,),
+    )
+    for benchmark, unit, value in rows:
+        found.setdefault(benchmark, (unit, []))[1].append(value)
+    return found
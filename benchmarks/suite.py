@@ -0,0 +1,366 @@
+'''
+Time each fixer on a few classes of input, and whole runs of pytestify,
+recording the results in a SQLite file. Later runs, e.g. of another commit
+or interpreter, can be compared to spot regressions:
+
+    python -m benchmarks.suite run --label before
+    python -m benchmarks.suite run --label after
+    python -m benchmarks.suite compare before after
+
+`compare` exits with 1 if anything got significantly worse: by more than
+`--threshold`, in samples that a Mann-Whitney U test finds unlikely to
+come from runs that perform the same.
+'''
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import io
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable, NamedTuple, Sequence
+
+from benchmarks import store
+from benchmarks.traversal import BLOCK
+from pytestify._main import main as pytestify_main
+from pytestify._transform import fix_contents
+from pytestify.fixes import asserts, base_class, funcs, imports, method_name
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# the same inputs must be used by every commit, so they're built here
+# rather than read from anywhere in the repo
+INPUTS: dict[str, str] = {
+    'typical': ''.join(BLOCK.format(i=i) for i in range(200)),
+    'long_asserts': ''.join(
+        f'def test_{i}(self):\n'
+        '    self.assertEqual(\n'
+        '        a,\n'
+        '        [\n'
+        + ''.join(f'            {j},\n' for j in range(400))
+        + '        ],\n'
+        "        msg='oh no',\n"
+        '    )\n'
+        for i in range(5)
+    ),
+    'many_comments': ''.join(
+        f'# comment {i}\n'
+        'self.assertIsNone(a)  # a comment\n'
+        'self.assertIn(\n'
+        '    a,\n'
+        '    b)  # another comment\n'
+        for i in range(500)
+    ),
+    'long_lines': ''.join(
+        f"self.assertEqual(a{i}, [{', '.join(map(str, range(2000)))}])\n"
+        for i in range(5)
+    ),
+    'repeated_asserts': (
+        'class ThingTest(unittest.TestCase):\n'
+        '    def test_thing(self):\n'
+        + (
+            '        self.assertEqual(response.status_code, 200)\n'
+            '        self.assertTrue(result)\n'
+        ) * 1000
+    ),
+}
+
+FIXERS: dict[str, Callable[[str], str]] = {
+    'remove_base_class': base_class.remove_base_class,
+    'rewrite_asserts': asserts.rewrite_asserts,
+    'rewrite_method_name': method_name.rewrite_method_name,
+    'rewrite_pytest_funcs': funcs.rewrite_pytest_funcs,
+    'add_pytest_import': imports.add_pytest_import,
+    'fix_contents': fix_contents,
+}
+
+# the units that get better as they go up, rather than down
+HIGHER_IS_BETTER = {'files/s'}
+
+
+def _git_commit() -> str | None:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-dirty' if status else commit
+
+
+def _time_fixer(
+    fix: Callable[[str], str],
+    source: str,
+    repeat: int,
+) -> list[float]:
+    fix(source)  # warm up, e.g. caches shared between files
+    times = timeit.repeat(lambda: fix(source), number=1, repeat=repeat)
+    return [t * 1000 for t in times]
+
+
+def _run_main(tmp: Path, source: str, files: int) -> float:
+    for i in range(files):
+        (tmp / f'test_{i}.py').write_text(source)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pytestify_main([str(tmp), '--no-progress'])
+    return time.perf_counter() - start
+
+
+def _files_per_second(source: str, files: int, repeat: int) -> list[float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        return [
+            files / _run_main(Path(tmp), source, files)
+            for _ in range(repeat)
+        ]
+
+
+def _peak_memory(source: str, files: int, repeat: int) -> list[float]:
+    ''' The most memory allocated by Python at once, in MB '''
+    peaks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            tracemalloc.start()
+            try:
+                _run_main(Path(tmp), source, files)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+            finally:
+                tracemalloc.stop()
+    return peaks
+
+
+def _record(args: argparse.Namespace) -> int:
+    db = store.connect(Path(args.db))
+    run = store.add_run(
+        db,
+        started=datetime.datetime.now().isoformat(timespec='seconds'),
+        label=args.label,
+        git_commit=_git_commit(),
+        python=f'{platform.python_implementation()} '
+        f'{platform.python_version()}',
+        platform=platform.platform(),
+    )
+
+    def add(benchmark: str, unit: str, values: list[float]) -> None:
+        store.add_samples(db, run, benchmark, unit, values)
+        print(
+            f'{benchmark:<40} {_typical(unit, values):>10.2f} {unit}',
+            flush=True,
+        )
+
+    for input_name, source in INPUTS.items():
+        for fixer_name, fix in FIXERS.items():
+            times = _time_fixer(fix, source, args.repeat)
+            add(f'{fixer_name}/{input_name}', 'ms', times)
+    for input_name, source in INPUTS.items():
+        rates = _files_per_second(source, args.files, args.repeat)
+        add(f'main/{input_name}', 'files/s', rates)
+    everything = ''.join(INPUTS.values())
+    add('peak_memory/main', 'MB', _peak_memory(everything, 1, args.repeat))
+    print(f'Recorded run {run} in {args.db}')
+    return 0
+
+
+def _list(args: argparse.Namespace) -> int:
+    db = store.connect(Path(args.db))
+    for run in store.runs(db):
+        print(
+            f'{run.id:>4}  {run.started}  {run.label or "-":<12} '
+            f'{run.git_commit or "-":<16} {run.python}',
+        )
+    return 0
+
+
+# fewer samples than this can't tell a change from a noisy run
+MIN_SAMPLES = 8
+# how unlikely a difference must be to come from runs that perform the same
+ALPHA = 0.01
+
+
+class Change(NamedTuple):
+    benchmark: str
+    unit: str
+    base: float  # each run's typical sample, see `_typical`
+    head: float
+    change: float  # relative to `base`, where positive is worse
+    p_value: float | None  # None if there are too few samples to tell
+
+    def significant(self, threshold: float) -> bool:
+        return (
+            self.p_value is not None and
+            self.p_value < ALPHA and
+            abs(self.change) > threshold
+        )
+
+
+def _typical(unit: str, values: Sequence[float]) -> float:
+    '''
+    The best sample of timings, which other processes and cold caches only
+    ever make worse, so that it varies least from run to run. Anything else
+    (e.g. memory) by its median.
+    '''
+    if unit in HIGHER_IS_BETTER:
+        return max(values)
+    if unit == 'ms':
+        return min(values)
+    return statistics.median(values)
+
+
+def _mann_whitney(a: Sequence[float], b: Sequence[float]) -> float:
+    '''
+    The two-sided p-value of the Mann-Whitney U test: how likely samples
+    this far apart would be if `a` and `b` came from the same distribution.
+    It uses the normal approximation, corrected for ties and continuity,
+    which is close enough from about 8 samples each.
+    '''
+    values = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    n = len(values)
+    # the rank of each sample, where tied samples share their average rank
+    rank_a = 0.0
+    ties = 0.0
+    start = 0
+    while start < n:
+        end = start
+        while end < n and values[end][0] == values[start][0]:
+            end += 1
+        rank = (start + end + 1) / 2
+        rank_a += rank * sum(1 for _, side in values[start:end] if side == 0)
+        ties += (end - start) ** 3 - (end - start)
+        start = end
+    n_a, n_b = len(a), len(b)
+    u = rank_a - n_a * (n_a + 1) / 2
+    variance = n_a * n_b / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = max(abs(u - n_a * n_b / 2) - 0.5, 0) / math.sqrt(variance)
+    return math.erfc(z / math.sqrt(2))
+
+
+def compare(base: store.Samples, head: store.Samples) -> list[Change]:
+    changes = []
+    for benchmark in sorted(base.keys() & head.keys()):
+        unit, base_values = base[benchmark]
+        _, head_values = head[benchmark]
+        base_typical = _typical(unit, base_values)
+        head_typical = _typical(unit, head_values)
+        if not base_typical:
+            continue
+        change = (head_typical - base_typical) / base_typical
+        if unit in HIGHER_IS_BETTER:
+            change = -change
+        p_value = None
+        if min(len(base_values), len(head_values)) >= MIN_SAMPLES:
+            p_value = _mann_whitney(base_values, head_values)
+        changes.append(
+            Change(
+                benchmark, unit, base_typical, head_typical, change, p_value,
+            ),
+        )
+    return changes
+
+
+def _compare(args: argparse.Namespace) -> int:
+    db = store.connect(Path(args.db))
+    try:
+        base = store.find_run(db, args.base)
+        head = store.find_run(db, args.head)
+    except LookupError as e:
+        print(e, file=sys.stderr)
+        return 2
+    for name, run in (('base', base), ('head', head)):
+        print(
+            f'{name}: run {run.id} ({run.label or "no label"}, '
+            f'{run.git_commit or "unknown commit"}, {run.python})',
+        )
+    if base.python != head.python or base.platform != head.platform:
+        print('warning: the runs are from different interpreters or machines')
+
+    changes = compare(store.samples(db, base.id), store.samples(db, head.id))
+    regressions = 0
+    for c in changes:
+        verdict = ''
+        if c.significant(args.threshold):
+            verdict = 'worse' if c.change > 0 else 'better'
+            regressions += c.change > 0
+        if c.p_value is None:
+            odds = f'fewer than {MIN_SAMPLES} samples'
+        else:
+            odds = f'p={c.p_value:.3f}'
+        print(
+            f'{c.benchmark:<40} {c.base:>10.2f} -> {c.head:>10.2f} '
+            f'{c.unit:<7} {c.change:>+7.1%} ({odds}) {verdict}',
+        )
+    print(f'{regressions} significant regression(s)')
+    return 1 if regressions else 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--db', default=os.path.join('benchmarks', 'results.sqlite'),
+        help='where results are kept (default: %(default)s)',
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmarks and record them')
+    run.add_argument('--label', help='a name to compare the run by later')
+    run.add_argument(
+        '--repeat', type=int, default=10,
+        help=(
+            'samples of each benchmark, of which `compare` needs at least '
+            f'{MIN_SAMPLES} (default: %(default)s)'
+        ),
+    )
+    run.add_argument(
+        '--files', type=int, default=10,
+        help='how many files each whole run of pytestify fixes',
+    )
+    run.set_defaults(func=_record)
+
+    runs = commands.add_parser('list', help='list the recorded runs')
+    runs.set_defaults(func=_list)
+
+    diff = commands.add_parser(
+        'compare',
+        help='compare two runs, exiting with 1 if anything got worse',
+    )
+    diff.add_argument(
+        'base', nargs='?', default='previous',
+        help="a run's id or label (default: %(default)s)",
+    )
+    diff.add_argument(
+        'head', nargs='?', default='latest',
+        help="a run's id or label (default: %(default)s)",
+    )
+    diff.add_argument(
+        '--threshold', type=float, default=0.1,
+        help=(
+            'the smallest relative change that counts, however unlikely '
+            'it is to be chance, since whole runs of the same commit can '
+            'drift by a few percent (default: %(default)s)'
+        ),
+    )
+    diff.set_defaults(func=_compare)
+
+    args = parser.parse_args(argv)
+    result: int = args.func(args)
+    return result
+
+
+if __name__ == '__main__':
+    exit(main())
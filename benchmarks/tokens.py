@@ -0,0 +1,104 @@
+'''
+Compare the memory used by `tokenize_rt`'s list of tokens with the compact
+`Tokens` that the asserts fixer uses, on a large generated test module.
+Run with `python -m benchmarks.tokens`.
+'''
+from __future__ import annotations
+
+import argparse
+import bisect
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+from tokenize_rt import Token, src_to_tokens
+
+from pytestify._token_helpers import Tokens
+from pytestify.fixes import asserts
+
+BLOCK = '''
+class ThingTest{i}(unittest.TestCase):
+    def test_thing(self):
+        self.assertEqual(
+            make_thing({i}, name='thing {i}'),  # a comment
+            {{'value': {i}, 'children': [1, 2, 3]}},
+        )
+        self.assertIn(
+            'thing', names,
+        )
+'''
+
+
+class TokenList(List[Token]):
+    ''' `src_to_tokens`' list, with the methods of `Tokens` '''
+
+    def __init__(self, src: str) -> None:
+        super().__init__(src_to_tokens(src))
+        self.lines = [tok.line for tok in self]
+
+    def name_at(self, i: int) -> str:
+        return self[i].name
+
+    def src_at(self, i: int) -> str:
+        return self[i].src
+
+    def line_at(self, i: int) -> int | None:
+        return self[i].line
+
+    def first_on_line(self, line: int) -> int:
+        return bisect.bisect_left(self.lines, line)
+
+
+def _measure(func: Callable[[], Any]) -> tuple[float, float, float]:
+    ''' Peak and retained MB, and seconds (timed without tracing) '''
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak / 1e6, retained / 1e6, seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--mb', type=float, default=5,
+        help='how large a file to tokenize (default: %(default)s)',
+    )
+    args = parser.parse_args()
+
+    blocks = int(args.mb * 1e6 / len(BLOCK.format(i=0))) + 1
+    source = ''.join(BLOCK.format(i=i) for i in range(blocks))
+    count = len(Tokens(source))
+    print(f'{len(source) / 1e6:.1f} MB of source, {count} tokens\n')
+    print(f'{"":<32} {"peak MB":>8} {"kept MB":>8} {"seconds":>8}')
+
+    rows = [
+        ('src_to_tokens', lambda: src_to_tokens(source)),
+        ('Tokens', lambda: Tokens(source)),
+    ]
+    # as in fix_contents, the calls are found in a tree parsed beforehand
+    visitor = asserts.Visitor().visit_text(source)
+    for name, tokenize in (('src_to_tokens', TokenList), ('Tokens', Tokens)):
+        def rewrite(tokenize: Any = tokenize) -> str:
+            asserts.Tokens = tokenize  # type: ignore[misc]
+            try:
+                return asserts.rewrite_asserts(source, visitor=visitor)
+            finally:
+                asserts.Tokens = Tokens  # type: ignore[misc]
+        rows.append((f'rewrite_asserts ({name})', rewrite))
+
+    for name, func in rows:
+        peak, retained, seconds = _measure(func)
+        print(f'{name:<32} {peak:>8.1f} {retained:>8.1f} {seconds:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
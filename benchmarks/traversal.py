@@ -0,0 +1,73 @@
+'''
+Compare walking a tree once per fixer with routing every fixer's visitor
+through a single walk. Run with `python -m benchmarks.traversal`.
+'''
+from __future__ import annotations
+
+import argparse
+import ast
+import timeit
+from typing import Callable
+
+from pytestify._ast_helpers import FindImportName, ast_parse, visit_all
+from pytestify.fixes import asserts, base_class, funcs, imports, method_name
+
+BLOCK = '''
+class ThingTest{i}(unittest.TestCase):
+    def setUp(self):
+        self.thing = make_thing({i})
+
+    @unittest.skip('reason')
+    def testCamelCase(self):
+        self.assertEqual(self.thing.value, {i})
+        self.assertIsNone(self.thing.parent)
+        with self.assertRaises(ValueError):
+            self.thing.explode(x for x in range({i}))
+'''
+
+FIXERS: list[Callable[[], ast.NodeVisitor]] = [
+    base_class.Visitor,
+    asserts.Visitor,
+    method_name.Visitor,
+    funcs.Visitor,
+    imports.Visitor,
+    lambda: FindImportName('pytest'),
+]
+
+
+def _separately(tree: ast.AST, count: int) -> None:
+    for i in range(count):
+        FIXERS[i % len(FIXERS)]().visit(tree)
+
+
+def _fused(tree: ast.AST, count: int) -> None:
+    visit_all(tree, [FIXERS[i % len(FIXERS)]() for i in range(count)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--blocks', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    source = ''.join(BLOCK.format(i=i) for i in range(args.blocks))
+    tree = ast_parse(source)
+    nodes = len(list(ast.walk(tree)))
+    print(f'{len(source.splitlines())} lines, {nodes} nodes')
+    print(f'{"fixers":>6} {"separate (ms)":>14} {"fused (ms)":>11}')
+    for count in (1, 2, 4, 6, 12, 24):
+        times = []
+        for walk in (_separately, _fused):
+            best = min(
+                timeit.repeat(
+                    lambda: walk(tree, count),  # noqa: B023
+                    number=1,
+                    repeat=args.repeat,
+                ),
+            )
+            times.append(best * 1000)
+        print(f'{count:>6} {times[0]:>14.1f} {times[1]:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from pytestify._async import PathResult, atransform_paths
+    from pytestify._hooks import (
+        CacheStats, ChromeTrace, Subscriber, subscribe, unsubscribe,
+    )
+    from pytestify._import_hook import install_import_hook
+    from pytestify._incremental import Transformed, retransform, transform
+    from pytestify._transform import fix_contents
+
+# where each name is defined. They're imported when first used, so that
+# importing the package, e.g. for its pytest plugin, doesn't import every
+# fixer (and asyncio) into every pytest run.
+_EXPORTS = {
+    'CacheStats': 'pytestify._hooks',
+    'ChromeTrace': 'pytestify._hooks',
+    'PathResult': 'pytestify._async',
+    'Subscriber': 'pytestify._hooks',
+    'Transformed': 'pytestify._incremental',
+    'atransform_paths': 'pytestify._async',
+    'fix_contents': 'pytestify._transform',
+    'install_import_hook': 'pytestify._import_hook',
+    'retransform': 'pytestify._incremental',
+    'subscribe': 'pytestify._hooks',
+    'transform': 'pytestify._incremental',
+    'unsubscribe': 'pytestify._hooks',
+}
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}',
+        ) from None
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_EXPORTS})
+
+
+__all__ = [
+    'CacheStats',
+    'ChromeTrace',
+    'PathResult',
+    'Subscriber',
+    'Transformed',
+    'atransform_paths',
+    'fix_contents',
+    'install_import_hook',
+    'retransform',
+    'subscribe',
+    'transform',
+    'unsubscribe',
+]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import base64
+import copy
+import csv
+import hashlib
+import io
+import shutil
+import tarfile
+import zipfile
+from typing import IO, Callable, Optional
+
+# a member's name and source -> the fixed source, or None if unchanged
+Fixer = Callable[[str, bytes], Optional[bytes]]
+
+_COMPRESSION = {
+    b'\x1f\x8b': 'gz',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+}
+
+
+def _sniff(src: IO[bytes]) -> str:
+    ''' 'zip', or the tarfile mode suffix for how the tarball is compressed '''
+    peek = getattr(src, 'peek', None)
+    if peek is None:
+        raise ValueError('the input archive must be a buffered stream')
+    head = peek(8)[:8]
+    if head.startswith(b'PK'):
+        return 'zip'
+    for magic, compression in _COMPRESSION.items():
+        if head.startswith(magic):
+            return compression
+    return ''
+
+
+def _record_hash(data: bytes) -> str:
+    digest = hashlib.sha256(data).digest()
+    return 'sha256=' + base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def _update_record(record: bytes, fixed: dict[str, bytes]) -> bytes:
+    '''
+    A wheel's RECORD lists the hash and size of every file, so it must
+    match the fixed sources
+    '''
+    rows = list(csv.reader(io.StringIO(record.decode())))
+    for row in rows:
+        if row and row[0] in fixed:
+            data = fixed[row[0]]
+            row[1:3] = [_record_hash(data), str(len(data))]
+    out = io.StringIO()
+    csv.writer(out, lineterminator='\n').writerows(rows)
+    return out.getvalue().encode()
+
+
+def _fix_member(
+    name: str,
+    data: bytes,
+    fix: Fixer,
+    fixed: dict[str, bytes],
+) -> bytes:
+    if name.endswith('.dist-info/RECORD') and fixed:
+        # member names are relative to the root of the wheel
+        prefix = name[:-len('RECORD')].split('/')[:-2]
+        root = '/'.join(prefix) + '/' if prefix else ''
+        relative = {
+            path[len(root):]: source
+            for path, source in fixed.items()
+            if path.startswith(root)
+        }
+        return _update_record(data, relative)
+    if not name.endswith('.py'):
+        return data
+    new = fix(name, data)
+    if new is None:
+        return data
+    fixed[name] = new
+    return new
+
+
+def _fix_tar(
+    src: IO[bytes],
+    dst: IO[bytes],
+    compression: str,
+    fix: Fixer,
+) -> None:
+    fixed: dict[str, bytes] = {}
+    # stream mode reads each member once, in order, without seeking
+    with tarfile.open(fileobj=src, mode='r|*') as tin, \
+            tarfile.open(  # type: ignore[call-overload]
+                fileobj=dst,
+                mode=f'w|{compression}',
+                format=tarfile.PAX_FORMAT,
+            ) as tout:
+        for info in tin:
+            member = tin.extractfile(info) if info.isfile() else None
+            if member is None:
+                tout.addfile(info)
+            elif info.name.endswith(('.py', '.dist-info/RECORD')):
+                data = member.read()
+                new = _fix_member(info.name, data, fix, fixed)
+                if new is not data:
+                    info = copy.copy(info)
+                    info.size = len(new)
+                    info.pax_headers = dict(info.pax_headers)
+                    info.pax_headers.pop('size', None)
+                tout.addfile(info, io.BytesIO(new))
+            else:
+                tout.addfile(info, member)
+
+
+def _fix_zip(src: IO[bytes], dst: IO[bytes], fix: Fixer) -> None:
+    if not src.seekable():
+        # the index of a zip file is at its end
+        src = io.BytesIO(src.read())
+    fixed: dict[str, bytes] = {}
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, 'w') as zout:
+        zout.comment = zin.comment
+        for info in zin.infolist():
+            out_info = copy.copy(info)
+            if info.filename.endswith(('.py', '.dist-info/RECORD')):
+                data = zin.read(info)
+                new = _fix_member(info.filename, data, fix, fixed)
+                zout.writestr(out_info, new, compress_type=info.compress_type)
+            else:
+                force_zip64 = info.file_size > zipfile.ZIP64_LIMIT
+                with zin.open(info) as member, \
+                        zout.open(out_info, 'w', force_zip64=force_zip64) as f:
+                    shutil.copyfileobj(member, f)
+
+
+def fix_archive(src: IO[bytes], dst: IO[bytes], fix: Fixer) -> None:
+    '''
+    Copy a zip file or a (possibly compressed) tarball from `src` to `dst`,
+    fixing every `.py` member with `fix` along the way. Every other member
+    is copied as-is, with the same metadata and in the same order. Nothing
+    is extracted to disk, and tarballs are read and written as streams.
+    '''
+    kind = _sniff(src)
+    if kind == 'zip':
+        _fix_zip(src, dst, fix)
+    else:
+        _fix_tar(src, dst, kind, fix)
@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 import ast
+import contextlib
+import sys
+import threading
 import warnings
-from typing import Any
+from typing import Any, Callable, ContextManager, Sequence
+
+# `catch_warnings` swaps out global state, so threads must take turns using
+# it. Free-threaded builds make it thread-safe, with context-aware warnings
+_warnings_lock: ContextManager[Any] = (
+    contextlib.nullcontext()
+    if getattr(sys.flags, 'context_aware_warnings', False)
+    else threading.Lock()
+)
 
 
 def ast_parse(contents: str) -> ast.Module:
-    with warnings.catch_warnings():
+    with _warnings_lock, warnings.catch_warnings():
         warnings.simplefilter('ignore')
         return ast.parse(contents)
 
@@ -19,12 +30,82 @@ def is_valid_syntax(contents: str) -> bool:
         return False
 
 
+def has_plain_line_breaks(contents: str) -> bool:
+    '''
+    str.splitlines also splits on characters like form feeds, which the
+    tokenizer doesn't. Line numbers from the AST only match the split lines
+    if every line ends in '\\n' or '\\r\\n'
+    '''
+    lines = contents.splitlines(keepends=True)
+    return all(line.endswith('\n') for line in lines[:-1])
+
+
 class NodeVisitor(ast.NodeVisitor):
     def visit_text(self, contents: str) -> Any:
         self.visit(ast_parse(contents))
         return self
 
 
+_handled_types: dict[type[ast.NodeVisitor], tuple[str, ...]] = {}
+
+
+def _handled(cls: type[ast.NodeVisitor]) -> tuple[str, ...]:
+    ''' The node types that `cls` has its own `visit_` method for '''
+    if cls not in _handled_types:
+        _handled_types[cls] = tuple(
+            name[len('visit_'):]
+            for name in dir(cls)
+            if name.startswith('visit_') and name != 'visit_text' and
+            getattr(cls, name) is not getattr(ast.NodeVisitor, name, None)
+        )
+    return _handled_types[cls]
+
+
+def visit_all(tree: ast.AST, visitors: Sequence[ast.NodeVisitor]) -> None:
+    '''
+    Walk `tree` once, and route each node to every visitor with a method
+    for its type. Each visitor sees the same nodes, in the same order, as
+    `visitor.visit(tree)`: the children of a node it handles aren't routed
+    to it, since none of the fixers' visitors call `generic_visit`.
+    '''
+    if not visitors:
+        return
+    routes: dict[type, list[tuple[int, Callable[[Any], Any]]]] = {}
+    for i, visitor in enumerate(visitors):
+        for name in _handled(type(visitor)):
+            node_type = getattr(ast, name, None)
+            if node_type is not None:
+                method = getattr(visitor, f'visit_{name}')
+                routes.setdefault(node_type, []).append((1 << i, method))
+
+    # each visitor is a bit, which is cleared below the nodes it handles
+    nodes = [tree]
+    masks = [(1 << len(visitors)) - 1]
+    while nodes:
+        node = nodes.pop()
+        active = masks.pop()
+        route = routes.get(type(node))
+        if route is not None:
+            for bit, method in route:
+                if active & bit:
+                    method(node)
+                    active &= ~bit
+            if not active:
+                continue
+
+        # the same children as `ast.iter_child_nodes`, but reversed
+        children: list[ast.AST] = []
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if type(value) is list:
+                children.extend([c for c in value if isinstance(c, ast.AST)])
+            elif isinstance(value, ast.AST):
+                children.append(value)
+        children.reverse()
+        nodes += children
+        masks += [active] * len(children)
+
+
 class FindImportName(NodeVisitor):
     def __init__(self, search: str):
         self.search = search
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import (
+    AsyncIterable, AsyncIterator, Callable, Collection, Iterable, NamedTuple,
+)
+
+from pytestify._transform import fix_contents, no_ws
+
+
+class PathResult(NamedTuple):
+    path: str
+    source: str  # empty if the file couldn't be read
+    output: str | None  # None if the source couldn't be fixed
+    # why it couldn't be read, fixed or written, e.g. a SyntaxError
+    error: Exception | None = None
+
+    @property
+    def changed(self) -> bool:
+        return self.output is not None and (
+            no_ws(self.output) != no_ws(self.source)
+        )
+
+
+async def _aiter(
+    paths: Iterable[str] | AsyncIterable[str],
+) -> AsyncIterator[str]:
+    if isinstance(paths, AsyncIterable):
+        async for path in paths:
+            yield path
+    else:
+        for path in paths:
+            yield path
+
+
+async def _transform_path(
+    path: str,
+    fix: Callable[[str], str],
+    executor: Executor | None,
+    write: bool,
+) -> PathResult:
+    loop = asyncio.get_running_loop()
+    # the default executor reads and writes, so that a process pool is
+    # only handed the (picklable) sources
+    try:
+        source = await loop.run_in_executor(None, Path(path).read_text)
+    except (OSError, UnicodeDecodeError) as e:
+        return PathResult(path, '', None, e)
+    try:
+        output = await loop.run_in_executor(executor, fix, source)
+    except Exception as e:
+        # returned, since raising would cancel every other file in progress
+        return PathResult(path, source, None, e)
+
+    result = PathResult(path, source, output)
+    if write and result.changed:
+        try:
+            await loop.run_in_executor(None, Path(path).write_text, output)
+        except OSError as e:
+            return result._replace(error=e)
+    return result
+
+
+async def atransform_paths(
+    paths: Iterable[str] | AsyncIterable[str],
+    *,
+    executor: Executor | None = None,
+    limit: int = 8,
+    write: bool = False,
+    with_count_equal: bool = False,
+    keep_method_casing: bool = False,
+    test_bases: Collection[str] = (),
+) -> AsyncIterator[PathResult]:
+    '''
+    Fix every file in `paths`, yielding results as they complete. At most
+    `limit` files are in progress at once. Sources are fixed in `executor`
+    (the event loop's default executor if None), and files are read and
+    written in the default executor, so the event loop is never blocked.
+    With `write`, changed files are rewritten in place. A file that can't
+    be read, fixed or written is yielded with the exception as its `error`.
+
+    Closing the iterator, or cancelling the task consuming it, cancels
+    every file still in progress.
+    '''
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    fix = functools.partial(
+        fix_contents,
+        with_count_equal=with_count_equal,
+        keep_method_casing=keep_method_casing,
+        test_bases=frozenset(test_bases),
+    )
+
+    source = _aiter(paths)
+    pending: set[asyncio.Future[PathResult]] = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < limit:
+                try:
+                    path = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(
+                    asyncio.ensure_future(
+                        _transform_path(path, fix, executor, write),
+                    ),
+                )
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(
+                pending,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
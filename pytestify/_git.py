@@ -0,0 +1,158 @@
+'''
+Reads the Python sources of a revision straight from a git repository's
+object store, so that it can be fixed without being checked out. Blobs are
+listed with `git ls-tree`, and read by a single `git cat-file --batch`
+process, rather than a process per file.
+'''
+from __future__ import annotations
+
+import os
+import queue
+import subprocess
+import threading
+from typing import IO, Iterable, Iterator, NamedTuple, Sequence
+
+# symlinks are blobs too, but their contents are the path they point to
+_SYMLINK = b'120000'
+
+
+class GitError(Exception):
+    pass
+
+
+class Blob(NamedTuple):
+    path: str
+    oid: str
+
+
+def _git(repo: str, *args: str) -> list[str]:
+    return ['git', '-C', repo, *args]
+
+
+def resolve_tree(rev: str, *, repo: str = '.') -> str:
+    ''' The id of the tree `rev` (a commit, tag or tree) points to '''
+    proc = subprocess.run(
+        _git(
+            repo, 'rev-parse', '--verify', '--end-of-options',
+            f'{rev}^{{tree}}',
+        ),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        message = proc.stderr.strip() or f'{rev} is not a revision'
+        raise GitError(message.splitlines()[-1])
+    return proc.stdout.strip()
+
+
+def python_blobs(
+    rev: str,
+    paths: Sequence[str] = (),
+    *,
+    repo: str = '.',
+) -> Iterator[Blob]:
+    '''
+    The `.py` files in `rev`, optionally only those under `paths`, in the
+    order git lists them. They're yielded as `git ls-tree` finds them.
+    '''
+    tree = resolve_tree(rev, repo=repo)
+    cmd = _git(repo, 'ls-tree', '-r', '-z', '--full-tree', tree, '--', *paths)
+    # unbuffered, so that each read returns whatever git has listed so far
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=0) as proc:
+        assert proc.stdout is not None
+        buf = b''
+        while True:
+            chunk = proc.stdout.read(64 * 1024)
+            if not chunk:
+                break
+            *entries, buf = (buf + chunk).split(b'\0')
+            for entry in entries:
+                # '<mode> <type> <oid>\t<path>', with paths left unquoted
+                info, _, path = entry.partition(b'\t')
+                mode, kind, oid = info.split()
+                if (
+                    kind == b'blob' and
+                    mode != _SYMLINK and
+                    path.endswith(b'.py')
+                ):
+                    yield Blob(os.fsdecode(path), oid.decode())
+    if proc.returncode != 0:
+        raise GitError(f'git ls-tree failed with status {proc.returncode}')
+
+
+class CatFile:
+    '''
+    A long-lived `git cat-file --batch` process. Object ids are written
+    to it from a thread while the contents are read back, so that neither
+    side waits on the other.
+    '''
+
+    def __init__(self, *, repo: str = '.') -> None:
+        self.proc = subprocess.Popen(
+            _git(repo, 'cat-file', '--batch'),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def __enter__(self) -> CatFile:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.proc.stdin is not None and not self.proc.stdin.closed:
+            self.proc.stdin.close()
+        self.proc.kill()
+        self.proc.wait()
+        if self.proc.stdout is not None:
+            self.proc.stdout.close()
+
+    def read(self, blobs: Iterable[Blob]) -> Iterator[tuple[Blob, bytes]]:
+        ''' The contents of each blob, in order '''
+        stdin, stdout = self.proc.stdin, self.proc.stdout
+        assert stdin is not None and stdout is not None
+        # the blobs requested and not yet read back, then None
+        requested: queue.Queue[Blob | None] = queue.Queue()
+        failure: list[BaseException] = []
+
+        def feed() -> None:
+            try:
+                for blob in blobs:
+                    stdin.write(f'{blob.oid}\n'.encode())
+                    stdin.flush()
+                    requested.put(blob)
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                requested.put(None)
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        try:
+            while True:
+                blob = requested.get()
+                if blob is None:
+                    break
+                yield blob, _read_object(stdout, blob)
+        finally:
+            if feeder.is_alive():
+                # stop the feeder, e.g. if this generator was closed early
+                self.close()
+            feeder.join()
+        if failure:
+            raise failure[0]
+
+
+def _read_object(stdout: IO[bytes], blob: Blob) -> bytes:
+    header = stdout.readline()
+    if not header:
+        raise GitError('git cat-file exited early')
+    # '<oid> <type> <size>', or '<oid> missing'
+    fields = header.split()
+    if len(fields) != 3:
+        raise GitError(f'{blob.path} ({blob.oid}) is missing')
+    size = int(fields[2])
+    data = stdout.read(size)
+    stdout.read(1)  # the newline after each object
+    return data
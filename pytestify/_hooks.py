@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+# an event recorded by `ChromeTrace`
+Event = Dict[str, Any]
+# a cache's name, hits and misses, as counted by `CacheStats`
+CacheCount = Tuple[str, int, int]
+
+
+class Subscriber:
+    '''
+    Receives events from pytestify as it runs. Override the methods for
+    the events you're interested in. Events are sent from the thread (and
+    process) doing the work, so methods must be thread-safe.
+    '''
+
+    def file_start(self, path: str) -> None:
+        pass
+
+    def file_end(self, path: str, changed: bool) -> None:
+        pass
+
+    def fixer_start(self, fixer: str) -> None:
+        pass
+
+    def fixer_end(self, fixer: str) -> None:
+        pass
+
+    def cache_hit(self, cache: str, key: str) -> None:
+        pass
+
+    def cache_miss(self, cache: str, key: str) -> None:
+        pass
+
+    def skip(self, path: str, reason: str) -> None:
+        pass
+
+    def write(self, path: str) -> None:
+        pass
+
+
+# replaced rather than mutated, so sending events never needs the lock
+subscribers: tuple[Subscriber, ...] = ()
+_lock = threading.Lock()
+
+
+def subscribe(subscriber: Subscriber) -> None:
+    global subscribers
+    with _lock:
+        subscribers += (subscriber,)
+
+
+def unsubscribe(subscriber: Subscriber) -> None:
+    global subscribers
+    with _lock:
+        subscribers = tuple(s for s in subscribers if s is not subscriber)
+
+
+@contextlib.contextmanager
+def only(*new: Subscriber) -> Iterator[None]:
+    '''
+    Send events to just `new` for a while. Worker processes use this, since
+    subscribers in the main process never see their events.
+    '''
+    global subscribers
+    with _lock:
+        old, subscribers = subscribers, new
+    try:
+        yield
+    finally:
+        with _lock:
+            subscribers = old
+
+
+def file_start(path: str) -> None:
+    for subscriber in subscribers:
+        subscriber.file_start(path)
+
+
+def file_end(path: str, changed: bool) -> None:
+    for subscriber in subscribers:
+        subscriber.file_end(path, changed)
+
+
+def cache_hit(cache: str, key: str) -> None:
+    for subscriber in subscribers:
+        subscriber.cache_hit(cache, key)
+
+
+def cache_miss(cache: str, key: str) -> None:
+    for subscriber in subscribers:
+        subscriber.cache_miss(cache, key)
+
+
+def skip(path: str, reason: str) -> None:
+    for subscriber in subscribers:
+        subscriber.skip(path, reason)
+
+
+def write(path: str) -> None:
+    for subscriber in subscribers:
+        subscriber.write(path)
+
+
+class _Fixer:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        for subscriber in subscribers:
+            subscriber.fixer_start(self.name)
+
+    def __exit__(self, *exc: object) -> None:
+        for subscriber in subscribers:
+            subscriber.fixer_end(self.name)
+
+
+class _Nothing:
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+
+_NOTHING = _Nothing()
+
+
+def fixer(name: str) -> _Fixer | _Nothing:
+    ''' A context manager that sends the start and end of a fixer '''
+    return _Fixer(name) if subscribers else _NOTHING
+
+
+class ChromeTrace(Subscriber):
+    '''
+    Records events in the Chrome trace event format, which can be opened
+    with chrome://tracing or https://ui.perfetto.dev
+    '''
+
+    def __init__(self) -> None:
+        self.events: list[Event] = []
+
+    def _add(self, ph: str, name: str, cat: str, **args: Any) -> None:
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': ph,
+            # perf_counter is system-wide, so worker processes line up
+            'ts': time.perf_counter() * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if ph == 'i':
+            event['s'] = 't'
+        if args:
+            event['args'] = args
+        # appending is atomic, so threads don't need a lock
+        self.events.append(event)
+
+    def file_start(self, path: str) -> None:
+        self._add('B', path, 'file')
+
+    def file_end(self, path: str, changed: bool) -> None:
+        self._add('E', path, 'file', changed=changed)
+
+    def fixer_start(self, fixer: str) -> None:
+        self._add('B', fixer, 'fixer')
+
+    def fixer_end(self, fixer: str) -> None:
+        self._add('E', fixer, 'fixer')
+
+    def cache_hit(self, cache: str, key: str) -> None:
+        self._add('i', f'{cache} hit', 'cache', key=key)
+
+    def cache_miss(self, cache: str, key: str) -> None:
+        self._add('i', f'{cache} miss', 'cache', key=key)
+
+    def skip(self, path: str, reason: str) -> None:
+        self._add('i', 'skip', 'file', path=path, reason=reason)
+
+    def write(self, path: str) -> None:
+        self._add('i', 'write', 'file', path=path)
+
+    def save(self, path: Path) -> None:
+        data = {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+        path.write_text(json.dumps(data))
+
+
+class CacheStats(Subscriber):
+    ''' Counts the hits and misses of each cache '''
+
+    def __init__(self) -> None:
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def cache_hit(self, cache: str, key: str) -> None:
+        with self._lock:
+            self.hits[cache] = self.hits.get(cache, 0) + 1
+
+    def cache_miss(self, cache: str, key: str) -> None:
+        with self._lock:
+            self.misses[cache] = self.misses.get(cache, 0) + 1
+
+    def counts(self) -> tuple[CacheCount, ...]:
+        with self._lock:
+            caches = sorted({*self.hits, *self.misses})
+            return tuple(
+                (c, self.hits.get(c, 0), self.misses.get(c, 0))
+                for c in caches
+            )
+
+    def add(self, counts: Iterable[CacheCount]) -> None:
+        ''' Add counts from another process '''
+        with self._lock:
+            for cache, hits, misses in counts:
+                self.hits[cache] = self.hits.get(cache, 0) + hits
+                self.misses[cache] = self.misses.get(cache, 0) + misses
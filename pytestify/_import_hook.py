@@ -0,0 +1,277 @@
+'''
+An import hook that converts unittest modules to pytest as they're
+imported. The converted source and its code are cached next to the
+source, like `__pycache__` does for bytecode.
+'''
+from __future__ import annotations
+
+import functools
+import hashlib
+import importlib.machinery
+import importlib.util
+import linecache
+import marshal
+import os
+import struct
+import sys
+import types
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+from pytestify._transform import fix_contents
+
+# converted source and its filename -> code, e.g. to also rewrite the
+# asserts for pytest
+Compiler = Callable[[str, str], types.CodeType]
+
+# magic number, source mtime (ns) and size, source hash, converted source
+# length. The magic number is the interpreter's, so that its bytecode
+# changing makes the cache stale.
+_HEADER = struct.Struct('<4sqq8sq')
+
+_fingerprint: str | None = None
+
+
+def _pytestify_fingerprint() -> str:
+    ''' A hash of pytestify's own sources, so upgrading it empties caches '''
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256()
+        root = Path(__file__).parent
+        for path in sorted(root.rglob('*.py')):
+            digest.update(path.relative_to(root).as_posix().encode())
+            digest.update(path.read_bytes())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+def _compile(source: str, path: str) -> types.CodeType:
+    return compile(source, path, 'exec', dont_inherit=True)
+
+
+def _is_under(path: str, roots: tuple[str, ...]) -> bool:
+    path = os.path.abspath(path)
+    return any(path == r or path.startswith(r + os.sep) for r in roots)
+
+
+class _Cached:
+    def __init__(self, data: bytes) -> None:
+        (
+            self.magic, self.mtime, self.size, self.source_hash, length,
+        ) = _HEADER.unpack_from(data)
+        start = _HEADER.size
+        self.source = data[start:start + length].decode()
+        self._code = data[start + length:]
+
+    def fresh(self, stat: os.stat_result) -> bool:
+        return (
+            self.magic == importlib.util.MAGIC_NUMBER and
+            self.mtime == stat.st_mtime_ns and
+            self.size == stat.st_size
+        )
+
+    def code(self) -> types.CodeType:
+        code = marshal.loads(self._code)
+        if not isinstance(code, types.CodeType):
+            raise ValueError('the cache has no code')
+        return code
+
+
+def _write_atomically(path: str, data: bytes) -> None:
+    tmp = f'{path}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        # e.g. a read-only directory. The module still imports, but it's
+        # converted again next time.
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+class ConvertingLoader(importlib.machinery.SourceFileLoader):
+    def __init__(self, fullname: str, path: str, finder: ConvertingFinder):
+        super().__init__(fullname, path)
+        self.finder = finder
+        self.cache = finder.cache_path(path)
+        self._source: str | None = None
+
+    def _read_cache(self) -> _Cached | None:
+        if self.cache is None:
+            return None
+        try:
+            with open(self.cache, 'rb') as f:
+                return _Cached(f.read())
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            return None
+
+    def _convert(self, source: str) -> str:
+        try:
+            return self.finder.fix(source)
+        except Exception:
+            # pytestify can't convert it, so it's imported as it is. Any
+            # syntax error is reported by compiling the original.
+            return source
+
+    def get_code(self, fullname: str) -> types.CodeType:
+        path = self.get_filename(fullname)
+        stat = os.stat(path)
+        cached = self._read_cache()
+        if cached is not None and cached.fresh(stat):
+            try:
+                return self._loaded(path, stat, cached.source, cached.code())
+            except (ValueError, EOFError, TypeError):
+                cached = None
+
+        data = self.get_data(path)
+        source_hash = importlib.util.source_hash(data)
+        if cached is not None and cached.source_hash == source_hash:
+            # the source was touched, but not changed
+            try:
+                code = cached.code()
+            except (ValueError, EOFError, TypeError):
+                pass
+            else:
+                self._save(stat, source_hash, cached.source, code)
+                return self._loaded(path, stat, cached.source, code)
+
+        source = self._convert(importlib.util.decode_source(data))
+        code = self.finder.compiler(source, path)
+        self._save(stat, source_hash, source, code)
+        return self._loaded(path, stat, source, code)
+
+    def _save(
+        self,
+        stat: os.stat_result,
+        source_hash: bytes,
+        source: str,
+        code: types.CodeType,
+    ) -> None:
+        if self.cache is None or sys.dont_write_bytecode:
+            return
+        encoded = source.encode()
+        header = _HEADER.pack(
+            importlib.util.MAGIC_NUMBER,
+            stat.st_mtime_ns,
+            stat.st_size,
+            source_hash,
+            len(encoded),
+        )
+        _write_atomically(self.cache, header + encoded + marshal.dumps(code))
+
+    def _loaded(
+        self,
+        path: str,
+        stat: os.stat_result,
+        source: str,
+        code: types.CodeType,
+    ) -> types.CodeType:
+        # tracebacks (and pytest) show lines of the converted source. The
+        # original's size and mtime keep linecache from reading the file.
+        lines = source.splitlines(keepends=True)
+        linecache.cache[path] = (stat.st_size, stat.st_mtime, lines, path)
+        self._source = source
+        return code
+
+    def get_source(self, fullname: str) -> str:
+        if self._source is None:
+            self.get_code(fullname)
+        assert self._source is not None
+        return self._source
+
+
+class ConvertingFinder:
+    '''
+    Finds modules in `roots` (or packages below them) and imports them
+    converted to pytest. Install it with `install_import_hook`.
+    '''
+
+    def __init__(
+        self,
+        roots: Iterable[str | os.PathLike[str]],
+        *,
+        with_count_equal: bool = False,
+        keep_method_casing: bool = False,
+        compiler: Compiler | None = None,
+        tag: str = '',
+    ) -> None:
+        self.roots = tuple(os.path.abspath(r) for r in roots)
+        self.fix = functools.partial(
+            fix_contents,
+            with_count_equal=with_count_equal,
+            keep_method_casing=keep_method_casing,
+        )
+        self.compiler = compiler or _compile
+        options = (
+            f'{_pytestify_fingerprint()}\0{with_count_equal}\0'
+            f'{keep_method_casing}\0{tag}'
+        )
+        self.key = hashlib.sha256(options.encode()).hexdigest()[:12]
+
+    def cache_path(self, path: str) -> str | None:
+        try:
+            pyc = importlib.util.cache_from_source(path)
+        except NotImplementedError:  # no cache tag, so no bytecode cache
+            return None
+        return f'{pyc[:-len(".pyc")]}.pytestify-{self.key}.pyc'
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None = None,
+        target: types.ModuleType | None = None,
+    ) -> importlib.machinery.ModuleSpec | None:
+        # most imports aren't near the roots, so they're left to the
+        # import system without looking for them twice
+        dirs = sys.path if path is None else path
+        if not any(_is_under(d or os.curdir, self.roots) for d in dirs):
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if (
+            spec is None or
+            spec.origin is None or
+            not isinstance(spec.loader, importlib.machinery.SourceFileLoader)
+            or not _is_under(spec.origin, self.roots)
+        ):
+            return None
+        loader = ConvertingLoader(fullname, spec.origin, self)
+        spec.loader = loader
+        spec.cached = loader.cache
+        return spec
+
+    def uninstall(self) -> None:
+        try:
+            sys.meta_path.remove(self)  # type: ignore[arg-type]
+        except ValueError:
+            pass
+
+
+def install_import_hook(
+    roots: Iterable[str | os.PathLike[str]],
+    *,
+    with_count_equal: bool = False,
+    keep_method_casing: bool = False,
+    compiler: Compiler | None = None,
+    tag: str = '',
+) -> ConvertingFinder:
+    '''
+    Convert modules in the `roots` directories to pytest as they're
+    imported, until the returned finder's `uninstall` is called.
+
+    `compiler` turns each converted source and its path into code (by
+    default, with `compile`). `tag` is part of the cache key, so it must
+    change whenever the code `compiler` makes does.
+    '''
+    finder = ConvertingFinder(
+        roots,
+        with_count_equal=with_count_equal,
+        keep_method_casing=keep_method_casing,
+        compiler=compiler,
+        tag=tag,
+    )
+    sys.meta_path.insert(0, finder)  # type: ignore[arg-type]
+    return finder
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Collection, NamedTuple, Sequence
+
+from pytestify._ast_helpers import (
+    FindImportName, ast_parse, has_plain_line_breaks, visit_all,
+)
+from pytestify._split import SENTINEL, block_starts, strip_sentinel
+from pytestify._transform import find_tests, fix_contents, rewrite_tests
+from pytestify.fixes.imports import (
+    Visitor as ImportsVisitor, insert_pytest_import,
+)
+
+
+class _Block(NamedTuple):
+    ''' One top-level block of a module, and how it was fixed '''
+    source: str
+    lines: int
+    last: bool
+    found: str  # after `find_tests`, with the sentinel if it's not last
+    is_test: bool
+    # the rest depend on whether the whole file looked like a test file,
+    # and aren't known until every block has been found
+    is_unittest_file: bool | None
+    rewritten: str
+    valid: bool
+    imports_pytest: bool
+    uses_pytest_func: bool
+
+
+@dataclass(frozen=True)
+class Transformed:
+    '''
+    The result of fixing a module, which remembers enough about each of
+    its top-level blocks to cheaply fix a new version of the module
+    '''
+    source: str
+    output: str
+    with_count_equal: bool = False
+    keep_method_casing: bool = False
+    test_bases: frozenset[str] = frozenset()
+    blocks: tuple[_Block, ...] = ()
+
+
+def _find(
+    source: str,
+    last: bool,
+    with_count_equal: bool,
+    test_bases: Collection[str],
+) -> _Block:
+    found, is_test = find_tests(
+        source if last else source + SENTINEL,
+        with_count_equal=with_count_equal,
+        test_bases=test_bases,
+    )
+    return _Block(
+        source=source,
+        lines=len(source.splitlines()),
+        last=last,
+        found=found,
+        is_test=is_test,
+        is_unittest_file=None,
+        rewritten='',
+        valid=False,
+        imports_pytest=False,
+        uses_pytest_func=False,
+    )
+
+
+def _rewrite(
+    block: _Block,
+    is_unittest_file: bool,
+    keep_method_casing: bool,
+) -> _Block:
+    rewritten = rewrite_tests(
+        block.found,
+        is_unittest_file=is_unittest_file,
+        keep_method_casing=keep_method_casing,
+    )
+    if not block.last:
+        rewritten = strip_sentinel(rewritten)
+
+    imports, uses = FindImportName('pytest'), ImportsVisitor()
+    try:
+        tree = ast_parse(rewritten)
+    except SyntaxError:
+        valid = False
+    else:
+        valid = True
+        visit_all(tree, [imports, uses])
+    return block._replace(
+        is_unittest_file=is_unittest_file,
+        rewritten=rewritten,
+        valid=valid,
+        imports_pytest=imports.imports,
+        uses_pytest_func=uses.uses_pytest_func,
+    )
+
+
+def _split(source: str) -> list[str]:
+    lines = source.splitlines(keepends=True)
+    bounds = [0] + block_starts(source) + [len(lines)]
+    return [
+        ''.join(lines[start:end]) for start, end in zip(bounds, bounds[1:])
+    ]
+
+
+def _assemble(
+    source: str,
+    blocks: Sequence[_Block],
+    with_count_equal: bool,
+    keep_method_casing: bool,
+    test_bases: frozenset[str],
+) -> Transformed:
+    is_unittest_file = any(block.is_test for block in blocks)
+    blocks = [
+        block if block.is_unittest_file == is_unittest_file
+        else _rewrite(block, is_unittest_file, keep_method_casing)
+        for block in blocks
+    ]
+
+    # this mirrors `add_pytest_import`, without reparsing the whole file
+    output = '\n'.join(block.rewritten for block in blocks)
+    if 'pytest' in output:
+        if not all(block.valid for block in blocks):
+            ast_parse(output)  # raises the SyntaxError
+        if (
+            not any(block.imports_pytest for block in blocks) and
+            any(block.uses_pytest_func for block in blocks)
+        ):
+            output = insert_pytest_import(output)
+    if not output.endswith('\n'):
+        output += '\n'
+
+    return Transformed(
+        source=source,
+        output=output,
+        with_count_equal=with_count_equal,
+        keep_method_casing=keep_method_casing,
+        test_bases=test_bases,
+        blocks=tuple(blocks),
+    )
+
+
+def transform(
+    source: str,
+    *,
+    with_count_equal: bool = False,
+    keep_method_casing: bool = False,
+    test_bases: Collection[str] = (),
+) -> Transformed:
+    '''
+    Fix a module, like `fix_contents`. Pass the result to `retransform`
+    to fix a later version of the same module.
+    '''
+    options: dict[str, Any] = {
+        'with_count_equal': with_count_equal,
+        'keep_method_casing': keep_method_casing,
+        'test_bases': frozenset(test_bases),
+    }
+    if has_plain_line_breaks(source):
+        sources = _split(source)
+        try:
+            blocks = [
+                _find(
+                    block,
+                    i == len(sources) - 1,
+                    with_count_equal,
+                    test_bases,
+                )
+                for i, block in enumerate(sources)
+            ]
+            return _assemble(source, blocks, **options)
+        except (ValueError, IndexError):
+            # a block can't be fixed on its own (LostSentinel), or the
+            # fixers fail on a block of a broken module. Fixing it all in
+            # one go gives the output, or the SyntaxError, `fix_contents`
+            # would.
+            pass
+
+    output = fix_contents(source, **options)
+    return Transformed(source, output, **options)
+
+
+def _common_prefix(a: Sequence[str], b: Sequence[str]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def retransform(previous: Transformed, source: str) -> Transformed:
+    '''
+    Fix a new version of the module in `previous`. Only the top-level
+    blocks that were edited are fixed again; the rest are reused.
+
+    The result, or the SyntaxError raised, is identical to calling
+    `transform(source)`.
+    '''
+    options: dict[str, Any] = {
+        'with_count_equal': previous.with_count_equal,
+        'keep_method_casing': previous.keep_method_casing,
+        'test_bases': previous.test_bases,
+    }
+    if source == previous.source:
+        return previous
+    if not previous.blocks or not has_plain_line_breaks(source):
+        return transform(source, **options)
+
+    old = previous.source.splitlines(keepends=True)
+    new = source.splitlines(keepends=True)
+    blocks = previous.blocks
+    prefix = _common_prefix(old, new)
+    suffix = _common_prefix(old[::-1], new[::-1])
+    suffix = min(suffix, len(old) - prefix, len(new) - prefix)
+
+    # unchanged blocks at the start of the module
+    head, head_end = 0, 0
+    while (
+        head < len(blocks) and not blocks[head].last and
+        head_end + blocks[head].lines <= prefix
+    ):
+        head_end += blocks[head].lines
+        head += 1
+
+    # unchanged blocks at the end of the module
+    tail, tail_start = len(blocks), len(old)
+    while (
+        tail > head and
+        tail_start - blocks[tail - 1].lines >= len(old) - suffix
+    ):
+        tail -= 1
+        tail_start -= blocks[tail].lines
+    shift = len(new) - len(old)
+
+    # the edited region must start and end on a blank line (or the edges
+    # of the module), just like blocks are split from scratch
+    while head and head_end < len(new) and new[head_end].strip():
+        head -= 1
+        head_end -= blocks[head].lines
+    while tail < len(blocks) and tail_start + shift and (
+        new[tail_start + shift].strip()
+    ):
+        tail_start += blocks[tail].lines
+        tail += 1
+    if tail == len(blocks) and head_end == len(new) and head:
+        # the last block must be the one at the end of the module
+        head -= 1
+        head_end -= blocks[head].lines
+
+    edited = ''.join(new[head_end:tail_start + shift])
+    try:
+        sources = _split(edited) if edited else []
+    except SyntaxError:
+        return transform(source, **options)
+    ends_module = tail == len(blocks)
+    try:
+        refound = [
+            _find(
+                block,
+                ends_module and i == len(sources) - 1,
+                previous.with_count_equal,
+                previous.test_bases,
+            )
+            for i, block in enumerate(sources)
+        ]
+        return _assemble(
+            source,
+            [*blocks[:head], *refound, *blocks[tail:]],
+            **options,
+        )
+    except (ValueError, IndexError):
+        # as in `transform`
+        return transform(source, **options)
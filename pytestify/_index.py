@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple
+
+from pytestify import _hooks
+from pytestify._ast_helpers import NodeVisitor, ast_parse
+from pytestify.fixes.base_class import base_name
+
+VERSION = 1
+
+# class name -> the names of its bases
+Classes = Dict[str, List[str]]
+
+
+class _Scan(NamedTuple):
+    path: str
+    hash: str
+    classes: Classes | None  # None if the cached entry is still valid
+
+
+class ClassVisitor(NodeVisitor):
+    def __init__(self) -> None:
+        self.classes: Classes = {}
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        bases = self.classes.setdefault(node.name, [])
+        for base in node.bases:
+            name = base_name(base)
+            if name is not None and name not in bases:
+                bases.append(name)
+        self.generic_visit(node)
+
+
+def _scan(task: tuple[str, str | None]) -> _Scan:
+    path, cached_hash = task
+    contents = Path(path).read_bytes()
+    digest = hashlib.sha256(contents).hexdigest()
+    if digest == cached_hash:
+        return _Scan(path, digest, None)
+
+    try:
+        tree = ast_parse(contents.decode())
+    except (SyntaxError, UnicodeDecodeError):
+        return _Scan(path, digest, {})
+    visitor = ClassVisitor()
+    visitor.visit(tree)
+    return _Scan(path, digest, visitor.classes)
+
+
+class ClassIndex:
+    '''
+    The classes defined across every input file, and their bases, so that
+    classes inheriting from TestCase through a class in another module can
+    be recognized. Classes are matched by name alone.
+    '''
+
+    def __init__(self, files: dict[str, tuple[str, Classes]]) -> None:
+        self.files = files
+
+    @classmethod
+    def load(cls, cache: Path) -> ClassIndex:
+        try:
+            data = json.loads(cache.read_text())
+        except (OSError, ValueError):
+            return cls({})
+        if data.get('version') != VERSION:
+            return cls({})
+        return cls({
+            path: (entry['hash'], entry['classes'])
+            for path, entry in data['files'].items()
+        })
+
+    def save(self, cache: Path) -> None:
+        data = {
+            'version': VERSION,
+            'files': {
+                path: {'hash': digest, 'classes': classes}
+                for path, (digest, classes) in self.files.items()
+            },
+        }
+        tmp = cache.with_name(cache.name + '.tmp')
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, cache)
+
+    def update(self, paths: Iterable[str], *, jobs: int = 1) -> None:
+        '''
+        Rescan any of `paths` whose contents have changed. Files indexed by
+        earlier runs are kept, so that a run on part of a project still
+        knows the classes in the rest of it, unless they no longer exist.
+        '''
+        keys = [os.path.abspath(path) for path in paths]
+        tasks = [(key, self.files.get(key, (None,))[0]) for key in keys]
+        if jobs > 1:
+            with ProcessPoolExecutor(jobs) as executor:
+                scans = list(executor.map(_scan, tasks, chunksize=64))
+        else:
+            scans = [_scan(task) for task in tasks]
+
+        scanned = set(keys)
+        files = {
+            path: entry
+            for path, entry in self.files.items()
+            if path in scanned or os.path.exists(path)
+        }
+        for scan in scans:
+            if scan.classes is None:
+                _hooks.cache_hit('class index', scan.path)
+            else:
+                _hooks.cache_miss('class index', scan.path)
+                files[scan.path] = (scan.hash, scan.classes)
+        self.files = files
+
+    def test_bases(self) -> frozenset[str]:
+        ''' The names of every class that inherits from TestCase '''
+        subclasses: dict[str, set[str]] = {}
+        for _, classes in self.files.values():
+            for name, bases in classes.items():
+                for base in bases:
+                    subclasses.setdefault(base, set()).add(name)
+
+        found: set[str] = set()
+        todo = ['TestCase']
+        while todo:
+            for name in subclasses.get(todo.pop(), ()):
+                if name not in found:
+                    found.add(name)
+                    todo.append(name)
+        found.discard('TestCase')
+        return frozenset(found)
+
+
+def build_index(
+    paths: Iterable[str],
+    cache: Path | None = None,
+    *,
+    jobs: int = 1,
+) -> ClassIndex:
+    index = ClassIndex.load(cache) if cache is not None else ClassIndex({})
+    index.update(paths, jobs=jobs)
+    if cache is not None:
+        index.save(cache)
+    return index
@@ -0,0 +1,221 @@
+'''
+A census of the unittest APIs a tree uses, to plan its conversion. Files
+are only parsed, never tokenized or rewritten, so it's much quicker than
+running pytestify itself.
+'''
+from __future__ import annotations
+
+import ast
+import csv
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Sequence, TextIO
+
+from pytestify._ast_helpers import NodeVisitor
+from pytestify.fixes import funcs, method_name
+from pytestify.fixes.asserts import ASSERT_TYPES
+from pytestify.fixes.base_class import base_name
+
+# the names in funcs.REWRITES, as its visitor matches them
+_FUNCS = frozenset(re.sub(r'[^\w\s]', '', f) for f in funcs.REWRITES)
+
+# TestCase APIs that pytestify leaves alone, so they break (or mean
+# something else) once a class no longer inherits from TestCase. Listed
+# here rather than taken from `dir(unittest.TestCase)`, so the counts
+# don't depend on which Python runs the inventory.
+UNCONVERTIBLE = frozenset({
+    'addClassCleanup',
+    'addCleanup',
+    'addTypeEqualityFunc',
+    'assertDictContainsSubset',
+    'assertLogs',
+    'assertMultiLineEqual',
+    'assertNoLogs',
+    'assertNotAlmostEqual',
+    'assertNotAlmostEquals',
+    'assertNotIsInstance',
+    'assertNotRegexpMatches',
+    'assertRaisesRegex',
+    'assertRaisesRegexp',
+    'assertRegexpMatches',
+    'assertSequenceEqual',
+    'assertTupleEqual',
+    'assertWarnsRegex',
+    'assert_',
+    'doCleanups',
+    'enterClassContext',
+    'enterContext',
+    'failIf',
+    'failIfAlmostEqual',
+    'failIfEqual',
+    'failUnless',
+    'failUnlessAlmostEqual',
+    'failUnlessEqual',
+    'failUnlessRaises',
+    'failureException',
+    'id',
+    'longMessage',
+    'maxDiff',
+    'shortDescription',
+    'subTest',
+})
+
+# unconvertible methods whose names are also common attributes of test
+# classes, like the `self.id` of a model in a Django test, so they're only
+# counted when they're called
+_CALLED_ONLY = frozenset({'id'})
+
+# what a camelCase test method is counted as, among the setUp/tearDown
+# methods in the 'methods' category
+CAMEL_CASE_TESTS = 'camelCase tests'
+
+# every count needs one of these in the source, so files without any of
+# them, like most modules in a large tree, aren't parsed at all
+_NEEDLES = ('self', 'cls', 'unittest', *method_name.REWRITES)
+
+# category -> name -> how many times it's used
+Counts = Dict[str, Dict[str, int]]
+
+
+class FileInventory(NamedTuple):
+    path: str
+    counts: Counts
+    error: str | None = None
+
+
+class Visitor(NodeVisitor):
+    def __init__(self) -> None:
+        self.counts: Counts = {}
+        self.test_classes: set[str] = set()
+        self.test_class_depth = 0
+
+    def _count(self, category: str, name: str) -> None:
+        names = self.counts.setdefault(category, {})
+        names[name] = names.get(name, 0) + 1
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        # TestCase, IsolatedAsyncioTestCase, Django's TestCase and so on,
+        # or a test class from earlier in the module
+        is_test_class = any(
+            name is not None and (
+                name.endswith('TestCase') or name in self.test_classes
+            )
+            for name in map(base_name, node.bases)
+        )
+        if is_test_class:
+            self.test_classes.add(node.name)
+            self.test_class_depth += 1
+        self.generic_visit(node)
+        if is_test_class:
+            self.test_class_depth -= 1
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        # the methods that method_name.rewrite_method_name renames
+        arguments = node.args.args
+        if node.name in method_name.REWRITES:
+            self._count('methods', node.name)
+        elif (
+            node.name.startswith('test') and not node.name.islower() and
+            len(arguments) and arguments[0].arg == 'self'
+        ):
+            self._count('methods', CAMEL_CASE_TESTS)
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        owner = getattr(node.value, 'id', None)
+        if owner == 'self' and node.attr in ASSERT_TYPES:
+            self._count('asserts', node.attr)
+        elif owner in ('self', 'unittest') and node.attr in _FUNCS:
+            self._count('funcs', node.attr)
+        elif (
+            self.test_class_depth and owner in ('self', 'cls') and
+            node.attr in UNCONVERTIBLE and node.attr not in _CALLED_ONLY
+        ):
+            self._count('unconvertible', node.attr)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if (
+            self.test_class_depth and isinstance(func, ast.Attribute) and
+            getattr(func.value, 'id', None) in ('self', 'cls') and
+            func.attr in _CALLED_ONLY
+        ):
+            self._count('unconvertible', func.attr)
+        self.generic_visit(node)
+
+
+def scan(contents: str) -> Counts:
+    if not any(needle in contents for needle in _NEEDLES):
+        return {}
+    counts: Counts = Visitor().visit_text(contents).counts
+    return counts
+
+
+def inventory_file(path: str) -> FileInventory:
+    try:
+        return FileInventory(path, scan(Path(path).read_text()))
+    except (OSError, SyntaxError, ValueError) as e:
+        # ValueError includes UnicodeDecodeError, and null bytes
+        return FileInventory(path, {}, error=f'{type(e).__name__}: {e}')
+
+
+def inventory(
+    paths: Iterable[str],
+    *,
+    jobs: int = 1,
+) -> Iterator[FileInventory]:
+    ''' Count the unittest APIs in each file, in the order of `paths` '''
+    if jobs == 1:
+        yield from map(inventory_file, paths)
+        return
+    # parsing is all CPU, so it's spread over processes. Chunks keep the
+    # cost of sending paths and counts back and forth down.
+    with ProcessPoolExecutor(jobs) as executor:
+        yield from executor.map(inventory_file, paths, chunksize=16)
+
+
+def total(results: Iterable[FileInventory]) -> Counts:
+    counts: Counts = {}
+    for result in results:
+        for category, names in result.counts.items():
+            totals = counts.setdefault(category, {})
+            for name, count in names.items():
+                totals[name] = totals.get(name, 0) + count
+    return counts
+
+
+def _sorted(counts: Counts) -> Counts:
+    return {
+        category: dict(sorted(counts[category].items()))
+        for category in sorted(counts)
+    }
+
+
+def write_json(results: Sequence[FileInventory], out: TextIO) -> None:
+    json.dump(
+        {
+            'files': len(results),
+            'total': _sorted(total(results)),
+            'by_file': {
+                r.path: _sorted(r.counts) for r in results if r.counts
+            },
+            'errors': {r.path: r.error for r in results if r.error},
+        },
+        out,
+        indent=2,
+    )
+    out.write('\n')
+
+
+def write_csv(results: Sequence[FileInventory], out: TextIO) -> None:
+    ''' One row per file and name, after the totals (whose path is '*') '''
+    writer = csv.writer(out)
+    writer.writerow(['path', 'category', 'name', 'count'])
+    everything = [FileInventory('*', total(results)), *results]
+    for result in everything:
+        for category, names in _sorted(result.counts).items():
+            for name, count in names.items():
+                writer.writerow([result.path, category, name, count])
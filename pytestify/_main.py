@@ -1,98 +1,1197 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import contextlib
+import difflib
+import itertools
+import os
+import socket
+import sys
+import time
 import traceback
+from concurrent.futures import (
+    Executor, ProcessPoolExecutor, ThreadPoolExecutor,
+)
 from pathlib import Path
-from typing import Sequence
+from typing import (
+    IO, Iterable, Iterator, NamedTuple, Sequence, TextIO, Tuple, TypeVar,
+)
 
+from pytestify import _hooks
+from pytestify._archive import fix_archive
 from pytestify._ast_helpers import is_valid_syntax
-from pytestify.fixes.asserts import rewrite_asserts
-from pytestify.fixes.base_class import remove_base_class
-from pytestify.fixes.funcs import rewrite_pytest_funcs
-from pytestify.fixes.imports import add_pytest_import
-from pytestify.fixes.method_name import rewrite_method_name
+from pytestify._git import CatFile, GitError, python_blobs, resolve_tree
+from pytestify._hooks import CacheCount, CacheStats, ChromeTrace, Event
+from pytestify._index import build_index
+from pytestify._inventory import inventory, write_csv, write_json
+from pytestify._profile import (
+    Profiles, ProfilingExecutor, RawStats, merge, run_profiled, sampled,
+)
+from pytestify._progress import Progress
+from pytestify._queue import Outcome, Task, WorkQueue
+from pytestify._schedule import (
+    estimate_costs, load_costs, save_costs, schedule, utilization,
+)
+from pytestify._split import fix_contents_in_chunks
+from pytestify._transform import fix_contents, no_ws
+from pytestify._verify import describe, verify
+from pytestify._workers import (
+    TaskError, WorkerError, WorkerPool, kill_executor, thread_imap_unordered,
+)
+from pytestify._writer import JOURNAL, FileWriter, rollback
+
+T = TypeVar('T')
+
+# the path of a file that isn't on disk, and its contents
+Source = Tuple[str, bytes]
 
 
 class RuntimeNotes:
-    def __init__(self) -> None:
+    def __init__(self, out: TextIO) -> None:
         self.any_invalid_syntax = False
+        self.out = out
+
+
+class FileResult(NamedTuple):
+    path: str
+    contents: str | None = None  # the fixed source, if anything changed
+    skipped: str | None = None  # the reason a file was skipped
+    traceback: str | None = None
+    elapsed: float = 0.0
+    size: int = 0
+    trace: tuple[Event, ...] = ()  # events from a worker process
+    caches: tuple[CacheCount, ...] = ()  # cache use in a worker process
+    profile: RawStats | None = None  # cProfile stats, if it was profiled
+
+
+def _fix_contents(
+    contents: str,
+    args: argparse.Namespace,
+    executor: Executor | None = None,
+) -> str:
+    if executor is not None:
+        return fix_contents_in_chunks(
+            contents,
+            executor,
+            chunks=max(args.jobs, args.threads) * 4,
+            with_count_equal=args.with_count_equal,
+            keep_method_casing=args.keep_method_casing,
+            test_bases=args.test_bases,
+            timeout=args.timeout_per_file,
+        )
+    return fix_contents(
+        contents,
+        with_count_equal=args.with_count_equal,
+        keep_method_casing=args.keep_method_casing,
+        test_bases=args.test_bases,
+    )
+
 
+def _skip_reason(contents: str) -> str:
+    if is_valid_syntax(contents):
+        return 'because of an issue with pytestify'
+    else:
+        return 'due to the source file having invalid syntax'
 
-def _no_ws(s: str) -> str:
-    """ strip all whitespace from a string """
-    return ''.join(s.split())
+
+def _iter_files(filepaths: Iterable[str]) -> Iterator[str]:
+    for filepath in filepaths:
+        path = Path(filepath)
+        if not path.exists():
+            ValueError(f"Path: '{filepath}' does not exist")
+        if path.is_dir():
+            yield from (str(f) for f in path.glob('**/*.py'))
+        else:
+            yield str(path)
+
+
+def _process_file(
+    path: str,
+    args: argparse.Namespace,
+    executor: Executor | None = None,
+) -> FileResult:
+    '''
+    Fix a single file, without writing or printing anything. This runs in
+    worker processes, so it must stay picklable and free of side effects.
+    '''
+    if args.cprofile_out and sampled(path, args.cprofile_sample):
+        # the pieces of a split file are profiled where they're fixed
+        pieces = ProfilingExecutor(executor) if executor else None
+        result, stats = run_profiled(
+            lambda: _observe_file(path, args, pieces),
+        )
+        if pieces is not None:
+            stats = merge([stats, *pieces.stats])
+        return result._replace(profile=stats)
+    return _observe_file(path, args, executor)
 
 
-def _fix_path(
-    filepath: str | Path,
+def _observe_file(
+    path: str,
+    args: argparse.Namespace,
+    executor: Executor | None,
+) -> FileResult:
+    if os.getpid() == args.main_pid or not (args.trace or args.stats):
+        return _fix_file(path, args, executor)
+
+    # subscribers in the main process never see a worker's events, so
+    # they're recorded here and sent back with the result
+    trace = ChromeTrace()
+    stats = CacheStats()
+    with _hooks.only(trace, stats) if args.trace else _hooks.only(stats):
+        result = _fix_file(path, args, executor)
+    return result._replace(trace=tuple(trace.events), caches=stats.counts())
+
+
+def _fix_file(
+    path: str,
+    args: argparse.Namespace,
+    executor: Executor | None,
+) -> FileResult:
+    _hooks.file_start(path)
+    changed = False
+    try:
+        result = _fix_file_contents(path, args, executor)
+        changed = result.contents is not None
+        return result
+    finally:
+        _hooks.file_end(path, changed)
+
+
+def _fix_file_contents(
+    path: str,
+    args: argparse.Namespace,
+    executor: Executor | None,
+) -> FileResult:
+    size = os.path.getsize(path)
+    max_size = args.max_file_size
+    if max_size is not None and size > max_size:
+        return FileResult(
+            path,
+            skipped=f'because it is larger than {max_size} bytes',
+            size=size,
+        )
+
+    start = time.perf_counter()
+    orig_contents = Path(path).read_text()
+    try:
+        contents = _fix_contents(orig_contents, args, executor)
+    except SyntaxError:
+        return FileResult(
+            path,
+            skipped=_skip_reason(orig_contents),
+            traceback=traceback.format_exc(),
+            elapsed=time.perf_counter() - start,
+            size=size,
+        )
+
+    elapsed = time.perf_counter() - start
+    if no_ws(contents) == no_ws(orig_contents):
+        return FileResult(path, elapsed=elapsed, size=size)
+    return FileResult(path, contents=contents, elapsed=elapsed, size=size)
+
+
+def _report(
+    result: FileResult,
     args: argparse.Namespace,
     notes: RuntimeNotes,
+    *,
+    writer: FileWriter | None = None,
 ) -> int:
-    path = Path(filepath)
-    if not path.exists():
-        ValueError(f"Path: '{filepath}' does not exist")
-    if path.is_dir():
-        return sum(_fix_path(f, args, notes) for f in path.glob('**/*.py'))
+    if result.skipped is not None:
+        _hooks.skip(result.path, result.skipped)
+        print(f'Skipping {result.path} {result.skipped}', file=notes.out)
+        if result.traceback is not None:
+            notes.any_invalid_syntax = True
+            if args.show_traceback:
+                print(result.traceback, end='', file=sys.stderr)
+        return 0
+    if result.contents is None:
+        return 0
+
+    if writer is not None and not writer.write(result.path, result.contents):
+        return 0
+    print(f'Fixing {result.path}', file=notes.out)
+    return 1
+
+
+def _rollback(journal: Path) -> int:
+    if not journal.is_dir():
+        print(f'There is no journal at {journal}', file=sys.stderr)
+        return 1
+    ret = 0
+    for result in rollback(journal):
+        if result.restored:
+            print(f'Restoring {result.path}')
+        else:
+            ret += 1
+            print(
+                f'Not restoring {result.path}, since it changed after '
+                'pytestify rewrote it',
+            )
+    return ret
+
+
+def _divert_large(
+    files: Iterable[str],
+    threshold: int,
+    large: list[str],
+) -> Iterator[str]:
+    for path in files:
+        if os.path.getsize(path) > threshold:
+            large.append(path)
+        else:
+            yield path
+
 
-    orig_contents = path.read_text()
-    is_valid = is_valid_syntax(orig_contents)
+def _fix_files(
+    files: Iterable[str],
+    args: argparse.Namespace,
+    progress: Progress,
+) -> Iterator[FileResult]:
+    # very large files are split up and fixed by every worker at once,
+    # after the rest are done
+    large: list[str] = []
+    workers = max(args.jobs, args.threads)
+    if args.split_threshold is not None and workers > 1:
+        files = _divert_large(files, args.split_threshold, large)
 
-    # apply fixes
+    yield from _fix_whole_files(files, args, progress)
+    if large:
+        yield from _fix_large_files(large, args, progress)
+
+
+def _split_executor(args: argparse.Namespace) -> Executor:
+    if args.threads > 1:
+        return ThreadPoolExecutor(args.threads)
+    return ProcessPoolExecutor(args.jobs)
+
+
+def _fix_large_files(
+    large: list[str],
+    args: argparse.Namespace,
+    progress: Progress,
+) -> Iterator[FileResult]:
+    '''
+    Fix each file split up across every worker. As with whole files, one
+    that fails or takes too long is skipped, rather than ending the run.
+    '''
+    executor = _split_executor(args)
     try:
-        # if either of the following two rewrites occur,
-        # we can assume it's a test file
-        contents = remove_base_class(orig_contents)
-        contents = rewrite_asserts(
-            contents,
-            with_count_equal=args.with_count_equal,
+        for path in large:
+            progress.start(path)
+            try:
+                result = _process_file(path, args, executor)
+            except concurrent.futures.TimeoutError:
+                result = FileResult(
+                    path,
+                    skipped='because it took longer than '
+                    f'{args.timeout_per_file} seconds',
+                )
+                # its pieces can only be abandoned with their processes
+                kill_executor(executor)
+                executor = _split_executor(args)
+            except Exception as e:
+                result = FileResult(
+                    path,
+                    skipped=f'because of {type(e).__name__}: {e}',
+                    traceback=traceback.format_exc(),
+                )
+            yield result
+    finally:
+        executor.shutdown()
+
+
+def _fix_whole_files(
+    files: Iterable[str],
+    args: argparse.Namespace,
+    progress: Progress,
+) -> Iterator[FileResult]:
+    workers = max(args.jobs, args.threads)
+    batches: Iterable[Sequence[str]]
+    if workers > 1 and not args.files_from:
+        recorded = load_costs(Path(args.costs)) if args.costs else {}
+        batches = schedule(estimate_costs(files, recorded), workers)
+    else:
+        # a streamed list of files is fixed in the order it arrives
+        batches = ([path] for path in files)
+
+    if args.threads > 1:
+        for path, outcome in thread_imap_unordered(
+            _process_file,
+            args,
+            itertools.chain.from_iterable(batches),
+            threads=args.threads,
+            on_start=progress.start,
+        ):
+            if isinstance(outcome, TaskError):
+                yield _lost(path, outcome)
+            else:
+                yield outcome
+        return
+    if args.jobs == 1 and args.timeout_per_file is None:
+        for batch in batches:
+            for path in batch:
+                progress.start(path)
+                yield _process_file(path, args)
+        return
+
+    # a stuck file can only be abandoned by killing the process fixing it,
+    # so per-file timeouts always need a worker process
+    with WorkerPool(
+        _process_file,
+        args,
+        jobs=args.jobs,
+        timeout=args.timeout_per_file,
+    ) as pool:
+        for path, result in pool.imap_batches(
+            batches,
+            on_start=progress.start,
+        ):
+            if isinstance(result, WorkerError):
+                yield _lost(path, result)
+            else:
+                yield result
+
+
+def _lost(path: str, error: WorkerError) -> FileResult:
+    ''' The result of a file whose worker didn't fix it '''
+    if isinstance(error, TaskError):
+        return FileResult(path, skipped=str(error), traceback=error.traceback)
+    return FileResult(path, skipped=str(error))
+
+
+def _fix_stdin(args: argparse.Namespace, notes: RuntimeNotes) -> int:
+    orig_contents = sys.stdin.read()
+    try:
+        contents = _fix_contents(orig_contents, args)
+    except SyntaxError:
+        # pass the source through untouched, so pipes don't lose it
+        _report(
+            FileResult(
+                '<stdin>',
+                skipped=_skip_reason(orig_contents),
+                traceback=traceback.format_exc(),
+            ),
+            args,
+            notes,
         )
+        contents = orig_contents
 
-        is_unittest_file = _no_ws(contents) != _no_ws(orig_contents)
-        if is_unittest_file:
-            # the camelCase rewrite is especially risky,
-            # only do it if we're sure it's a test file
-            contents = rewrite_method_name(
-                contents,
-                keep_casing=args.keep_method_casing,
-            )
-        contents = rewrite_pytest_funcs(contents)
-        contents = add_pytest_import(contents)
+    sys.stdout.write(contents)
+    return int(no_ws(contents) != no_ws(orig_contents))
 
-        if not contents.endswith('\n'):
-            contents += '\n'
 
+def _fix_source(item: Source, args: argparse.Namespace) -> FileResult:
+    ''' Fix the source of a file that isn't on disk, e.g. in an archive '''
+    path, data = item
+    start = time.perf_counter()
+    try:
+        orig_contents = data.decode()
+    except UnicodeDecodeError:
+        return FileResult(
+            path,
+            skipped='because it is not UTF-8',
+            size=len(data),
+        )
+    try:
+        contents = _fix_contents(orig_contents, args)
     except SyntaxError:
-        if is_valid:
-            reason = 'because of an issue with pytestify'
+        return FileResult(
+            path,
+            skipped=_skip_reason(orig_contents),
+            traceback=traceback.format_exc(),
+            elapsed=time.perf_counter() - start,
+            size=len(data),
+        )
+    elapsed = time.perf_counter() - start
+    if no_ws(contents) == no_ws(orig_contents):
+        return FileResult(path, elapsed=elapsed, size=len(data))
+    return FileResult(
+        path,
+        contents=contents,
+        elapsed=elapsed,
+        size=len(data),
+    )
+
+
+def _fix_archive(args: argparse.Namespace, notes: RuntimeNotes) -> int:
+    src_name, dst_name = args.archive
+    ret = 0
+
+    def fix(name: str, data: bytes) -> bytes | None:
+        nonlocal ret
+        result = _fix_source((f'{src_name}:{name}', data), args)
+        ret += _report(result, args, notes)
+        if result.contents is None:
+            return None
+        return result.contents.encode()
+
+    if src_name == '-':
+        src = sys.stdin.buffer
+    else:
+        src = open(src_name, 'rb')
+    with src:
+        if dst_name == '-':
+            fix_archive(src, sys.stdout.buffer, fix)
+            sys.stdout.buffer.flush()
         else:
-            reason = 'due to the source file having invalid syntax'
-        print(f'Skipping {path} {reason}')
-        notes.any_invalid_syntax = True
-        if args.show_traceback:
-            traceback.print_exc()
-        return 0
+            tmp = f'{dst_name}.tmp'
+            with open(tmp, 'wb') as dst:
+                fix_archive(src, dst, fix)
+            os.replace(tmp, dst_name)
+    return ret
+
+
+def _read_paths(stream: IO[bytes]) -> Iterator[str]:
+    '''
+    Yield newline- or NUL-separated paths as soon as they're read, so
+    that processing can start while the list is still being written
+    '''
+    # read1 returns whatever is available, rather than waiting for more
+    read = getattr(stream, 'read1', None) or stream.read
+    sep = None
+    buf = b''
+    while True:
+        chunk = read(64 * 1024)
+        if not chunk:
+            break
+        buf += chunk
+        if sep is None:
+            if b'\0' in buf:
+                sep = b'\0'
+            elif b'\n' in buf:
+                sep = b'\n'
+            else:
+                continue
+        *entries, buf = buf.split(sep)
+        for entry in entries:
+            if sep == b'\n':
+                entry = entry.rstrip(b'\r')
+            if entry:
+                yield os.fsdecode(entry)
+    if sep != b'\0':
+        buf = buf.rstrip(b'\r\n')
+    if buf:
+        yield os.fsdecode(buf)
+
+
+def _files_from(name: str) -> Iterator[str]:
+    if name == '-':
+        yield from _read_paths(sys.stdin.buffer)
+    else:
+        with open(name, 'rb') as f:
+            yield from _read_paths(f)
+
+
+def _fraction(s: str) -> float:
+    n = float(s)
+    if not 0 < n <= 1:
+        raise argparse.ArgumentTypeError(f'{s} is not between 0 and 1')
+    return n
+
 
-    changes_made = bool(_no_ws(contents) != _no_ws(orig_contents))
-    if changes_made:
-        print(f'Fixing {path}')
-        path.write_text(contents)
-    return int(changes_made)
+def _job_count(s: str) -> int:
+    n = int(s)
+    if n < 0:
+        raise argparse.ArgumentTypeError(f'{s} is negative')
+    return n or os.cpu_count() or 1
+
+
+def _verify_main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog='pytestify verify',
+        description=(
+            'Run the tests in each module under unittest, and its converted '
+            'source under pytest, then report any module where a test '
+            'passes, fails, is skipped or xfails under one and not the '
+            'other. Nothing is rewritten.'
+        ),
+    )
+    parser.add_argument('filepaths', nargs='+', help='files or folders')
+    parser.add_argument(
+        '-j', '--jobs', type=_job_count, default=1, metavar='N',
+        help='verify N modules at a time (0 means one per CPU)',
+    )
+    parser.add_argument(
+        '--cache', metavar='FILE',
+        help="remember results in FILE, to skip modules that haven't changed",
+    )
+    parser.add_argument('--with-count-equal', action='store_true')
+    parser.add_argument('--keep-method-casing', action='store_true')
+    args = parser.parse_args(argv)
+    args.test_bases = frozenset()
+
+    def convert(contents: str) -> str:
+        try:
+            return _fix_contents(contents, args)
+        except SyntaxError:
+            return contents
+
+    start = time.monotonic()
+    ret = 0
+    count = 0
+    cached = 0
+    for result in verify(
+        _iter_files(args.filepaths),
+        convert,
+        jobs=args.jobs,
+        cache=Path(args.cache) if args.cache else None,
+    ):
+        count += 1
+        cached += result.cached
+        if result.problem is not None:
+            ret += 1
+            print(f"Couldn't verify {result.path} {result.problem}")
+        elif result.differs:
+            ret += 1
+            unittest_seconds, pytest_seconds = result.seconds
+            print(
+                f'Outcomes differ for {result.path}\n'
+                f'  unittest: {describe(result.unittest)} '
+                f'({unittest_seconds:.2f}s)\n'
+                f'  pytest:   {describe(result.pytest)} '
+                f'({pytest_seconds:.2f}s)',
+            )
+            for name, before, after in result.changes():
+                print(f'    {name}: {before} -> {after}')
+    print(
+        f'Verified {count} modules ({cached} cached) in '
+        f'{time.monotonic() - start:.2f}s: {ret} differ',
+    )
+    return ret
+
+
+def _inventory_main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog='pytestify inventory',
+        description=(
+            'Count the unittest asserts, decorators, method names and other '
+            'APIs each file uses, including those pytestify can\'t convert. '
+            'Files are only parsed, so this is much quicker than fixing '
+            'them. Nothing is rewritten.'
+        ),
+    )
+    parser.add_argument('filepaths', nargs='+', help='files or folders')
+    parser.add_argument(
+        '-j', '--jobs', type=_job_count, default=1, metavar='N',
+        help='scan files in N worker processes (0 means one per CPU)',
+    )
+    parser.add_argument(
+        '--format', choices=('json', 'csv'), default='json',
+        help='(default: %(default)s)',
+    )
+    parser.add_argument(
+        '-o', '--output', metavar='FILE', default='-',
+        help="where to write the counts (default: '-', stdout)",
+    )
+    args = parser.parse_args(argv)
+
+    results = list(inventory(_iter_files(args.filepaths), jobs=args.jobs))
+    write = write_json if args.format == 'json' else write_csv
+    if args.output == '-':
+        write(results, sys.stdout)
+    else:
+        with open(args.output, 'w', newline='') as f:
+            write(results, f)
+    errors = [r for r in results if r.error]
+    for result in errors:
+        print(f'Skipped {result.path}: {result.error}', file=sys.stderr)
+    return 1 if errors else 0
+
+
+def _lines(contents: str) -> list[str]:
+    # only '\n' ends a line for git, unlike str.splitlines
+    lines = [line + '\n' for line in contents.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+
+def _unified_diff(path: str, before: str, after: str) -> str:
+    ''' A diff of a file in the form `git apply` takes '''
+    out = [f'diff --git a/{path} b/{path}\n']
+    for line in difflib.unified_diff(
+        _lines(before), _lines(after), f'a/{path}', f'b/{path}',
+    ):
+        if not line.endswith('\n'):
+            line += '\n\\ No newline at end of file\n'
+        out.append(line)
+    return ''.join(out)
+
+
+def _chunks(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    it = iter(items)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _fix_sources(
+    sources: Iterable[Source],
+    args: argparse.Namespace,
+) -> Iterator[tuple[Source, FileResult]]:
+    ''' Fix each source, in worker processes with --jobs, in order '''
+    if args.jobs == 1:
+        for source in sources:
+            yield source, _fix_source(source, args)
+        return
+
+    order: dict[str, int] = {}
+
+    def numbered() -> Iterator[Source]:
+        for i, source in enumerate(sources):
+            order[source[0]] = i
+            yield source
+
+    # results that arrived before those of earlier files
+    early: dict[int, tuple[Source, FileResult]] = {}
+    next_result = 0
+    with WorkerPool(_fix_source, args, jobs=args.jobs) as pool:
+        for source, result in pool.imap_batches(_chunks(numbered(), 16)):
+            if isinstance(result, WorkerError):
+                result = _lost(source[0], result)
+            early[order.pop(source[0])] = (source, result)
+            while next_result in early:
+                yield early.pop(next_result)
+                next_result += 1
+
+
+def _revision_main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog='pytestify revision',
+        description=(
+            'Fix the .py files of a git revision in memory, reading them '
+            "from the repository's object store rather than a checkout, and "
+            'print a diff of what would change, or a report. Nothing is '
+            'rewritten.'
+        ),
+    )
+    parser.add_argument('rev', help='a commit, branch, tag or tree')
+    parser.add_argument(
+        'paths', nargs='*',
+        help='only fix files under these paths, from the top of the repo',
+    )
+    parser.add_argument(
+        '-C', '--repo', default='.', metavar='DIR',
+        help='the git repository (default: the current directory)',
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=_job_count, default=1, metavar='N',
+        help='fix files in N worker processes (0 means one per CPU)',
+    )
+    parser.add_argument(
+        '--format', choices=('diff', 'report'), default='diff',
+        help=(
+            'a diff that `git apply` takes, or a line per file that would '
+            'change (default: %(default)s)'
+        ),
+    )
+    parser.add_argument(
+        '-o', '--output', metavar='FILE', default='-',
+        help="where to write the diff or report (default: '-', stdout)",
+    )
+    parser.add_argument('--with-count-equal', action='store_true')
+    parser.add_argument('--keep-method-casing', action='store_true')
+    parser.add_argument('--show-traceback', action='store_true')
+    args = parser.parse_intermixed_args(argv)
+    args.test_bases = frozenset()
+
+    try:
+        tree = resolve_tree(args.rev, repo=args.repo)
+    except GitError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.output == '-':
+        return _fix_revision(tree, args, sys.stdout)
+    with open(args.output, 'w') as out:
+        return _fix_revision(tree, args, out)
+
+
+def _fix_revision(tree: str, args: argparse.Namespace, out: TextIO) -> int:
+    # a diff keeps stdout to itself
+    notes = RuntimeNotes(out if args.format == 'report' else sys.stderr)
+    ret = 0
+    count = 0
+    with CatFile(repo=args.repo) as cat:
+        blobs = python_blobs(tree, args.paths, repo=args.repo)
+        sources = ((blob.path, data) for blob, data in cat.read(blobs))
+        for (path, data), result in _fix_sources(sources, args):
+            count += 1
+            if result.contents is None:
+                _report(result, args, notes)
+                continue
+            ret += 1
+            diff = _unified_diff(path, data.decode(), result.contents)
+            if args.format == 'diff':
+                out.write(diff)
+                continue
+            lines = diff.splitlines()[3:]
+            added = sum(line.startswith('+') for line in lines)
+            removed = sum(line.startswith('-') for line in lines)
+            print(f'Would fix {path} (+{added} -{removed})', file=out)
+    if args.format == 'report':
+        print(f'{ret} of {count} files would change', file=out)
+    if notes.any_invalid_syntax and not args.show_traceback:
+        print("\n(Hint: run again with '--show-traceback')", file=notes.out)
+    return ret
+
+
+# the options workers take from the queue, so every file is fixed alike
+QUEUE_SETTINGS = ('with_count_equal', 'keep_method_casing', 'max_file_size')
+
+
+def _queue_main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog='pytestify queue',
+        description=(
+            'Add files to a queue in a SQLite file, to be fixed by '
+            '`pytestify worker` processes on any machine that can reach it, '
+            'e.g. on a shared filesystem.'
+        ),
+    )
+    parser.add_argument('queue', metavar='DB', help='the queue to add to')
+    parser.add_argument('filepaths', nargs='*', help='files or folders')
+    parser.add_argument(
+        '--files-from', metavar='FILE',
+        help="read newline- or NUL-separated paths from FILE ('-' is stdin)",
+    )
+    parser.add_argument('--with-count-equal', action='store_true')
+    parser.add_argument('--keep-method-casing', action='store_true')
+    parser.add_argument(
+        '--max-file-size', type=int, metavar='BYTES',
+        help='skip any file larger than this',
+    )
+    parser.add_argument(
+        '--costs', metavar='FILE',
+        help=(
+            'queue the slowest files recorded in FILE first. With --wait, '
+            'record how long each file took'
+        ),
+    )
+    parser.add_argument(
+        '--wait', action='store_true',
+        help='report on files as workers finish them, until none are left',
+    )
+    parser.add_argument(
+        '--poll', type=float, default=1.0, metavar='SECONDS',
+        help='with --wait, how often to check the queue (default: 1)',
+    )
+    args = parser.parse_args(argv)
+
+    files: Iterable[str] = _iter_files(args.filepaths)
+    if args.files_from:
+        files_from = _iter_files(_files_from(args.files_from))
+        files = itertools.chain(files, files_from)
+    recorded = load_costs(Path(args.costs)) if args.costs else {}
+    costs = estimate_costs(files, recorded)
+    settings = {name: getattr(args, name) for name in QUEUE_SETTINGS}
+    with WorkQueue(Path(args.queue)) as queue:
+        if costs:
+            queue.add(costs, settings)
+            print(f'Queued {len(costs)} files in {args.queue}')
+        if not args.wait:
+            return 0
+        return _wait(queue, args, recorded)
+
+
+def _wait(
+    queue: WorkQueue,
+    args: argparse.Namespace,
+    costs: dict[str, float],
+) -> int:
+    ret = 0
+    seen = 0
+    owners = set()
+    while True:
+        # with no workers left, nothing else gives up on their files
+        queue.expire()
+        counts = queue.counts()
+        for seen, result in queue.finished(seen):
+            owners.add(result.owner)
+            if result.skipped is not None:
+                print(f'Skipping {result.path} {result.skipped}')
+            elif result.changed:
+                ret += 1
+                print(f'Fixing {result.path}')
+            costs[result.path] = result.elapsed
+        if not counts['pending'] and not counts['leased']:
+            break
+        time.sleep(args.poll)
+
+    if args.costs:
+        save_costs(Path(args.costs), costs)
+    owners.discard(None)
+    print(
+        f'{counts["done"]} files done by {len(owners)} worker(s): {ret} fixed',
+    )
+    return ret
+
+
+def _worker_main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog='pytestify worker',
+        description=(
+            'Fix the files in a queue made by `pytestify queue`, a batch at '
+            'a time, alongside any number of other workers. Exits once '
+            'every file is done.'
+        ),
+    )
+    parser.add_argument('queue', metavar='DB', help='the queue to work on')
+    parser.add_argument(
+        '--batch-size', type=int, default=8, metavar='N',
+        help='how many files to claim at a time (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--lease', type=float, default=60.0, metavar='SECONDS',
+        help=(
+            'how long files are held after this worker stops renewing its '
+            "lease, before they're given to other workers "
+            '(default: %(default)s)'
+        ),
+    )
+    parser.add_argument(
+        '--poll', type=float, default=1.0, metavar='SECONDS',
+        help=(
+            'how often to check for files whose lease has expired, once the '
+            'queue is otherwise empty (default: %(default)s)'
+        ),
+    )
+    parser.add_argument(
+        '--name',
+        default=f'{socket.gethostname()}:{os.getpid()}',
+        help='how to identify this worker in the queue (default: HOST:PID)',
+    )
+    parser.add_argument(
+        '--timeout-per-file', type=float, metavar='SECONDS',
+        help=(
+            'skip any file that takes longer than this, fixing files in a '
+            'child process that can be killed'
+        ),
+    )
+    parser.add_argument('--show-traceback', action='store_true')
+    args = parser.parse_args(argv)
+    args.main_pid = os.getpid()
+    args.jobs = args.threads = 1
+    args.trace = args.stats = False
+    args.cprofile_out = None
+    args.test_bases = frozenset()
+
+    notes = RuntimeNotes(sys.stdout)
+    with WorkQueue(Path(args.queue)) as queue:
+        settings = queue.settings
+        for name in QUEUE_SETTINGS:
+            setattr(args, name, settings.get(name))
+        ret = _work(queue, args, notes)
+    if notes.any_invalid_syntax and not args.show_traceback:
+        print("\n(Hint: run again with '--show-traceback')", file=notes.out)
+    return ret
+
+
+def _work(
+    queue: WorkQueue,
+    args: argparse.Namespace,
+    notes: RuntimeNotes,
+) -> int:
+    ret = 0
+    pool: WorkerPool[str, FileResult] | None = None
+    if args.timeout_per_file is not None:
+        pool = WorkerPool(
+            _process_file, args, jobs=1, timeout=args.timeout_per_file,
+        )
+    with pool or contextlib.nullcontext(), FileWriter() as writer:
+        while True:
+            tasks = queue.claim(args.name, args.batch_size, args.lease)
+            if not tasks:
+                if queue.next_expiry() is None:
+                    return ret
+                # other workers still hold files, which come back to the
+                # queue if they stop
+                time.sleep(args.poll)
+                continue
+
+            outcomes = []
+            # held until they're recorded as done, however long they take
+            with queue.keep_leased(args.name, tasks, args.lease):
+                for task, result in _fix_tasks(tasks, args, pool):
+                    fixed = _report(result, args, notes, writer=writer)
+                    ret += fixed
+                    outcomes.append(
+                        Outcome(
+                            task.id, bool(fixed), result.skipped,
+                            result.elapsed,
+                        ),
+                    )
+                # only recorded as done once the fixed files are in place
+                writer.commit()
+                queue.complete(args.name, outcomes)
+
+
+def _fix_tasks(
+    tasks: Sequence[Task],
+    args: argparse.Namespace,
+    pool: WorkerPool[str, FileResult] | None,
+) -> Iterator[tuple[Task, FileResult]]:
+    if pool is not None:
+        by_path = {task.path: task for task in tasks}
+        for path, result in pool.imap_batches([list(by_path)]):
+            if isinstance(result, WorkerError):
+                result = _lost(path, result)
+            yield by_path[path], result
+        return
+
+    for task in tasks:
+        try:
+            result = _process_file(task.path, args)
+        except Exception as e:
+            # recorded like any skipped file, rather than stopping the
+            # worker, and failing the rest of its batch with it
+            result = FileResult(
+                task.path,
+                skipped=f'because of {type(e).__name__}: {e}',
+                traceback=traceback.format_exc(),
+            )
+        yield task, result
 
 
 def main(argv: Sequence[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == 'verify':
+        return _verify_main(argv[1:])
+    if argv and argv[0] == 'inventory':
+        return _inventory_main(argv[1:])
+    if argv and argv[0] == 'revision':
+        return _revision_main(argv[1:])
+    if argv and argv[0] == 'queue':
+        return _queue_main(argv[1:])
+    if argv and argv[0] == 'worker':
+        return _worker_main(argv[1:])
+
     parser = argparse.ArgumentParser()
-    parser.add_argument('filepaths', nargs='*')
+    parser.add_argument(
+        'filepaths', nargs='*',
+        help="files or folders to fix. Use '-' to fix stdin into stdout",
+    )
+    parser.add_argument(
+        '--files-from', metavar='FILE',
+        help="read newline- or NUL-separated paths from FILE ('-' is stdin)",
+    )
+    parser.add_argument(
+        '--archive', nargs=2, metavar=('IN', 'OUT'),
+        help=(
+            'fix the .py files inside a zip file or tarball IN, writing a '
+            "new archive to OUT ('-' is stdin or stdout)"
+        ),
+    )
     parser.add_argument('--with-count-equal', action='store_true')
     parser.add_argument('--show-traceback', action='store_true')
     parser.add_argument('--keep-method-casing', action='store_true')
+    parser.add_argument(
+        '-j', '--jobs', type=_job_count, default=1, metavar='N',
+        help='fix files in N worker processes (0 means one per CPU)',
+    )
+    parser.add_argument(
+        '--threads', type=_job_count, default=1, metavar='N',
+        help=(
+            'fix files in N threads (0 means one per CPU). Best on '
+            'free-threaded builds of Python'
+        ),
+    )
+    parser.add_argument(
+        '--timeout-per-file', type=float, metavar='SECONDS',
+        help='skip any file that takes longer than this to fix',
+    )
+    parser.add_argument(
+        '--max-file-size', type=int, metavar='BYTES',
+        help='skip any file larger than this',
+    )
+    parser.add_argument(
+        '--split-threshold', type=int, metavar='BYTES',
+        help=(
+            'with --jobs, split files larger than this at top-level '
+            'statements and fix the pieces in parallel'
+        ),
+    )
+    parser.add_argument(
+        '--costs', metavar='FILE',
+        help=(
+            'record how long each file takes to fix in FILE, to schedule '
+            'the slowest files first next time'
+        ),
+    )
+    parser.add_argument(
+        '--stats', action='store_true',
+        help='report how long fixing took, and how busy workers were',
+    )
+    parser.add_argument(
+        '--progress', action='store_const', const=True,
+        help=(
+            'show how many files are done, throughput, the slowest file in '
+            'progress and an ETA. On by default in a terminal'
+        ),
+    )
+    parser.add_argument(
+        '--no-progress', action='store_const', const=False, dest='progress',
+    )
+    parser.add_argument(
+        '--trace', metavar='FILE',
+        help=(
+            'write a Chrome trace of each file and fixer to FILE, to open '
+            'in a trace viewer like https://ui.perfetto.dev'
+        ),
+    )
+    parser.add_argument(
+        '--class-index', metavar='FILE',
+        help=(
+            'before fixing, index the classes in every file (cached in FILE) '
+            'to find classes inheriting from TestCase via other modules'
+        ),
+    )
+    parser.add_argument(
+        '--journal', nargs='?', const=JOURNAL, metavar='DIR',
+        help=(
+            f'keep the originals of rewritten files in DIR (default: '
+            f'{JOURNAL}), so that --rollback can restore them'
+        ),
+    )
+    parser.add_argument(
+        '--rollback', nargs='?', const=JOURNAL, metavar='DIR',
+        help=(
+            'restore the files rewritten by the last run with --journal DIR, '
+            'even if it was interrupted, then exit'
+        ),
+    )
+    parser.add_argument(
+        '--cprofile-out', metavar='FILE',
+        help=(
+            'profile fixing with cProfile, in every worker process, and '
+            'write the merged statistics to FILE for pstats or snakeviz'
+        ),
+    )
+    parser.add_argument(
+        '--cprofile-sample', type=_fraction, default=1.0, metavar='FRACTION',
+        help=(
+            'with --cprofile-out, only profile this fraction of files, '
+            'picked by path (default: all of them)'
+        ),
+    )
     args = parser.parse_args(argv)
+    args.test_bases = frozenset()
+    args.main_pid = os.getpid()
+
+    if args.threads > 1 and args.jobs > 1:
+        parser.error("--threads and --jobs can't be combined")
+    if args.threads > 1 and args.timeout_per_file is not None:
+        parser.error('--timeout-per-file needs worker processes, not threads')
+    if args.threads > 1 and args.cprofile_out:
+        # cProfile only sees the thread it's started in
+        parser.error('--cprofile-out needs worker processes, not threads')
 
-    notes = RuntimeNotes()
+    use_stdin = '-' in args.filepaths
+    if use_stdin and (len(args.filepaths) > 1 or args.files_from):
+        parser.error("'-' can't be combined with other inputs")
+    if args.archive and (args.filepaths or args.files_from):
+        parser.error("--archive can't be combined with other inputs")
+    if args.rollback and (args.filepaths or args.files_from or args.archive):
+        parser.error("--rollback can't be combined with other inputs")
+    if args.rollback:
+        return _rollback(Path(args.rollback))
+
+    # stdout carries the fixed source when reading from stdin
+    use_stdout = use_stdin or bool(args.archive and args.archive[1] == '-')
+    notes = RuntimeNotes(sys.stderr if use_stdout else sys.stdout)
+    trace = ChromeTrace() if args.trace else None
+    stats = CacheStats() if args.stats else None
+    profiles = Profiles() if args.cprofile_out else None
+    subscribers = [s for s in (trace, stats) if s is not None]
+    for subscriber in subscribers:
+        _hooks.subscribe(subscriber)
+    try:
+        return _run(args, notes, trace, stats, profiles)
+    finally:
+        for subscriber in subscribers:
+            _hooks.unsubscribe(subscriber)
+        if trace is not None:
+            trace.save(Path(args.trace))
+        if profiles is not None:
+            profiles.save(Path(args.cprofile_out))
+
+
+def _run(
+    args: argparse.Namespace,
+    notes: RuntimeNotes,
+    trace: ChromeTrace | None,
+    stats: CacheStats | None,
+    profiles: Profiles | None,
+) -> int:
+    use_stdin = '-' in args.filepaths
     ret = 0
-    for filepath in args.filepaths:
-        ret += _fix_path(filepath, args, notes)
+    if use_stdin or args.archive:
+        fix = _fix_stdin if use_stdin else _fix_archive
+        if profiles is None:
+            ret += fix(args, notes)
+        else:
+            fixed, profile = run_profiled(lambda: fix(args, notes))
+            profiles.add(profile)
+            ret += fixed
+    else:
+        files: Iterable[str] = _iter_files(args.filepaths)
+        if args.files_from:
+            files_from = _iter_files(_files_from(args.files_from))
+            files = itertools.chain(files, files_from)
+        if args.class_index:
+            files = list(files)
+            index = build_index(files, Path(args.class_index), jobs=args.jobs)
+            args.test_bases = index.test_bases()
+        start = time.monotonic()
+        costs = load_costs(Path(args.costs)) if args.costs else {}
+        total = 0.0
+        show_progress = args.progress
+        if show_progress is None:
+            show_progress = sys.stderr.isatty()
+        journal = Path(args.journal) if args.journal else None
+        with FileWriter(journal=journal) as writer, Progress(
+            sys.stderr,
+            enabled=show_progress,
+            interval=0.2 if sys.stderr.isatty() else 10,
+        ) as progress:
+            files = progress.discover(files)
+            if progress.enabled:
+                notes.out = progress.above(notes.out)
+            for result in _fix_files(files, args, progress):
+                if trace is not None:
+                    trace.events.extend(result.trace)
+                if stats is not None:
+                    stats.add(result.caches)
+                if profiles is not None and result.profile is not None:
+                    profiles.add(result.profile)
+                ret += _report(result, args, notes, writer=writer)
+                progress.finish(result.path, result.size)
+                costs[os.path.abspath(result.path)] = result.elapsed
+                total += result.elapsed
+        makespan = time.monotonic() - start
+
+        if args.costs:
+            save_costs(Path(args.costs), costs)
+        if stats is not None:
+            workers = max(args.jobs, args.threads)
+            print(
+                f'Fixed {progress.done} files in {makespan:.2f}s, from '
+                f'{total:.2f}s of work across {workers} worker(s) '
+                f'({utilization(makespan, total, workers):.0%} utilization)',
+                file=notes.out,
+            )
+            for cache, hits, misses in stats.counts():
+                print(
+                    f'{cache} cache: {hits} hits, {misses} misses '
+                    f'({hits / (hits + misses):.0%} hit rate)',
+                    file=notes.out,
+                )
     if notes.any_invalid_syntax and not args.show_traceback:
-        print("\n(Hint: run again with '--show-traceback')")
+        print("\n(Hint: run again with '--show-traceback')", file=notes.out)
     return ret
 
 
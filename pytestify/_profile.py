@@ -0,0 +1,116 @@
+'''
+Profiles fixing with cProfile in whichever process does the work, which
+`python -m cProfile` can't do once files are fixed in worker processes.
+Each file's statistics are sent back with its result, and merged into a
+single file that `pstats` (or a viewer like snakeviz) can read. The pieces
+of a split file are profiled in the processes that fix them, too.
+'''
+from __future__ import annotations
+
+import cProfile
+import pstats
+import zlib
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# pstats' format: (file, line, function) -> call counts, times and callers
+RawStats = Dict[Tuple[str, int, str], Any]
+
+
+def sampled(path: str, fraction: float) -> bool:
+    '''
+    Whether to profile `path`. The same files are picked by every process
+    and every run, so that runs with the same fraction can be compared.
+    '''
+    if fraction >= 1:
+        return True
+    # unlike hash(), the same in every process
+    return zlib.crc32(path.encode('utf-8', 'surrogateescape')) < (
+        fraction * 2 ** 32
+    )
+
+
+def run_profiled(func: Callable[[], T]) -> tuple[T, RawStats]:
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+def _call_profiled(
+    func: Callable[..., T],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> tuple[T, RawStats]:
+    return run_profiled(lambda: func(*args, **kwargs))
+
+
+class ProfilingExecutor(Executor):
+    '''
+    Runs each task submitted to it in `executor` under cProfile, and keeps
+    the statistics of every task, wherever it ran
+    '''
+
+    def __init__(self, executor: Executor) -> None:
+        self.executor = executor
+        self.stats: list[RawStats] = []
+
+    def submit(  # type: ignore[override]
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Future[T]:
+        outer: Future[T] = Future()
+        outer.set_running_or_notify_cancel()
+
+        def done(inner: Future[tuple[T, RawStats]]) -> None:
+            try:
+                result, stats = inner.result()
+            except BaseException as e:
+                outer.set_exception(e)
+            else:
+                self.stats.append(stats)
+                outer.set_result(result)
+
+        inner = self.executor.submit(_call_profiled, fn, args, kwargs)
+        inner.add_done_callback(done)
+        return outer
+
+    def shutdown(self, wait: bool = True, **kwargs: Any) -> None:
+        self.executor.shutdown(wait, **kwargs)
+
+
+def merge(stats: Iterable[RawStats]) -> RawStats:
+    merged = Profiles()
+    for each in stats:
+        merged.add(each)
+    return merged.stats.stats  # type: ignore[attr-defined]
+
+
+class _Recorded:
+    ''' Stats from another process, in the form `pstats.Stats` loads '''
+
+    def __init__(self, stats: RawStats) -> None:
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class Profiles:
+    ''' The statistics of every profiled file, merged '''
+
+    def __init__(self) -> None:
+        self.stats = pstats.Stats()
+        self.files = 0
+
+    def add(self, stats: RawStats) -> None:
+        self.stats.add(_Recorded(stats))  # type: ignore[arg-type]
+        self.files += 1
+
+    def save(self, path: Path) -> None:
+        self.stats.dump_stats(path)
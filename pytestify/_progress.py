@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from typing import Iterable, Iterator, TextIO
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f'{seconds:.1f}s'
+    minutes, rest = divmod(int(seconds), 60)
+    return f'{minutes}m{rest:02}s'
+
+
+class Progress:
+    '''
+    A one-line summary of a run that's redrawn in the background, at most
+    once every `interval` seconds. Files can be started and finished from
+    any thread, and the total is counted as files are discovered.
+    '''
+
+    def __init__(
+        self,
+        out: TextIO,
+        *,
+        interval: float = 0.2,
+        enabled: bool = True,
+    ) -> None:
+        self.out = out
+        self.interval = interval
+        self.enabled = enabled
+        self.redraw = out.isatty()  # otherwise, print one line at a time
+        self.started = time.monotonic()
+        self.total = 0
+        self.total_known = False
+        self.done = 0
+        self.bytes = 0
+        self.in_flight: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._drawn = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> Progress:
+        if self.enabled:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._clear()
+
+    def discover(self, files: Iterable[str]) -> Iterator[str]:
+        for path in files:
+            with self._lock:
+                self.total += 1
+            yield path
+        self.total_known = True
+
+    def start(self, path: str) -> None:
+        with self._lock:
+            self.in_flight[path] = time.monotonic()
+
+    def finish(self, path: str, size: int) -> None:
+        with self._lock:
+            self.in_flight.pop(path, None)
+            self.done += 1
+            self.bytes += size
+
+    def above(self, stream: TextIO) -> TextIO:
+        ''' Wrap `stream` so that anything written to it clears the line '''
+        return _Above(stream, self)  # type: ignore[return-value]
+
+    def line(self) -> str:
+        now = time.monotonic()
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        total = f'{self.total}' if self.total_known else f'{self.total}+'
+        parts = [
+            f'{self.done}/{total} files',
+            f'{rate:.1f} files/s',
+            f'{self.bytes / elapsed / 1e6:.2f} MB/s',
+        ]
+        if self.in_flight:
+            path = min(self.in_flight, key=self.in_flight.__getitem__)
+            slowest = _duration(now - self.in_flight[path])
+            parts.append(f'slowest: {os.path.basename(path)} ({slowest})')
+        if self.total_known and rate:
+            eta = (self.total - self.done) / rate
+            parts.append(f'ETA {_duration(eta)}')
+        return ' | '.join(parts)
+
+    def _clear(self) -> None:
+        if self._drawn:
+            self.out.write('\r\033[K')
+            self.out.flush()
+            self._drawn = False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                line = self.line()
+                if self.redraw:
+                    # a line that wraps can't be cleared
+                    width = shutil.get_terminal_size().columns - 1
+                    self.out.write(f'\r\033[K{line[:width]}')
+                    self._drawn = True
+                else:
+                    self.out.write(f'{line}\n')
+                self.out.flush()
+
+
+class _Above:
+    def __init__(self, stream: TextIO, progress: Progress) -> None:
+        self.stream = stream
+        self.progress = progress
+
+    def write(self, s: str) -> int:
+        with self.progress._lock:
+            self.progress._clear()
+            return self.stream.write(s)
+
+    def flush(self) -> None:
+        self.stream.flush()
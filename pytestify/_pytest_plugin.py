@@ -0,0 +1,77 @@
+'''
+A pytest plugin that converts unittest modules to pytest as they're
+imported, for packages that can't be converted in place yet. List the
+directories to convert in the `pytestify_paths` ini option, or with
+`--pytestify-path`.
+'''
+from __future__ import annotations
+
+import ast
+import functools
+import types
+from typing import Callable
+
+import pytest
+
+
+def _compile_for_pytest(
+    source: str,
+    path: str,
+    *,
+    config: pytest.Config,
+) -> types.CodeType:
+    from _pytest.assertion.rewrite import rewrite_asserts
+
+    # pytest doesn't rewrite modules loaded by other import hooks, so its
+    # detailed assertion messages are added here
+    tree = ast.parse(source, filename=path)
+    rewrite_asserts(tree, source.encode(), path, config)
+    return compile(tree, path, 'exec', dont_inherit=True)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup('pytestify')
+    group.addoption(
+        '--pytestify-path', action='append', default=[],
+        dest='pytestify_paths', metavar='PATH',
+        help='convert unittest modules under PATH to pytest as they import',
+    )
+    parser.addini(
+        'pytestify_paths', type='paths', default=[],
+        help='convert unittest modules under these paths as they import',
+    )
+    parser.addini(
+        'pytestify_with_count_equal', type='bool', default=False,
+        help='also rewrite assertCountEqual and assertItemsEqual',
+    )
+    parser.addini(
+        'pytestify_keep_method_casing', type='bool', default=False,
+        help="don't rename camelCase test methods",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    paths = [
+        *config.getini('pytestify_paths'),
+        *config.getoption('pytestify_paths'),
+    ]
+    if not paths:
+        return
+
+    # imported here, so that pytest starts as quickly as before unless
+    # this plugin is used
+    from pytestify._import_hook import install_import_hook
+
+    compiler: Callable[[str, str], types.CodeType] | None = None
+    tag = ''
+    if config.getoption('assertmode') == 'rewrite':
+        compiler = functools.partial(_compile_for_pytest, config=config)
+        tag = f'pytest-{pytest.__version__}'
+    finder = install_import_hook(
+        paths,
+        with_count_equal=config.getini('pytestify_with_count_equal'),
+        keep_method_casing=config.getini('pytestify_keep_method_casing'),
+        compiler=compiler,
+        tag=tag,
+    )
+    config.add_cleanup(finder.uninstall)
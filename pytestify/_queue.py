@@ -0,0 +1,311 @@
+'''
+A queue of files to fix, kept in a SQLite file that workers on any number
+of machines can share. A coordinator adds the files, and each worker claims
+a batch at a time with a lease. A worker that dies (or hangs) stops renewing
+its lease, so once it expires, the batch goes back in the queue for others.
+A live worker renews the lease on its whole batch from a thread, so slow
+files aren't taken from it.
+
+SQLite's write-ahead log needs shared memory, which network filesystems
+don't have, so the database uses the default rollback journal and locks.
+Leases are timed by each host's clock, so the clocks should roughly agree.
+'''
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Mapping, NamedTuple, Sequence
+
+SCHEMA_VERSION = 2
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    cost REAL NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    alone INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER,
+    skipped TEXT,
+    elapsed REAL,
+    finished INTEGER
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, cost);
+CREATE INDEX IF NOT EXISTS tasks_finished ON tasks (finished);
+'''
+
+# a file whose lease expires this many times is likely killing workers.
+# Files from a batch whose lease expired are retried one at a time, so that
+# only the file to blame runs out of attempts.
+MAX_ATTEMPTS = 3
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+
+
+class Task(NamedTuple):
+    id: int
+    path: str
+
+
+class Outcome(NamedTuple):
+    task: int
+    changed: bool
+    skipped: str | None = None
+    elapsed: float = 0.0
+
+
+class Finished(NamedTuple):
+    path: str
+    owner: str | None
+    changed: bool
+    skipped: str | None
+    elapsed: float
+
+
+class WorkQueue:
+    '''
+    The tasks in the SQLite file at `path`. Paths are stored relative to
+    its folder, so hosts that mount the shared filesystem at different
+    places still agree on them.
+    '''
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.root = path.resolve().parent
+        self.clock = clock
+        # transactions are begun explicitly, to take the write lock up front
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            self.db.close()
+            raise ValueError(
+                f'{path} is a queue in format {version}, but this is format '
+                f'{SCHEMA_VERSION}',
+            )
+        # executescript commits any open transaction, so it's begun here
+        self.db.executescript(
+            f'BEGIN IMMEDIATE; {SCHEMA} '
+            f'PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;',
+        )
+
+    def __enter__(self) -> WorkQueue:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _absolute(self, path: str) -> str:
+        return os.path.normpath(os.path.join(self.root, path))
+
+    @property
+    def settings(self) -> dict[str, Any]:
+        rows = self.db.execute('SELECT key, value FROM settings')
+        return {key: json.loads(value) for key, value in rows}
+
+    def add(
+        self,
+        costs: Mapping[str, float],
+        settings: Mapping[str, Any] | None = None,
+    ) -> None:
+        '''
+        Queue each file in `costs`, to be claimed costliest first. A file
+        that's already in the queue is fixed again.
+        '''
+        with self._transaction():
+            self.db.executemany(
+                'INSERT OR REPLACE INTO settings VALUES (?, ?)',
+                [(k, json.dumps(v)) for k, v in (settings or {}).items()],
+            )
+            self.db.executemany(
+                'INSERT INTO tasks (path, cost) VALUES (?, ?) '
+                'ON CONFLICT (path) DO UPDATE SET '
+                "cost = excluded.cost, state = 'pending', owner = NULL, "
+                'lease_until = NULL, attempts = 0, alone = 0, changed = NULL, '
+                'skipped = NULL, elapsed = NULL, finished = NULL',
+                [(self._relative(p), cost) for p, cost in costs.items()],
+            )
+
+    def claim(self, owner: str, count: int, lease: float) -> list[Task]:
+        ''' Lease up to `count` tasks to `owner` for `lease` seconds '''
+        now = self.clock()
+        with self._transaction():
+            self._requeue_expired(now)
+            rows = self.db.execute(
+                'SELECT id, path FROM tasks WHERE state = ? AND alone '
+                'ORDER BY cost DESC, id LIMIT 1',
+                (PENDING,),
+            ).fetchall()
+            if not rows:
+                rows = self.db.execute(
+                    'SELECT id, path FROM tasks WHERE state = ? '
+                    'ORDER BY cost DESC, id LIMIT ?',
+                    (PENDING, count),
+                ).fetchall()
+            self.db.executemany(
+                'UPDATE tasks SET state = ?, owner = ?, lease_until = ?, '
+                'attempts = attempts + 1 WHERE id = ?',
+                [(LEASED, owner, now + lease, task_id) for task_id, _ in rows],
+            )
+        return [Task(task_id, self._absolute(path)) for task_id, path in rows]
+
+    def expire(self) -> None:
+        ''' Requeue the tasks whose lease has expired, or give up on them '''
+        with self._transaction():
+            self._requeue_expired(self.clock())
+
+    def _requeue_expired(self, now: float) -> None:
+        self.db.execute(
+            'UPDATE tasks SET state = ?, owner = NULL, lease_until = NULL, '
+            'alone = 1 WHERE state = ? AND lease_until < ? AND attempts < ?',
+            (PENDING, LEASED, now, MAX_ATTEMPTS),
+        )
+        self.db.execute(
+            'UPDATE tasks SET state = ?, changed = 0, skipped = ?, '
+            'elapsed = 0, finished = (SELECT COALESCE(MAX(finished), 0) + 1 '
+            'FROM tasks) WHERE state = ? AND lease_until < ?',
+            (
+                DONE,
+                f'because its workers stopped {MAX_ATTEMPTS} times while '
+                'fixing it',
+                LEASED,
+                now,
+            ),
+        )
+
+    def renew(self, owner: str, tasks: Sequence[Task], lease: float) -> None:
+        ''' Extend the lease on tasks `owner` is still working on '''
+        with self._transaction():
+            self.db.executemany(
+                'UPDATE tasks SET lease_until = ? '
+                'WHERE id = ? AND state = ? AND owner = ?',
+                [
+                    (self.clock() + lease, task.id, LEASED, owner)
+                    for task in tasks
+                ],
+            )
+
+    @contextmanager
+    def keep_leased(
+        self,
+        owner: str,
+        tasks: Sequence[Task],
+        lease: float,
+    ) -> Iterator[None]:
+        '''
+        Renew the lease on `tasks` from a thread until the block exits, so
+        that they're held however long any one of them takes. The thread
+        has its own connection, since SQLite's can't be shared.
+        '''
+        stop = threading.Event()
+
+        def beat() -> None:
+            with WorkQueue(self.path, clock=self.clock) as queue:
+                while not stop.wait(lease / 3):
+                    try:
+                        queue.renew(owner, tasks, lease)
+                    except sqlite3.OperationalError:
+                        # e.g. locked by other workers for too long, so
+                        # it's tried again on the next beat
+                        pass
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, owner: str, outcomes: Sequence[Outcome]) -> int:
+        '''
+        Record the outcomes of tasks leased to `owner`. Tasks whose lease
+        expired and went to another worker are left to it. Returns how many
+        outcomes were recorded.
+        '''
+        recorded = 0
+        with self._transaction():
+            for outcome in outcomes:
+                cursor = self.db.execute(
+                    'UPDATE tasks SET state = ?, changed = ?, skipped = ?, '
+                    'elapsed = ?, finished = (SELECT COALESCE(MAX(finished), '
+                    '0) + 1 FROM tasks) '
+                    'WHERE id = ? AND state = ? AND owner = ?',
+                    (
+                        DONE,
+                        outcome.changed,
+                        outcome.skipped,
+                        outcome.elapsed,
+                        outcome.task,
+                        LEASED,
+                        owner,
+                    ),
+                )
+                recorded += cursor.rowcount
+        return recorded
+
+    def counts(self) -> dict[str, int]:
+        counts = dict.fromkeys((PENDING, LEASED, DONE), 0)
+        counts.update(
+            self.db.execute(
+                'SELECT state, COUNT(*) FROM tasks GROUP BY state',
+            ),
+        )
+        return counts
+
+    def next_expiry(self) -> float | None:
+        ''' When the soonest lease runs out, if any task is leased '''
+        return self.db.execute(
+            'SELECT MIN(lease_until) FROM tasks WHERE state = ?', (LEASED,),
+        ).fetchone()[0]
+
+    def finished(self, after: int = 0) -> list[tuple[int, Finished]]:
+        ''' Tasks in the order they finished, from the `after`th on '''
+        rows = self.db.execute(
+            'SELECT finished, path, owner, changed, skipped, elapsed '
+            'FROM tasks WHERE state = ? AND finished > ? ORDER BY finished',
+            (DONE, after),
+        )
+        return [
+            (
+                seq,
+                Finished(
+                    self._absolute(path), owner, bool(changed), skipped,
+                    elapsed,
+                ),
+            )
+            for seq, path, owner, changed, skipped, elapsed in rows
+        ]
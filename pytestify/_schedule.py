@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import os
+import statistics
+from pathlib import Path
+from typing import Iterable, Mapping
+
+
+def load_costs(path: Path) -> dict[str, float]:
+    ''' Seconds spent fixing each file, as recorded by a previous run '''
+    try:
+        costs = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return costs if isinstance(costs, dict) else {}
+
+
+def save_costs(path: Path, costs: Mapping[str, float]) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(costs, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def estimate_costs(
+    files: Iterable[str],
+    recorded: Mapping[str, float],
+) -> dict[str, float]:
+    '''
+    Estimate how long each file takes to fix, in seconds when there are
+    recorded costs to go off of. Otherwise, the file size is the estimate.
+    '''
+    sizes = {path: os.path.getsize(path) for path in files}
+    seconds = {path: recorded.get(os.path.abspath(path)) for path in sizes}
+    known = [
+        cost / sizes[path]
+        for path, cost in seconds.items()
+        if cost and sizes[path]
+    ]
+    seconds_per_byte = statistics.median(known) if known else 1.0
+    return {
+        path: seconds[path] or size * seconds_per_byte
+        for path, size in sizes.items()
+    }
+
+
+def schedule(costs: Mapping[str, float], workers: int) -> list[list[str]]:
+    '''
+    Order files longest-processing-time first, so that the largest files
+    don't end up running alone at the end. Cheap files are batched
+    together, so they don't each pay for a round trip to a worker.
+    '''
+    if not costs:
+        return []
+    # aim for every worker to get at least a dozen or so tasks
+    target = sum(costs.values()) / (workers * 16)
+
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    batch_cost = 0.0
+    for path in sorted(costs, key=lambda p: costs[p], reverse=True):
+        cost = costs[path]
+        if batch and batch_cost + cost > target:
+            batch = []
+        if not batch:
+            batch_cost = 0.0
+            batches.append(batch)
+        batch.append(path)
+        batch_cost += cost
+    return batches
+
+
+def utilization(makespan: float, total: float, workers: int) -> float:
+    ''' How busy the workers were, from 0 to 1 '''
+    if makespan <= 0:
+        return 1.0
+    return min(1.0, total / (makespan * workers))
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import functools
+import time
+from concurrent.futures import Executor
+from typing import Collection
+
+from pytestify._ast_helpers import ast_parse, has_plain_line_breaks
+from pytestify._transform import (
+    find_tests, finish, fix_contents, rewrite_tests,
+)
+
+# Appended to every chunk but the last, so that the fixers (which drop
+# trailing blank lines) treat a chunk's end like the middle of a file
+SENTINEL = '# pytestify: end of chunk'
+
+
+def block_starts(contents: str) -> list[int]:
+    '''
+    Lines where the module can be split so that each piece can be fixed on
+    its own. Every fixer only touches lines within a single statement, and
+    the line before it. So, top-level statements are only split apart
+    where there's a blank line between them, and the blank lines always
+    start the following piece.
+    '''
+    lines = contents.splitlines()
+    starts = []
+    for node in ast_parse(contents).body:
+        decorators = getattr(node, 'decorator_list', [])
+        start = min([node.lineno] + [d.lineno for d in decorators]) - 1
+        if start == 0 or lines[start - 1].strip():
+            continue
+        while start > 0 and not lines[start - 1].strip():
+            start -= 1
+        if start > 0:
+            starts.append(start)
+    return sorted(set(starts))
+
+
+def split_chunks(contents: str, n: int) -> list[str]:
+    '''
+    Split a module into about `n` chunks of whole top-level blocks. Every
+    chunk but the last ends with the sentinel comment.
+    '''
+    if not has_plain_line_breaks(contents):
+        return [contents]
+
+    lines = contents.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    chunk_lines = max(1, len(lines) // n)
+    chunks = []
+    begin = 0
+    for start in block_starts(contents):
+        if start - begin >= chunk_lines:
+            chunks.append(contents[offsets[begin]:offsets[start]] + SENTINEL)
+            begin = start
+    chunks.append(contents[offsets[begin]:])
+    return chunks
+
+
+class LostSentinel(ValueError):
+    ''' A fixer changed the end of a chunk, so it can't be fixed alone '''
+
+
+def strip_sentinel(chunk: str) -> str:
+    if not chunk.endswith('\n' + SENTINEL):
+        raise LostSentinel('A chunk lost its sentinel')
+    return chunk[:-len(SENTINEL) - 1]
+
+
+def _remaining(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0)
+
+
+def fix_contents_in_chunks(
+    contents: str,
+    executor: Executor,
+    *,
+    chunks: int,
+    with_count_equal: bool = False,
+    keep_method_casing: bool = False,
+    test_bases: Collection[str] = (),
+    timeout: float | None = None,
+) -> str:
+    '''
+    Same as `fix_contents`, but the module is split into `chunks` pieces at
+    top-level statements, which are fixed concurrently using `executor`.
+    The result is identical to fixing the whole module at once. If the
+    pieces take longer than `timeout` seconds altogether, TimeoutError is
+    raised, and they're left running in `executor`.
+    '''
+    deadline = None if timeout is None else time.monotonic() + timeout
+    pieces = split_chunks(contents, chunks)
+    if len(pieces) == 1:
+        return fix_contents(
+            contents,
+            with_count_equal=with_count_equal,
+            keep_method_casing=keep_method_casing,
+            test_bases=test_bases,
+        )
+
+    found, is_test = zip(
+        *executor.map(
+            functools.partial(
+                find_tests,
+                with_count_equal=with_count_equal,
+                test_bases=test_bases,
+            ),
+            pieces,
+            timeout=_remaining(deadline),
+        ),
+    )
+    is_unittest_file = any(is_test)
+    rewritten = list(
+        executor.map(
+            functools.partial(
+                rewrite_tests,
+                is_unittest_file=is_unittest_file,
+                keep_method_casing=keep_method_casing,
+            ),
+            found,
+            timeout=_remaining(deadline),
+        ),
+    )
+
+    try:
+        joined = [strip_sentinel(chunk) for chunk in rewritten[:-1]]
+    except LostSentinel:
+        return fix_contents(
+            contents,
+            with_count_equal=with_count_equal,
+            keep_method_casing=keep_method_casing,
+            test_bases=test_bases,
+        )
+    joined.append(rewritten[-1])
+    return finish('\n'.join(joined))
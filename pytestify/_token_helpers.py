@@ -1,8 +1,161 @@
 from __future__ import annotations
 
-from typing import Iterable
+import bisect
+import io
+import re
+import tokenize
+from array import array
+from typing import Iterable, Iterator, Sequence, overload
 
-from tokenize_rt import Token
+from tokenize_rt import ESCAPED_NL, UNIMPORTANT_WS, Token, curly_escape
+
+# every kind of token, as `Tokens` stores them
+_NAMES = tuple(
+    dict.fromkeys((
+        ESCAPED_NL, UNIMPORTANT_WS, *tokenize.tok_name.values(),
+    )),
+)
+_CODES = {name: code for code, name in enumerate(_NAMES)}
+
+_escaped_nl_re = re.compile(r'\\(\n|\r\n|\r)')
+
+
+class Tokens(Sequence[Token]):
+    '''
+    The same tokens as `tokenize_rt.src_to_tokens(src)`, but stored as
+    parallel arrays of kinds, lines and offsets into `src`, rather than as
+    a tuple and a string per token. For large files, that's a fraction of
+    the memory. Tokens are made as they're indexed, and the `*_at` methods
+    read a single field without making one.
+    '''
+
+    def __init__(self, src: str) -> None:
+        self.src = src
+        self._ascii = src.isascii()
+        self._kinds = array('B')
+        self._starts = array('I')  # character offsets in `src`
+        self._lines = array('I')
+        # where each line starts in `src`, 1-indexed like `_lines`
+        self._line_starts = array('I', [0, 0])
+        self._line_starts.extend(m.end() for m in re.finditer('\n', src))
+        if self._line_starts[-1] != len(src):
+            self._line_starts.append(len(src))  # the ENDMARKER's line
+        self._tokenize()
+
+    def _tokenize(self) -> None:
+        # this follows `tokenize_rt.src_to_tokens`, with positions in the
+        # source instead of copies of its lines. Byte offsets aren't kept,
+        # since they follow from each token's position and line.
+        src = self.src
+        line_starts = self._line_starts
+        add_kind = self._kinds.append
+        add_start = self._starts.append
+        add_line = self._lines.append
+        ws_code = _CODES[UNIMPORTANT_WS]
+        escaped_nl_code = _CODES[ESCAPED_NL]
+
+        pos = 0
+        last_line = 1
+        last_col = 0
+        gen = tokenize.generate_tokens(io.StringIO(src).readline)
+        for tok_type, tok_text, (sline, scol), (eline, ecol), _ in gen:
+            start = line_starts[sline] + scol
+            if sline > last_line:
+                newtok = src[pos:start]
+                # a multiline unimportant whitespace may contain escaped
+                # newlines
+                while True:
+                    match = _escaped_nl_re.search(newtok)
+                    if match is None:
+                        break
+                    if match.start():
+                        add_kind(ws_code)
+                        add_start(pos)
+                        add_line(last_line)
+                        pos += match.start()
+                    add_kind(escaped_nl_code)
+                    add_start(pos)
+                    add_line(last_line)
+                    pos += len(match.group())
+                    newtok = newtok[match.end():]
+                    last_line += 1
+                if newtok:
+                    add_kind(ws_code)
+                    add_start(pos)
+                    add_line(sline)
+            elif scol > last_col:
+                add_kind(ws_code)
+                add_start(pos)
+                add_line(sline)
+
+            tok_name = tokenize.tok_name[tok_type]
+            if tok_name in {'FSTRING_MIDDLE', 'TSTRING_MIDDLE'}:
+                if '{' in tok_text or '}' in tok_text:
+                    new_tok_text = curly_escape(tok_text)
+                    ecol += len(new_tok_text) - len(tok_text)
+                    tok_text = new_tok_text
+
+            add_kind(_CODES[tok_name])
+            add_start(start)
+            add_line(sline)
+            pos = start + len(tok_text)
+            last_line, last_col = eline, ecol
+        # where the last token ends, which isn't the end of `src` if it
+        # ends in whitespace without a newline
+        add_start(pos)
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    @overload
+    def __getitem__(self, i: int) -> Token: ...
+    @overload
+    def __getitem__(self, i: slice) -> list[Token]: ...
+
+    def __getitem__(self, i: int | slice) -> Token | list[Token]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start = self._starts[i]
+        line = self._lines[i]
+        line_start = self._line_starts[line]
+        if self._ascii:
+            byte_offset = start - line_start
+        else:
+            byte_offset = len(self.src[line_start:start].encode())
+        return Token(
+            _NAMES[self._kinds[i]],
+            self.src[start:self._starts[i + 1]],
+            line,
+            byte_offset,
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        return map(self.__getitem__, range(len(self)))
+
+    def name_at(self, i: int) -> str:
+        return _NAMES[self._kinds[i]]
+
+    def src_at(self, i: int) -> str:
+        return self.src[self._starts[i]:self._starts[i + 1]]
+
+    def line_at(self, i: int) -> int:
+        return self._lines[i]
+
+    def first_on_line(self, line: int) -> int:
+        ''' The index of the first token on `line` (or after it) '''
+        return bisect.bisect_left(self._lines, line)
+
+    @property
+    def nbytes(self) -> int:
+        ''' The memory used by the arrays '''
+        return sum(
+            a.itemsize * len(a)
+            for a in (
+                self._kinds, self._starts, self._lines, self._line_starts,
+            )
+        )
 
 
 def remove_token(
@@ -21,17 +174,20 @@ def remove_token(
     return before + replace_with + after
 
 
-def operators(tokens: list[Token]) -> Iterable[Token]:
+def operators(tokens: Iterable[Token]) -> Iterable[Token]:
     return (tok for tok in tokens if tok.name == 'OP')
 
 
-def find_outer_comma(
-    tokens: list[Token],
+def find_outer_commas(
+    tokens: Iterable[Token],
     stack_loc: int = 1,
-    # TODO: rather than a 'comma_no' arg, it may be nice if this
-    # func returns a list
-    comma_no: int = 1,
-) -> Token | None:
+    limit: int | None = None,
+) -> list[Token]:
+    '''
+    The commas at most `stack_loc` brackets deep, stopping once `limit` of
+    them are found
+    '''
+    commas: list[Token] = []
     stack = 0
     for op in operators(tokens):
         if op.src in ['(', '[', '{']:
@@ -39,10 +195,19 @@ def find_outer_comma(
         if op.src in [')', ']', '}']:
             stack -= 1
         if op.src == ',' and stack <= stack_loc:
-            comma_no -= 1
-            if comma_no == 0:
-                return op
-    return None
+            commas.append(op)
+            if len(commas) == limit:
+                break
+    return commas
+
+
+def find_outer_comma(
+    tokens: Iterable[Token],
+    stack_loc: int = 1,
+    comma_no: int = 1,
+) -> Token | None:
+    commas = find_outer_commas(tokens, stack_loc, limit=comma_no)
+    return commas[-1] if len(commas) == comma_no else None
 
 
 def find_closing_paren(paren: Token, tokens: list[Token]) -> Token:
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import Collection
+
+from pytestify._ast_helpers import ast_parse, has_plain_line_breaks, visit_all
+from pytestify._hooks import fixer
+from pytestify.fixes import asserts, base_class, funcs, method_name
+from pytestify.fixes.asserts import rewrite_asserts
+from pytestify.fixes.base_class import inherits_test_case, remove_base_class
+from pytestify.fixes.funcs import rewrite_pytest_funcs
+from pytestify.fixes.imports import add_pytest_import
+from pytestify.fixes.method_name import rewrite_method_name
+
+
+def no_ws(s: str) -> str:
+    """ strip all whitespace from a string """
+    return ''.join(s.split())
+
+
+def find_tests(
+    contents: str,
+    *,
+    with_count_equal: bool = False,
+    test_bases: Collection[str] = (),
+) -> tuple[str, bool]:
+    '''
+    Rewrite test classes and asserts. Also returns whether the source
+    looks like it's from a test file.
+    '''
+    orig_contents = contents
+    if has_plain_line_breaks(contents):
+        # removing base classes only edits class lines, so the line numbers
+        # of asserts don't change, and both fixers can share a single walk
+        # of the original tree
+        classes = base_class.Visitor(test_bases)
+        calls = asserts.Visitor()
+        with fixer('visit_all'):
+            visit_all(ast_parse(contents), [classes, calls])
+        with fixer('remove_base_class'):
+            contents = remove_base_class(contents, visitor=classes)
+        with fixer('rewrite_asserts'):
+            contents = rewrite_asserts(
+                contents,
+                with_count_equal=with_count_equal,
+                visitor=calls,
+            )
+        inherits = bool(classes.test_subclasses)
+    else:
+        with fixer('remove_base_class'):
+            contents = remove_base_class(contents, test_bases=test_bases)
+        with fixer('rewrite_asserts'):
+            contents = rewrite_asserts(
+                contents,
+                with_count_equal=with_count_equal,
+            )
+        inherits = bool(
+            test_bases and inherits_test_case(orig_contents, test_bases),
+        )
+
+    # if either of the above rewrites occur,
+    # we can assume it's a test file
+    is_unittest_file = no_ws(contents) != no_ws(orig_contents) or inherits
+    return contents, is_unittest_file
+
+
+def rewrite_tests(
+    contents: str,
+    *,
+    is_unittest_file: bool,
+    keep_method_casing: bool = False,
+) -> str:
+    if not is_unittest_file or not has_plain_line_breaks(contents):
+        if is_unittest_file:
+            # the camelCase rewrite is especially risky,
+            # only do it if we're sure it's a test file
+            with fixer('rewrite_method_name'):
+                contents = rewrite_method_name(
+                    contents,
+                    keep_casing=keep_method_casing,
+                )
+        with fixer('rewrite_pytest_funcs'):
+            return rewrite_pytest_funcs(contents)
+
+    # renaming methods only edits their def lines, so both fixers can
+    # share a single walk of the tree
+    names = method_name.Visitor(keep_casing=keep_method_casing)
+    calls = funcs.Visitor()
+    with fixer('visit_all'):
+        visit_all(ast_parse(contents), [names, calls])
+    with fixer('rewrite_method_name'):
+        contents = rewrite_method_name(contents, visitor=names)
+    with fixer('rewrite_pytest_funcs'):
+        return rewrite_pytest_funcs(contents, visitor=calls)
+
+
+def finish(contents: str) -> str:
+    with fixer('add_pytest_import'):
+        contents = add_pytest_import(contents)
+    if not contents.endswith('\n'):
+        contents += '\n'
+    return contents
+
+
+def fix_contents(
+    contents: str,
+    *,
+    with_count_equal: bool = False,
+    keep_method_casing: bool = False,
+    test_bases: Collection[str] = (),
+) -> str:
+    '''
+    Run every fixer over the source of a module. `test_bases` are the
+    names of other classes that inherit from TestCase.
+
+    Raises a SyntaxError if the source (or one of the intermediate
+    rewrites) can't be parsed.
+    '''
+    contents, is_unittest_file = find_tests(
+        contents,
+        with_count_equal=with_count_equal,
+        test_bases=test_bases,
+    )
+    contents = rewrite_tests(
+        contents,
+        is_unittest_file=is_unittest_file,
+        keep_method_casing=keep_method_casing,
+    )
+    return finish(contents)
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, NamedTuple, Sequence,
+)
+
+from pytestify import _hooks
+from pytestify._transform import no_ws
+from pytestify.fixes.base_class import test_class_name
+from pytestify.fixes.method_name import to_snake_case
+
+VERSION = 2
+OUTCOMES = ('passed', 'failed', 'skipped', 'xfailed', 'error')
+
+# each test's name -> its outcome
+Outcomes = Dict[str, str]
+
+# the outcome of a runner that didn't report on any test
+RUN_FAILED: Outcomes = {'(the whole module)': 'error'}
+
+# the first line of a converted copy, so that one left behind by a run that
+# was killed can be told apart from the user's own files
+MARKER = '# written by `pytestify verify`, and removed once it has run\n'
+
+
+class ModuleResult(NamedTuple):
+    path: str
+    unittest: Outcomes
+    pytest: Outcomes
+    seconds: list[float]  # how long each runner took
+    cached: bool = False
+    problem: str | None = None  # why it couldn't be verified
+
+    @property
+    def differs(self) -> bool:
+        return self.problem is not None or self.unittest != self.pytest
+
+    def changes(self) -> list[tuple[str, str, str]]:
+        ''' Each test whose outcome differs, and its outcomes '''
+        return [
+            (
+                name,
+                self.unittest.get(name, 'not run'),
+                self.pytest.get(name, 'not run'),
+            )
+            for name in sorted(self.unittest.keys() | self.pytest.keys())
+            if self.unittest.get(name) != self.pytest.get(name)
+        ]
+
+
+def describe(outcomes: Outcomes) -> str:
+    counts: dict[str, int] = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    parts = [f'{counts[o]} {o}' for o in OUTCOMES if counts.get(o)]
+    return ', '.join(parts) or 'no tests'
+
+
+def _test_name(cls: str, method: str) -> str:
+    # spelled as pytestify renames test classes and methods, so that both
+    # runners agree
+    classes = [test_class_name(part) for part in cls.split('.') if part]
+    return '.'.join([*classes, to_snake_case(method)])
+
+
+def _module_name(path: str) -> tuple[str, str]:
+    ''' The directory to import from, and the module's dotted name '''
+    file = Path(path).resolve()
+    parts = [file.stem]
+    root = file.parent
+    while (root / '__init__.py').exists():
+        parts.insert(0, root.name)
+        root = root.parent
+    return str(root), '.'.join(parts)
+
+
+class _RecordingResult(unittest.TestResult):
+    def __init__(self) -> None:
+        super().__init__()
+        self.outcomes: Outcomes = {}
+
+    def _record(self, test: unittest.TestCase, outcome: str) -> None:
+        method = getattr(test, '_testMethodName', None)
+        if method is None:
+            # e.g. setUpClass failing, which isn't a test of its own
+            name = str(test)
+        else:
+            name = _test_name(type(test).__qualname__, method)
+        self.outcomes[name] = outcome
+
+    def addSuccess(self, test: unittest.TestCase) -> None:
+        self._record(test, 'passed')
+
+    def addFailure(self, test: unittest.TestCase, err: Any) -> None:
+        self._record(test, 'failed')
+
+    def addError(self, test: unittest.TestCase, err: Any) -> None:
+        self._record(test, 'failed')
+
+    def addSkip(self, test: unittest.TestCase, reason: str) -> None:
+        self._record(test, 'skipped')
+
+    def addExpectedFailure(self, test: unittest.TestCase, err: Any) -> None:
+        self._record(test, 'xfailed')
+
+    def addUnexpectedSuccess(self, test: unittest.TestCase) -> None:
+        # pytest's junit xml can't tell a non-strict xpass from a pass
+        self._record(test, 'passed')
+
+
+def _unittest_outcomes(path: str) -> Outcomes:
+    ''' Runs in a subprocess, since importing the tests has side effects '''
+    root, name = _module_name(path)
+    sys.path.insert(0, root)
+    suite = unittest.defaultTestLoader.loadTestsFromName(name)
+    result = _RecordingResult()
+    suite.run(result)
+    return result.outcomes
+
+
+def _pytest_outcomes(xml: Path, module: str) -> Outcomes:
+    outcomes: Outcomes = {}
+    for case in ET.parse(xml).iter('testcase'):
+        # '<package>.<module>.<class>', where the package depends on
+        # pytest's rootdir, so only what follows the module is kept
+        parts = case.get('classname', '').split('.')
+        if module in parts:
+            parts = parts[parts.index(module) + 1:]
+        name = _test_name('.'.join(parts), case.get('name', ''))
+        outcome = 'passed'
+        for child in case:
+            if child.tag in ('failure', 'error'):
+                outcome = 'failed'
+                break
+            if child.tag == 'skipped':
+                xfail = child.get('type') == 'pytest.xfail'
+                outcome = 'xfailed' if xfail else 'skipped'
+        outcomes[name] = outcome
+    return outcomes
+
+
+def _run(cmd: Sequence[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+    )
+    return time.perf_counter() - start
+
+
+def run_unittest(path: str) -> tuple[Outcomes, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp, 'outcomes.json')
+        seconds = _run([sys.executable, '-m', __name__, path, str(out)])
+        try:
+            return json.loads(out.read_text()), seconds
+        except (OSError, ValueError):
+            return RUN_FAILED, seconds
+
+
+def run_pytest(path: str) -> tuple[Outcomes, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        xml = Path(tmp, 'junit.xml')
+        seconds = _run([
+            sys.executable, '-m', 'pytest', path,
+            '-p', 'no:cacheprovider', f'--junitxml={xml}',
+        ])
+        try:
+            return _pytest_outcomes(xml, Path(path).stem), seconds
+        except (OSError, ET.ParseError):
+            return RUN_FAILED, seconds
+
+
+def _write_copy(path: Path, converted: str) -> bool:
+    '''
+    Write the converted source to `path`, unless one of the user's files
+    is already there
+    '''
+    try:
+        with open(path, 'x') as f:
+            f.write(MARKER + converted)
+        return True
+    except FileExistsError:
+        with open(path, 'rb') as f:
+            if f.read(len(MARKER)) != MARKER.encode():
+                return False
+    # left behind by a run that was killed
+    path.write_text(MARKER + converted)
+    return True
+
+
+def verify_module(path: str, converted: str) -> ModuleResult:
+    '''
+    Run the original module under unittest, then its converted source
+    under pytest. The converted source is written next to the original, so
+    that its imports and conftest.py files are the same, and removed after.
+    '''
+    original = Path(path)
+    copy = original.with_name(f'{original.stem}__pytestify_verify.py')
+    if not _write_copy(copy, converted):
+        return ModuleResult(
+            path, {}, {}, [0.0, 0.0],
+            problem=f'since {copy} is in the way of its converted copy',
+        )
+    try:
+        unittest_outcomes, unittest_seconds = run_unittest(path)
+        pytest_outcomes, pytest_seconds = run_pytest(str(copy))
+    finally:
+        copy.unlink()
+    return ModuleResult(
+        path,
+        unittest_outcomes,
+        pytest_outcomes,
+        [unittest_seconds, pytest_seconds],
+    )
+
+
+def _load_cache(cache: Path) -> dict[str, Any]:
+    try:
+        data = json.loads(cache.read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != VERSION:
+        return {}
+    modules: dict[str, Any] = data['modules']
+    return modules
+
+
+def _save_cache(cache: Path, modules: dict[str, Any]) -> None:
+    tmp = cache.with_name(cache.name + '.tmp')
+    tmp.write_text(json.dumps({'version': VERSION, 'modules': modules}))
+    os.replace(tmp, cache)
+
+
+def verify(
+    paths: Iterable[str],
+    convert: Callable[[str], str],
+    *,
+    jobs: int = 1,
+    cache: Path | None = None,
+) -> Iterator[ModuleResult]:
+    '''
+    Compare the test outcomes of each module before and after `convert`,
+    running `jobs` modules at a time. Modules that `convert` doesn't change
+    aren't run. With a `cache`, a module whose original and converted
+    sources are unchanged since it was last verified isn't run again.
+    '''
+    modules = _load_cache(cache) if cache is not None else {}
+    todo = []
+    for path in paths:
+        original = Path(path).read_text()
+        converted = convert(original)
+        if no_ws(converted) == no_ws(original):
+            continue
+        key = os.path.abspath(path)
+        digest = hashlib.sha256(
+            f'{original}\0{converted}'.encode(),
+        ).hexdigest()
+        entry = modules.get(key)
+        if entry is not None and entry['hash'] == digest:
+            _hooks.cache_hit('verify', key)
+            yield ModuleResult(
+                path,
+                entry['unittest'],
+                entry['pytest'],
+                entry['seconds'],
+                cached=True,
+            )
+        else:
+            _hooks.cache_miss('verify', key)
+            todo.append((path, converted, key, digest))
+
+    # each module is run in subprocesses, so threads are enough to
+    # keep `jobs` of them going at once
+    try:
+        with ThreadPoolExecutor(jobs) as executor:
+            futures = [
+                (executor.submit(verify_module, path, converted), key, digest)
+                for path, converted, key, digest in todo
+            ]
+            for future, key, digest in futures:
+                result = future.result()
+                if result.problem is not None:
+                    yield result
+                    continue
+                modules[key] = {
+                    'hash': digest,
+                    'unittest': result.unittest,
+                    'pytest': result.pytest,
+                    'seconds': result.seconds,
+                }
+                yield result
+    finally:
+        if cache is not None:
+            _save_cache(cache, modules)
+
+
+if __name__ == '__main__':
+    Path(sys.argv[2]).write_text(json.dumps(_unittest_outcomes(sys.argv[1])))
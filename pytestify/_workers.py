@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import concurrent.futures
+import multiprocessing
+import time
+import traceback
+from collections import deque
+from concurrent.futures import (
+    Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor,
+)
+from multiprocessing.connection import Connection, wait
+from typing import (
+    Any, Callable, Generic, Iterable, Iterator, Sequence, TypeVar,
+)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class WorkerError(Exception):
+    ''' A task that didn't produce a result, since its worker was lost '''
+
+
+class TaskError(WorkerError):
+    '''
+    A task that raised an exception. Its worker carries on, and only the
+    exception's description and traceback are sent back, since exceptions
+    aren't all picklable.
+    '''
+
+    def __init__(self, reason: str, traceback: str) -> None:
+        super().__init__(reason, traceback)
+        self.traceback = traceback
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+def _failed(e: Exception) -> TaskError:
+    ''' The exception being handled, as a task's result '''
+    return TaskError(
+        f'because of {type(e).__name__}: {e}',
+        traceback.format_exc(),
+    )
+
+
+def _work(
+    conn: Connection,
+    func: Callable[[Any, Any], Any],
+    args: Any,
+) -> None:
+    while True:
+        try:
+            batch = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if batch is None:
+            return
+        for item in batch:
+            try:
+                result = func(item, args)
+            except Exception as e:
+                result = _failed(e)
+            conn.send(result)
+
+
+class _Worker:
+    def __init__(self, func: Callable[[Any, Any], Any], args: Any) -> None:
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_work,
+            args=(child_conn, func, args),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+
+class _Task(Generic[T]):
+    def __init__(self, worker: _Worker, batch: Sequence[T]) -> None:
+        self.worker = worker
+        self.batch = batch
+        self.done = 0
+        self.started = time.monotonic()
+
+    @property
+    def current(self) -> T:
+        return self.batch[self.done]
+
+    def rest(self) -> list[Sequence[T]]:
+        rest = self.batch[self.done + 1:]
+        return [rest] if rest else []
+
+
+class WorkerPool(Generic[T, R]):
+    '''
+    A process pool that runs `func(item, args)` for each item.
+
+    Unlike `multiprocessing.Pool`, a worker that exceeds `timeout` seconds
+    on a single item is killed and replaced, and the item is reported as
+    a `WorkerError` rather than blocking the rest of the pool. An item
+    that raises an exception is reported as a `TaskError`, and its worker
+    is kept.
+    '''
+
+    def __init__(
+        self,
+        func: Callable[[T, Any], R],
+        args: Any,
+        *,
+        jobs: int,
+        timeout: float | None = None,
+    ) -> None:
+        self.func = func
+        self.args = args
+        self.timeout = timeout
+        self.workers = [_Worker(func, args) for _ in range(jobs)]
+
+    def __enter__(self) -> WorkerPool[T, R]:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        new = _Worker(self.func, self.args)
+        self.workers[self.workers.index(worker)] = new
+        return new
+
+    def imap_unordered(
+        self,
+        items: Iterable[T],
+        *,
+        on_start: Callable[[T], object] | None = None,
+    ) -> Iterator[tuple[T, R | WorkerError]]:
+        return self.imap_batches(
+            ([item] for item in items),
+            on_start=on_start,
+        )
+
+    def imap_batches(
+        self,
+        batches: Iterable[Sequence[T]],
+        *,
+        on_start: Callable[[T], object] | None = None,
+    ) -> Iterator[tuple[T, R | WorkerError]]:
+        '''
+        Send each batch of items to a single worker, which saves a round
+        trip per item. The timeout still applies to each item, and the
+        rest of a batch is retried if its worker is lost.
+
+        `on_start` is called with each item as a worker starts on it.
+        '''
+        pending = iter(batches)
+        retry: deque[Sequence[T]] = deque()
+        idle = list(self.workers)
+        busy: dict[Connection, _Task[T]] = {}
+        exhausted = False
+
+        while True:
+            while idle:
+                if retry:
+                    batch = retry.popleft()
+                elif not exhausted:
+                    try:
+                        batch = next(pending)
+                    except StopIteration:
+                        exhausted = True
+                        continue
+                else:
+                    break
+                if not batch:
+                    continue
+                worker = idle.pop()
+                worker.conn.send(batch)
+                busy[worker.conn] = _Task(worker, batch)
+                if on_start is not None:
+                    on_start(batch[0])
+            if not busy:
+                return
+
+            wait_for = None
+            if self.timeout is not None:
+                first_deadline = min(t.started for t in busy.values())
+                first_deadline += self.timeout
+                wait_for = max(0.0, first_deadline - time.monotonic())
+
+            for conn in wait(list(busy), wait_for):
+                assert isinstance(conn, Connection)
+                task = busy[conn]
+                try:
+                    result: R | WorkerError = conn.recv()
+                except EOFError:
+                    del busy[conn]
+                    idle.append(self._replace(task.worker))
+                    retry.extend(task.rest())
+                    result = WorkerError('because its worker process died')
+                    yield task.current, result
+                    continue
+
+                item = task.current
+                task.done += 1
+                task.started = time.monotonic()
+                if task.done == len(task.batch):
+                    del busy[conn]
+                    idle.append(task.worker)
+                elif on_start is not None:
+                    on_start(task.current)
+                yield item, result
+
+            if self.timeout is None:
+                continue
+            now = time.monotonic()
+            for conn, task in list(busy.items()):
+                if now - task.started >= self.timeout:
+                    del busy[conn]
+                    idle.append(self._replace(task.worker))
+                    retry.extend(task.rest())
+                    yield task.current, WorkerError(
+                        f'because it took longer than {self.timeout} seconds',
+                    )
+
+
+def _call(
+    func: Callable[[T, Any], R],
+    item: T,
+    args: Any,
+    on_start: Callable[[T], object] | None,
+) -> R | TaskError:
+    if on_start is not None:
+        on_start(item)
+    try:
+        return func(item, args)
+    except Exception as e:
+        return _failed(e)
+
+
+def thread_imap_unordered(
+    func: Callable[[T, Any], R],
+    args: Any,
+    items: Iterable[T],
+    *,
+    threads: int,
+    on_start: Callable[[T], object] | None = None,
+) -> Iterator[tuple[T, R | TaskError]]:
+    '''
+    Run `func(item, args)` for each item in a thread pool, without
+    reading far ahead of `items` (which may still be streaming in). As in
+    a `WorkerPool`, an item that raises an exception is reported as a
+    `TaskError`.
+    '''
+    with ThreadPoolExecutor(threads) as executor:
+        pending: dict[Future[R | TaskError], T] = {}
+        for item in items:
+            future = executor.submit(_call, func, item, args, on_start)
+            pending[future] = item
+            if len(pending) >= threads * 2:
+                done, _ = concurrent.futures.wait(
+                    pending,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    yield pending.pop(future), future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield pending[future], future.result()
+
+
+def kill_executor(executor: Executor) -> None:
+    '''
+    Abandon whatever `executor` is running. A process pool's tasks can't be
+    cancelled once they've started, so its processes are killed, as a
+    `WorkerPool` kills a worker that's stuck.
+    '''
+    if isinstance(executor, ProcessPoolExecutor):
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+    executor.shutdown(wait=False)
@@ -0,0 +1,314 @@
+'''
+Writes fixed files in batches. Each file is written to a temporary sibling,
+then renamed into place, so that an interrupted run never leaves a file
+half written. With a journal, the originals are kept as well, so that a run
+can be rolled back, and each batch is flushed to disk along with the
+journal before it replaces anything.
+'''
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from pytestify import _hooks
+
+JOURNAL = '.pytestify-journal'
+JOURNAL_VERSION = 1
+BATCH_SIZE = 256
+
+
+def encode(contents: str) -> bytes:
+    ''' The bytes `Path.write_text(contents)` would write '''
+    buffer = io.BytesIO()
+    wrapper = io.TextIOWrapper(buffer)
+    wrapper.write(contents)
+    wrapper.flush()
+    data = buffer.getvalue()
+    wrapper.detach()
+    return data
+
+
+def _digest(data: bytes | None) -> str | None:
+    return None if data is None else hashlib.sha256(data).hexdigest()
+
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _tmp_path(path: str) -> str:
+    # in the same directory, so that renaming it over `path` is atomic
+    head, tail = os.path.split(path)
+    return os.path.join(head, f'.{tail}.pytestify-tmp')
+
+
+def _sync_dirs(directories: Iterable[str]) -> None:
+    ''' Make the files created in, or renamed into, `directories` durable '''
+    if os.name == 'nt':
+        # directories can't be opened there, and renames are durable anyway
+        return
+    for directory in sorted(set(directories)):
+        fd = os.open(directory or '.', os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _write_tmp(
+    data: bytes,
+    path: str,
+    mode_from: str | None,
+    *,
+    sync: bool = False,
+) -> str:
+    tmp = _tmp_path(path)
+    with open(tmp, 'wb') as f:
+        if mode_from is not None:
+            shutil.copymode(mode_from, tmp)
+        f.write(data)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    return tmp
+
+
+class Entry(NamedTuple):
+    path: str
+    backup: str  # the original's name in the journal
+    before: str  # hashes of the original and the fixed file
+    after: str
+
+
+class Journal:
+    '''
+    The originals of the files a run rewrote, as hard links (or copies)
+    in `root`, and a log of them. A run that was interrupted is continued,
+    so that rolling back undoes all of it. Otherwise, the journal of the
+    last run is replaced.
+    '''
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.log = root / 'journal.jsonl'
+        self.backups = root / 'backups'
+        self._file: Any = None
+        self._count = 0
+
+    def entries(self) -> list[Entry]:
+        entries = []
+        with open(self.log) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line, if a run was killed while writing it
+                    break
+                if 'version' in record:
+                    if record['version'] != JOURNAL_VERSION:
+                        raise ValueError(
+                            f'{self.log} is from another version of '
+                            'pytestify',
+                        )
+                elif 'path' in record:
+                    entries.append(Entry(**record))
+        return entries
+
+    def finished(self) -> bool:
+        try:
+            with open(self.log, 'rb') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return True
+        return bool(lines) and lines[-1] == b'{"finished": true}'
+
+    def remove(self) -> None:
+        # only what the journal put there, in case `root` holds other files
+        shutil.rmtree(self.backups, ignore_errors=True)
+        try:
+            os.remove(self.log)
+            os.rmdir(self.root)
+        except OSError:
+            pass
+
+    def _open(self) -> None:
+        if self.finished():
+            self.remove()
+            self.backups.mkdir(parents=True)
+            self._file = open(self.log, 'a')
+            self._record({'version': JOURNAL_VERSION})
+        else:
+            self._count = len(self.entries())
+            self._file = open(self.log, 'a')
+
+    def _record(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record) + '\n')
+
+    def add(self, path: str, before: bytes, after: bytes) -> None:
+        if self._file is None:
+            self._open()
+        backup = str(self._count)
+        self._count += 1
+        try:
+            # the original's inode outlives the rename, so nothing's copied
+            os.link(path, self.backups / backup)
+        except OSError:
+            shutil.copyfile(path, self.backups / backup)
+        self._record({
+            'path': path,
+            'backup': backup,
+            'before': _digest(before),
+            'after': _digest(after),
+        })
+        # written out, to be made durable with the rest of the batch
+        self._file.flush()
+
+    def sync(self) -> None:
+        ''' Make the originals and the log durable '''
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            _sync_dirs(map(str, (self.root.parent, self.root, self.backups)))
+
+    def finish(self) -> None:
+        if self._file is not None:
+            self._record({'finished': True})
+            self._file.flush()
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class FileWriter:
+    '''
+    Rewrites files `batch_size` at a time. Files are only written if their
+    bytes change. With a journal, a batch is flushed to disk before it's
+    renamed into place, and the renames after. If the writer exits with an
+    error, the batch in progress is dropped.
+    '''
+
+    def __init__(
+        self,
+        *,
+        journal: Path | None = None,
+        batch_size: int = BATCH_SIZE,
+    ) -> None:
+        self.journal = Journal(journal) if journal is not None else None
+        self.batch_size = batch_size
+        # the files paths resolve to -> the paths as given, and the
+        # temporary files to rename over them
+        self.staged: dict[str, tuple[str, str]] = {}
+
+    def __enter__(self) -> FileWriter:
+        return self
+
+    def __exit__(self, exc_type: object, *exc: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, path: str, contents: str) -> bool:
+        ''' Stage `contents` to be written to `path`, if it changes it '''
+        # write through symlinks, as `Path.write_text` does
+        real = os.path.realpath(path)
+        if real in self.staged:
+            # it's fixed twice, e.g. listed twice, so it's compared with
+            # (and journaled after) the first fix
+            self.commit()
+        data = encode(contents)
+        original = _read(real)
+        if data == original:
+            return False
+        mode_from = real if original is not None else None
+        tmp = _write_tmp(
+            data, real, mode_from, sync=self.journal is not None,
+        )
+        self.staged[real] = (path, tmp)
+        if self.journal is not None and original is not None:
+            self.journal.add(real, original, data)
+        if len(self.staged) >= self.batch_size:
+            self.commit()
+        return True
+
+    def commit(self) -> None:
+        if not self.staged:
+            return
+        if self.journal is not None:
+            # the originals first, so that any file replaced can be restored
+            self.journal.sync()
+        for real, (path, tmp) in self.staged.items():
+            os.replace(tmp, real)
+            _hooks.write(path)
+        if self.journal is not None:
+            _sync_dirs(os.path.dirname(real) for real in self.staged)
+        self.staged = {}
+
+    def abort(self) -> None:
+        for _, tmp in self.staged.values():
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        self.staged = {}
+        if self.journal is not None:
+            self.journal.close()
+
+    def close(self) -> None:
+        self.commit()
+        if self.journal is not None:
+            self.journal.finish()
+
+
+class Restored(NamedTuple):
+    path: str
+    restored: bool  # False if it changed since pytestify wrote it
+
+
+def rollback(root: Path) -> Iterator[Restored]:
+    '''
+    Put back the originals of the files in the journal at `root`. A file
+    that changed since pytestify wrote it is left alone. The journal is
+    removed once every file is restored.
+    '''
+    journal = Journal(root)
+    entries = journal.entries()
+    restored: list[str] = []
+    kept = False
+    # newest first, so that a file written twice ends up as it first was
+    for entry in reversed(entries):
+        try:
+            os.unlink(_tmp_path(entry.path))
+        except FileNotFoundError:
+            pass
+        current = _digest(_read(entry.path))
+        if current == entry.before:
+            # its batch was never committed
+            continue
+        if current != entry.after:
+            kept = True
+            yield Restored(entry.path, False)
+            continue
+        backup = _read(str(journal.backups / entry.backup))
+        assert backup is not None
+        tmp = _write_tmp(backup, entry.path, entry.path, sync=True)
+        os.replace(tmp, entry.path)
+        restored.append(entry.path)
+        yield Restored(entry.path, True)
+    # before the journal that could restore them again is removed
+    _sync_dirs(os.path.dirname(path) for path in restored)
+    if not kept:
+        journal.remove()
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
 import ast
+import collections
 import re
 import sys
+import threading
 from dataclasses import dataclass, field
 from tokenize import TokenError
+from types import MappingProxyType
 from typing import NamedTuple
 
 from tokenize_rt import Token, src_to_tokens
 
-from pytestify._ast_helpers import NodeVisitor
+from pytestify import _hooks
+from pytestify._ast_helpers import NodeVisitor, has_plain_line_breaks
 from pytestify._token_helpers import (
-    find_closing_paren, find_outer_comma, remove_token,
+    Tokens, find_closing_paren, find_outer_comma, find_outer_commas,
+    remove_token,
 )
 
 
@@ -24,7 +29,7 @@ class _Assert(NamedTuple):
 
 
 # https://docs.python.org/3/library/unittest.html#assert-methods
-ASSERT_TYPES = {
+_ASSERT_TYPES = {
     # unary asserts
     'assertTrue': _Assert('unary'),
     'assertFalse': _Assert('unary', prefix='not '),
@@ -90,8 +95,11 @@ ALIASES = {
     'assertNotEquals': 'assertNotEqual',
 }
 
-for alias, orig in ALIASES.items():
-    ASSERT_TYPES[alias] = ASSERT_TYPES[orig]
+# read-only, since it's shared between threads
+ASSERT_TYPES = MappingProxyType({
+    **_ASSERT_TYPES,
+    **{alias: _ASSERT_TYPES[orig] for alias, orig in ALIASES.items()},
+})
 
 
 @dataclass
@@ -102,6 +110,7 @@ class Call:
     end_line: int
     commas: list[Token]
     comments: list[Token]
+    operators: list[Token]
     keywords: list[ast.keyword]
     places: int | None = None
     delta: int | None = None
@@ -124,70 +133,99 @@ class Call:
 
 
 class Visitor(NodeVisitor):
-    def __init__(self, tokens: list[Token]):
-        self.calls: list[Call] = []
-        self.tokens = tokens
+    '''
+    Finds calls to assert methods. Their tokens are found afterwards by
+    `calls`, so that this can visit a tree shared with other fixers.
+    '''
+
+    def __init__(self) -> None:
+        self.nodes: list[tuple[str, ast.Call]] = []
 
     def visit_Call(self, call: ast.Call) -> None:
         method = getattr(call.func, 'attr', None)
         if not method or method not in ASSERT_TYPES:
             return
+        self.nodes.append((method, call))
 
-        line = call.lineno
-        call_idx = next(
-            tok_no for tok_no, tok in enumerate(self.tokens)
-            if tok.src == method and tok.line == line
-        )
+    def calls(self, tokens: Tokens) -> list[Call]:
+        return _find_calls(self.nodes, tokens)
 
-        comments = [
-            t for i, t in enumerate(self.tokens)
-            if i >= call_idx and t.name == 'COMMENT'
-        ]
-        operators = [
-            t for i, t in enumerate(self.tokens)
-            if i >= call_idx and t.name == 'OP'
-        ]
-        open_paren = next(t for t in operators if t.src == '(')
-        commas = [
-            find_outer_comma(operators, comma_no=1),
-            find_outer_comma(operators, comma_no=2),
-        ]
-        close_paren = find_closing_paren(open_paren, operators)
-        if commas[1] and commas[1].line > close_paren.line:
-            commas[1] = None
-
-        kwargs = {}
-        for keyword in call.keywords or []:
-            if keyword.arg in ['places', 'delta']:
-                # assertAlmostEqual / assertAlmostEquals
-                arg = keyword.arg
-                if isinstance(keyword.value, ast.Call):
-                    # this is likely a `delta=timedelta() / datetime()`.
-                    # pytest doesn't yet support these
-                    # https://github.com/pytest-dev/pytest/issues/8395
-                    #
-                    # still rewrite it, but without specially handling it
-                    continue
-
-                const = keyword.value
-                if sys.version_info >= (3, 8):
-                    kwargs[arg] = const.value  # type: ignore
-                else:
-                    # Prior to Python 3.8, const is actually a ast.Num object
-                    kwargs[arg] = const.n  # type: ignore
-        end_line = close_paren.line
-        self.calls.append(
-            Call(
-                name=method,
-                line=line - 1,
-                token_idx=call_idx,
-                end_line=end_line - 1,
-                comments=comments,
-                commas=commas,
-                keywords=call.keywords,
-                **kwargs
-            ),
-        )
+
+def _find_calls(
+    nodes: list[tuple[str, ast.Call]],
+    tokens: Tokens,
+) -> list[Call]:
+    return [_find_call(method, call, tokens) for method, call in nodes]
+
+
+def _find_call(method: str, call: ast.Call, tokens: Tokens) -> Call:
+    line = call.lineno
+    call_idx = next(
+        tok_no for tok_no in range(tokens.first_on_line(line), len(tokens))
+        if tokens.src_at(tok_no) == method and tokens.line_at(tok_no) == line
+    )
+
+    # only the tokens up to the end of the line the call ends on are
+    # needed, so that each call is found in time proportional to its size.
+    # Only its comments and operators are made into `Token`s.
+    comments, operators = [], []
+    depth = 0
+    last_line = None
+    for tok_no in range(call_idx, len(tokens)):
+        if last_line is not None and tokens.line_at(tok_no) > last_line:
+            break
+        name = tokens.name_at(tok_no)
+        if name == 'COMMENT':
+            comments.append(tokens[tok_no])
+        elif name == 'OP':
+            tok = tokens[tok_no]
+            operators.append(tok)
+            if tok.src == '(':
+                depth += 1
+            elif tok.src == ')':
+                depth -= 1
+                if depth == 0 and last_line is None:
+                    last_line = tok.line
+    open_paren = next(t for t in operators if t.src == '(')
+    close_paren = find_closing_paren(open_paren, operators)
+    commas: list[Token] = find_outer_commas(operators, limit=2)
+    if not commas and ASSERT_TYPES[method].type == 'binary':
+        # e.g. `assertEqual(*args)`, which takes the next comma after it
+        rest = (tokens[i] for i in range(call_idx, len(tokens)))
+        commas = find_outer_commas(rest, limit=1)
+    commas += [None] * (2 - len(commas))  # type: ignore[list-item]
+
+    kwargs = {}
+    for keyword in call.keywords or []:
+        if keyword.arg in ['places', 'delta']:
+            # assertAlmostEqual / assertAlmostEquals
+            arg = keyword.arg
+            if isinstance(keyword.value, ast.Call):
+                # this is likely a `delta=timedelta() / datetime()`.
+                # pytest doesn't yet support these
+                # https://github.com/pytest-dev/pytest/issues/8395
+                #
+                # still rewrite it, but without specially handling it
+                continue
+
+            const = keyword.value
+            if sys.version_info >= (3, 8):
+                kwargs[arg] = const.value  # type: ignore
+            else:
+                # Prior to Python 3.8, const is actually a ast.Num object
+                kwargs[arg] = const.n  # type: ignore
+    end_line = close_paren.line
+    return Call(
+        name=method,
+        line=line - 1,
+        token_idx=call_idx,
+        end_line=end_line - 1,
+        comments=comments,
+        commas=commas,
+        operators=operators,
+        keywords=call.keywords,
+        **kwargs
+    )
 
 
 def rewrite_parens(
@@ -235,10 +273,17 @@ def combine_assert(call: Call, content_list: list[str]) -> bool:
         return False
 
 
-def add_suffix(call: Call, content_list: list[str], suffix: str) -> None:
+def add_suffix(
+    call: Call,
+    content_list: list[str],
+    suffix: str,
+    line_offset: int = 0,
+) -> None:
     for comment in call.comments:
+        # comments are on their original lines, from before any asserts
+        # above were shortened
         if (
-            call.end_line == comment.line - 1
+            call.end_line == comment.line - 1 - line_offset
             and comment.src in content_list[call.end_line]
         ):
             content_list[call.end_line] = (
@@ -262,23 +307,26 @@ def add_suffix(call: Call, content_list: list[str], suffix: str) -> None:
         if (
             # We don't try to infer the suffix location if...
             # 1. There's more than one comma
-            len(call_contents.split(',')) > 2 or
+            call_contents.count(',') > 1 or
             # 2. There are keywords _besides_ 'msg'
             len({k.arg for k in call.keywords} - {'msg'}) > 0
         ):
             content_list[call.end_line] += suffix
         else:
             call_contents = call_contents.replace(',', suffix + ',')
-            i = 0
-            for line in range(call.line, call.end_line + 1):
-                content_list[line] = call_contents.split('\n')[i]
-                i += 1
+            content_list[call.line:call.end_line + 1] = (
+                call_contents.split('\n')
+            )
     else:
         content_list[call.end_line] = content_list[call.end_line] + suffix
 
 
 def add_slashes(call: Call, content_list: list[str]) -> None:
+    if call.line == call.end_line:
+        # only lines before the last get a slash
+        return
     contents = '\n'.join(content_list[call.line: call.end_line + 1])
+    # a single call's tokens, so they're few enough to keep as a list
     try:
         tokens = src_to_tokens(contents)
     except TokenError:
@@ -286,6 +334,10 @@ def add_slashes(call: Call, content_list: list[str]) -> None:
         tokens = []
 
     comma = find_outer_comma(tokens, stack_loc=0)
+    comments: dict[int, Token] = {}
+    for tok in tokens:
+        if tok.name == 'COMMENT':
+            comments.setdefault(tok.line, tok)
     for i in range(call.line, call.end_line):
         line = content_list[i]
 
@@ -295,13 +347,9 @@ def add_slashes(call: Call, content_list: list[str]) -> None:
             pass
         elif line.endswith(('{', '[', '(', ',')):
             continue
-        comments = [
-            t for t in tokens if t.name ==
-            'COMMENT' and t.line == i - call.line + 1
-        ]
-
-        if comments:
-            loc = comments[0].utf8_byte_offset
+        comment = comments.get(i - call.line + 1)
+        if comment:
+            loc = comment.utf8_byte_offset
             line = line[:loc].rstrip() + ' \\  ' + line[loc:]
         else:
             line += ' \\'
@@ -326,19 +374,21 @@ def remove_msg_param(call: Call, content_list: list[str]) -> None:
 
 def should_swap_eq_for_is(
     call: Call,
-    tokens: list[Token],
+    tokens: Tokens,
     comma: Token,
 ) -> bool:
-    toks_after = [
-        tok for i, tok in enumerate(tokens)
-        if i > call.token_idx and
-        tok.name not in ('UNIMPORTANT_WS', 'ENDMARKER')
-    ]
-    l_tokens, r_tokens = [], []
+    l_tokens: list[Token] = []
+    r_tokens: list[Token] = []
     started_paren = False
     reached_comma = False
 
-    for tok in toks_after:
+    for tok_no in range(call.token_idx + 1, len(tokens)):
+        tok = tokens[tok_no]
+        if tok.name in ('UNIMPORTANT_WS', 'ENDMARKER'):
+            continue
+        if len(r_tokens) > 2:
+            # even without the closing paren, it's more than one token
+            break
         if started_paren:
             if not reached_comma and tok == comma:
                 reached_comma = True
@@ -353,9 +403,9 @@ def should_swap_eq_for_is(
         r_tokens = r_tokens[:-1]
 
     return any(
-        len(tokens) == 1 and tokens[0].name == 'NAME'
-        and tokens[0].src in ['None', 'True', 'False']
-        for tokens in [l_tokens, r_tokens]
+        len(side) == 1 and side[0].name == 'NAME'
+        and side[0].src in ['None', 'True', 'False']
+        for side in [l_tokens, r_tokens]
     )
 
 
@@ -365,13 +415,108 @@ def remove_trailing_comma(call: Call, contents: list[str]) -> None:
         contents[last] = contents[last][:-1]
 
 
-def rewrite_asserts(contents: str, *, with_count_equal: bool = False) -> str:
-    tokens = src_to_tokens(contents)
-    visitor = Visitor(tokens).visit_text(contents)
-    content_list = contents.splitlines()
+class _Memo:
+    '''
+    The rewrites of the most recently seen single-line asserts. It's shared
+    by every file fixed in a process, since test suites repeat the same
+    asserts over and over.
+    '''
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._rewrites: collections.OrderedDict[
+            tuple[str, bool], str,
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, bool]) -> str | None:
+        with self._lock:
+            rewrite = self._rewrites.get(key)
+            if rewrite is not None:
+                self._rewrites.move_to_end(key)
+            return rewrite
+
+    def add(self, key: tuple[str, bool], rewrite: str) -> None:
+        with self._lock:
+            self._rewrites[key] = rewrite
+            if len(self._rewrites) > self.size:
+                self._rewrites.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rewrites.clear()
+
+
+_memo = _Memo(size=4096)
+
+
+def _alone_on_line(call: ast.Call, line: str) -> str | None:
+    '''
+    If `call` is on a line of its own, besides indentation and a comment,
+    that line without its indentation
+    '''
+    if getattr(call, 'end_lineno', None) != call.lineno:
+        return None
+    # ast offsets count utf-8 bytes
+    encoded = line.encode()
+    end = encoded[call.end_col_offset:].decode().lstrip()  # type: ignore
+    if encoded[:call.col_offset].strip() or end and not end.startswith('#'):
+        return None
+    return encoded[call.col_offset:].decode()
+
+
+def _rewrite_memoized(
+    nodes: list[tuple[str, ast.Call]],
+    content_list: list[str],
+    with_count_equal: bool,
+) -> list[tuple[str, ast.Call]]:
+    '''
+    Rewrite asserts that are alone on their line from the memo, returning
+    the rest. A single-line assert is rewritten the same way wherever it
+    is, so a miss is rewritten by itself and remembered.
+    '''
+    per_line = collections.Counter(call.lineno for _, call in nodes)
+    rest = []
+    for method, call in nodes:
+        line = content_list[call.lineno - 1]
+        text = _alone_on_line(call, line) if per_line[call.lineno] == 1 \
+            else None
+        if text is None:
+            rest.append((method, call))
+            continue
+
+        key = (text, with_count_equal)
+        rewrite = _memo.get(key)
+        if rewrite is not None:
+            _hooks.cache_hit('assert', text)
+        else:
+            _hooks.cache_miss('assert', text)
+            try:
+                rewrite = _rewrite_calls(
+                    text, Visitor().visit_text(text).nodes, with_count_equal,
+                )
+            except (SyntaxError, TokenError, ValueError, StopIteration):
+                # e.g. `self.assertEqual(*args)`, which takes a comma from
+                # the lines after it
+                rest.append((method, call))
+                continue
+            _memo.add(key, rewrite)
+        content_list[call.lineno - 1] = line[:len(line) - len(text)] + rewrite
+    return rest
+
+
+def _rewrite_calls(
+    contents: str,
+    nodes: list[tuple[str, ast.Call]],
+    with_count_equal: bool,
+    content_list: list[str] | None = None,
+) -> str:
+    tokens = Tokens(contents)
+    if content_list is None:
+        content_list = contents.splitlines()
 
     line_offset = 0
-    for call in visitor.calls:
+    for call in _find_calls(nodes, tokens):
         if not with_count_equal and call.name in (
             'assertCountEqual', 'assertItemsEqual',
         ):
@@ -379,13 +524,10 @@ def rewrite_asserts(contents: str, *, with_count_equal: bool = False) -> str:
         call.line -= line_offset
         call.end_line -= line_offset
         assert_type = ASSERT_TYPES[call.name]
-        ops_after = [
-            tok for i, tok in enumerate(tokens)
-            if i > call.token_idx and tok.name == 'OP'
-        ]
-
         comma = call.commas[0]
-        deleted_end_line = rewrite_parens(ops_after, call, content_list, comma)
+        deleted_end_line = rewrite_parens(
+            call.operators, call, content_list, comma,
+        )
         remove_msg_param(call, content_list)
         remove_trailing_comma(call, content_list)
 
@@ -430,10 +572,39 @@ def rewrite_asserts(contents: str, *, with_count_equal: bool = False) -> str:
             call.end_line -= 1
 
         if assert_type.suffix:
-            add_suffix(call, content_list, assert_type.suffix)
+            add_suffix(call, content_list, assert_type.suffix, line_offset)
 
         did_combine = combine_assert(call, content_list)
         line_offset += int(did_combine) + int(deleted_end_line)
         add_slashes(call, content_list)
 
     return '\n'.join(content_list)
+
+
+def rewrite_asserts(
+    contents: str,
+    *,
+    with_count_equal: bool = False,
+    visitor: Visitor | None = None,
+) -> str:
+    if visitor is None:
+        visitor = Visitor().visit_text(contents)
+    nodes = visitor.nodes
+    if not has_plain_line_breaks(contents):
+        # the lines of the syntax tree don't match `splitlines`
+        return _rewrite_calls(contents, nodes, with_count_equal)
+
+    content_list = contents.splitlines()
+    nodes = _rewrite_memoized(
+        [
+            (method, call) for method, call in nodes
+            if with_count_equal or method not in (
+                'assertCountEqual', 'assertItemsEqual',
+            )
+        ],
+        content_list,
+        with_count_equal,
+    )
+    if not nodes:
+        return '\n'.join(content_list)
+    return _rewrite_calls(contents, nodes, with_count_equal, content_list)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import ast
 from _ast import expr
+from typing import Collection
 
 from pytestify._ast_helpers import NodeVisitor
 
@@ -16,18 +17,59 @@ def is_test_class(base: expr) -> bool:
         return getattr(base, 'id', None) == 'TestCase'
 
 
+def base_name(base: expr) -> str | None:
+    ''' 'class MyClass(a.b.C):' has a base named 'C' '''
+    if isinstance(base, ast.Attribute):
+        return base.attr
+    return getattr(base, 'id', None)
+
+
 class Visitor(NodeVisitor):
-    def __init__(self) -> None:
+    def __init__(self, test_bases: Collection[str] = ()) -> None:
+        self.test_bases = test_bases
         self.test_classes: dict[int, str] = {}
+        # classes that inherit from TestCase through another class
+        self.test_subclasses: dict[int, str] = {}
 
     def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        line = node.lineno - 1
         if any(is_test_class(base) for base in node.bases):
-            line = node.lineno - 1
             self.test_classes[line] = node.name
+        elif any(base_name(base) in self.test_bases for base in node.bases):
+            self.test_subclasses[line] = node.name
+
+
+def inherits_test_case(contents: str, test_bases: Collection[str]) -> bool:
+    visitor = Visitor(test_bases).visit_text(contents)
+    return bool(visitor.test_subclasses)
+
 
+def test_class_name(name: str) -> str:
+    # prefix with "test" if not already. Strip out 'Tests' or 'Test'
+    # from the name if either is there
+    if name.startswith('Test'):
+        return name
+    if 'Tests' in name:
+        name = name.replace('Tests', '')
+    elif 'Test' in name:
+        name = name.replace('Test', '')
+    return 'Test' + name
 
-def remove_base_class(contents: str) -> str:
-    visitor = Visitor().visit_text(contents)
+
+def remove_base_class(
+    contents: str,
+    *,
+    test_bases: Collection[str] = (),
+    visitor: Visitor | None = None,
+) -> str:
+    '''
+    `test_bases` are the names of other classes that inherit from
+    TestCase. Classes inheriting from them are renamed, but keep their
+    base classes. Pass a `visitor` that has already visited the source to
+    skip parsing it again.
+    '''
+    if visitor is None:
+        visitor = Visitor(test_bases).visit_text(contents)
     content_list = contents.splitlines()
 
     # todo: detect if unittest has been aliased as something else
@@ -45,19 +87,14 @@ def remove_base_class(contents: str) -> str:
 
         # delete empty paren if they exist
         line = line.replace(f'{orig_name}():', f'{orig_name}:')
-
-        # prefix with "test" if not already. Strip out 'Tests' or 'Test'
-        # from the name if either is there
-        if not orig_name.startswith('Test'):
-            cls_name = orig_name
-            if 'Tests' in cls_name:
-                cls_name = cls_name.replace('Tests', '')
-            elif 'Test' in cls_name:
-                cls_name = cls_name.replace('Test', '')
-            cls_name = 'Test' + cls_name
-            line = line.replace(orig_name, cls_name)
-
+        line = line.replace(orig_name, test_class_name(orig_name))
         content_list[i] = line
 
+    for i, orig_name in visitor.test_subclasses.items():
+        line = content_list[i]
+        content_list[i] = line.replace(
+            orig_name, test_class_name(orig_name), 1,
+        )
+
     contents = '\n'.join(content_list)
     return contents
@@ -57,8 +57,13 @@ class Visitor(NodeVisitor):
             self.calls.add(node.lineno - 1)  # decorator
 
 
-def rewrite_pytest_funcs(contents: str) -> str:
-    visitor = Visitor().visit_text(contents)
+def rewrite_pytest_funcs(
+    contents: str,
+    *,
+    visitor: Visitor | None = None,
+) -> str:
+    if visitor is None:
+        visitor = Visitor().visit_text(contents)
     calls = visitor.calls
     content_list = contents.splitlines()
     for line_no in sorted(calls):
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import ast
 
-from pytestify._ast_helpers import NodeVisitor, imports_pytest
+from pytestify._ast_helpers import (
+    FindImportName, NodeVisitor, ast_parse, visit_all,
+)
 
 
 class Visitor(NodeVisitor):
@@ -18,25 +20,26 @@ class Visitor(NodeVisitor):
             child = getattr(child, 'value', None)
 
 
+def insert_pytest_import(contents: str) -> str:
+    content_list = contents.splitlines()
+    import_line = 0
+    for i, line in enumerate(content_list):
+        if line.startswith('from __future__'):
+            import_line = i + 1
+        elif line.startswith(('from', 'import')):
+            import_line = i
+            break
+
+    content_list.insert(import_line, 'import pytest')
+    return '\n'.join(content_list)
+
+
 def add_pytest_import(contents: str) -> str:
     if 'pytest' not in contents:
         return contents
-    imports = imports_pytest(contents)
-    if imports:
-        return contents
-
-    visitor = Visitor().visit_text(contents)
-    if visitor.uses_pytest_func and not imports:
-        content_list = contents.splitlines()
-        import_line = 0
-        for i, line in enumerate(content_list):
-            if line.startswith('from __future__'):
-                import_line = i + 1
-            elif line.startswith(('from', 'import')):
-                import_line = i
-                break
-
-        content_list.insert(import_line, 'import pytest')
-        return '\n'.join(content_list)
+    imports, uses = FindImportName('pytest'), Visitor()
+    visit_all(ast_parse(contents), [imports, uses])
+    if uses.uses_pytest_func and not imports.imports:
+        return insert_pytest_import(contents)
     else:
         return contents
@@ -39,9 +39,13 @@ class Visitor(NodeVisitor):
 
 
 def rewrite_method_name(
-    contents: str, *, keep_casing: bool = False,
+    contents: str,
+    *,
+    keep_casing: bool = False,
+    visitor: Visitor | None = None,
 ) -> str:
-    visitor = Visitor(keep_casing=keep_casing).visit_text(contents)
+    if visitor is None:
+        visitor = Visitor(keep_casing=keep_casing).visit_text(contents)
     content_list = contents.splitlines()
     for line_no, method in visitor.to_rewrite.items():
         line = content_list[line_no]
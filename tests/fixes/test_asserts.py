@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import pytest
 
-from pytestify.fixes.asserts import rewrite_asserts
+import pytestify
+from pytestify.fixes.asserts import _memo, rewrite_asserts
 
 
 @pytest.mark.parametrize(
@@ -175,6 +176,17 @@ def test_rewrite_simple_asserts(before, after):
             'assert isinstance(x, y)\n'
             'assert isinstance(x, y)',
         ),
+        (
+            # the assert above is a line shorter once rewritten
+            'self.assertIsNone(\n'
+            '    a\n'
+            ')\n'
+            'self.assertIsNone(\n'
+            '    b  # hi\n'
+            ')',
+            'assert a is None\n'
+            'assert b is None # hi',
+        ),
     ],
 )
 def test_rewrite_complex_asserts(before, after):
@@ -412,3 +424,45 @@ def test_opt_in_rewrites(before, with_count_equal, after):
 )
 def test_doesnt_rewrite_asserts(line):
     assert rewrite_asserts(line) == line
+
+
+@pytest.fixture
+def stats():
+    _memo.clear()
+    stats = pytestify.CacheStats()
+    pytestify.subscribe(stats)
+    yield stats
+    pytestify.unsubscribe(stats)
+
+
+def test_memoizes_single_line_asserts(stats):
+    contents = (
+        'def test_thing(self):\n'
+        '    self.assertIsNone(a)  # hi\n'
+        '    self.assertIsNone(\n'
+        '        a\n'
+        '    )\n'
+        '    if x:\n'
+        '        self.assertIsNone(a)  # hi\n'
+    )
+    after = (
+        'def test_thing(self):\n'
+        '    assert a is None # hi\n'
+        '    assert a is None\n'
+        '    if x:\n'
+        '        assert a is None # hi'
+    )
+    assert rewrite_asserts(contents) == after
+    assert stats.counts() == (('assert', 1, 1),)
+    # asserts seen in another file are hits
+    assert rewrite_asserts(contents) == after
+    assert stats.counts() == (('assert', 3, 1),)
+
+
+def test_memo_depends_on_options(stats):
+    line = "self.assertCountEqual(a, b, 'oh no')"
+    assert rewrite_asserts(line) == line
+    assert rewrite_asserts(line, with_count_equal=True) == (
+        "assert sorted(a) == sorted(b), 'oh no'"
+    )
+    assert stats.counts() == (('assert', 0, 1),)
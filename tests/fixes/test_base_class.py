@@ -37,3 +37,24 @@ def test_remove_base_class(before, after):
 )
 def test_doesnt_remove_base_class(line):
     assert remove_base_class(line) == line
+
+
+@pytest.mark.parametrize(
+    'before, after', [
+        (
+            'class Cls(BaseTestCase): pass',
+            'class TestCls(BaseTestCase): pass',
+        ),
+        (
+            'class ClsTests(mixins.BaseTestCase): pass',
+            'class TestCls(mixins.BaseTestCase): pass',
+        ),
+        (
+            'class TestCls(BaseTestCase): pass',
+            'class TestCls(BaseTestCase): pass',
+        ),
+        ('class Cls(Unrelated): pass', 'class Cls(Unrelated): pass'),
+    ],
+)
+def test_renames_indirect_test_classes(before, after):
+    assert remove_base_class(before, test_bases={'BaseTestCase'}) == after
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from pytestify._archive import fix_archive
+from pytestify._main import main
+
+SOURCE = b'self.assertTrue(a)\n'
+FIXED = b'assert a\n'
+
+
+def _fix(name, data):
+    return data.replace(SOURCE, FIXED) if SOURCE in data else None
+
+
+def _tarball(compression):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=f'w:{compression}') as tar:
+        directory = tarfile.TarInfo('pkg')
+        directory.type = tarfile.DIRTYPE
+        tar.addfile(directory)
+        for name, data in [
+            ('pkg/test_a.py', SOURCE),
+            ('pkg/data.bin', bytes(range(256))),
+            ('pkg/b.py', b'x = 1\n'),
+        ]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1234567890
+            info.mode = 0o640
+            info.uname = 'someone'
+            tar.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo('pkg/link.py')
+        link.type = tarfile.SYMTYPE
+        link.linkname = 'test_a.py'
+        tar.addfile(link)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('compression', ['', 'gz', 'bz2', 'xz'])
+def test_fixes_tarball(compression):
+    out = io.BytesIO()
+    src = io.BufferedReader(io.BytesIO(_tarball(compression)))
+    fix_archive(src, out, _fix)
+    out.seek(0)
+
+    with tarfile.open(fileobj=out, mode=f'r:{compression}') as tar:
+        members = tar.getmembers()
+        assert [m.name for m in members] == [
+            'pkg', 'pkg/test_a.py', 'pkg/data.bin', 'pkg/b.py', 'pkg/link.py',
+        ]
+        fixed = tar.getmember('pkg/test_a.py')
+        assert tar.extractfile(fixed).read() == FIXED
+        assert (fixed.size, fixed.mtime, fixed.mode, fixed.uname) == (
+            len(FIXED), 1234567890, 0o640, 'someone',
+        )
+        data = tar.extractfile('pkg/data.bin').read()
+        assert data == bytes(range(256))
+        assert tar.getmember('pkg/link.py').linkname == 'test_a.py'
+
+
+def _record_hash(data):
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest())
+    return f'sha256={digest.rstrip(b"=").decode()}'
+
+
+def _wheel():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as whl:
+        whl.writestr('pkg/test_a.py', SOURCE)
+        data = zipfile.ZipInfo('pkg/data.txt', (2000, 1, 2, 3, 4, 6))
+        whl.writestr(data, 'hi')
+        whl.writestr(
+            'pkg-1.0.dist-info/RECORD',
+            f'pkg/test_a.py,{_record_hash(SOURCE)},{len(SOURCE)}\n'
+            'pkg/data.txt,sha256=abc,2\n'
+            'pkg-1.0.dist-info/RECORD,,\n',
+        )
+        whl.comment = b'a comment'
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('seekable', [True, False])
+def test_fixes_wheel(seekable):
+    src = io.BytesIO(_wheel())
+    if not seekable:
+        src.seekable = lambda: False
+    out = io.BytesIO()
+    fix_archive(io.BufferedReader(src), out, _fix)
+
+    with zipfile.ZipFile(out) as whl:
+        assert whl.namelist() == [
+            'pkg/test_a.py', 'pkg/data.txt', 'pkg-1.0.dist-info/RECORD',
+        ]
+        assert whl.comment == b'a comment'
+        assert whl.read('pkg/test_a.py') == FIXED
+        fixed = whl.getinfo('pkg/test_a.py')
+        assert fixed.compress_type == zipfile.ZIP_DEFLATED
+        assert whl.getinfo('pkg/data.txt').date_time == (2000, 1, 2, 3, 4, 6)
+        assert whl.read('pkg-1.0.dist-info/RECORD').decode() == (
+            f'pkg/test_a.py,{_record_hash(FIXED)},{len(FIXED)}\n'
+            'pkg/data.txt,sha256=abc,2\n'
+            'pkg-1.0.dist-info/RECORD,,\n'
+        )
+
+
+def test_main(tmp_path, capsys):
+    src, dst = tmp_path / 'in.tar.gz', tmp_path / 'out.tar.gz'
+    src.write_bytes(_tarball('gz'))
+    ret = main(['--archive', str(src), str(dst)])
+
+    assert ret == 1
+    assert f'Fixing {src}:pkg/test_a.py' in capsys.readouterr().out
+    with tarfile.open(dst) as tar:
+        assert tar.extractfile('pkg/test_a.py').read() == FIXED
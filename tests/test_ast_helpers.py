@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import ast
+
+from pytestify._ast_helpers import NodeVisitor, ast_parse, visit_all
+
+SOURCE = '''\
+class A:
+    class B:
+        def f(self):
+            g(h(1), i=j(2))
+
+def k():
+    return [m(n) for n in o()]
+'''
+
+
+class Recorder(NodeVisitor):
+    def __init__(self) -> None:
+        self.seen: list[str] = []
+
+
+class Calls(Recorder):
+    def visit_Call(self, node: ast.Call) -> None:
+        self.seen.append(ast.dump(node.func))
+
+
+class Classes(Recorder):
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.seen.append(node.name)
+
+
+class Everything(Recorder):
+    def visit_Name(self, node: ast.Name) -> None:
+        self.seen.append(node.id)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.seen.append(node.name)
+        self.generic_visit(node)
+
+
+def test_visits_like_each_visitor():
+    tree = ast_parse(SOURCE)
+    fused = [Calls(), Classes(), Everything()]
+    visit_all(tree, fused)
+
+    for visitor in fused:
+        alone = type(visitor)()
+        alone.visit(tree)
+        assert visitor.seen == alone.seen
+
+
+def test_visits_nothing():
+    visit_all(ast_parse(SOURCE), [])
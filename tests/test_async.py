@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import pytestify
+
+
+async def _collect(*args, **kwargs):
+    return [r async for r in pytestify.atransform_paths(*args, **kwargs)]
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f'{i}.py'
+        path.write_text('self.assertTrue(a)\n' if i % 2 else 'x = 1\n')
+        paths.append(str(path))
+    return paths
+
+
+def test_transforms_paths(files):
+    results = asyncio.run(_collect(files))
+
+    assert sorted(r.path for r in results) == sorted(files)
+    assert sorted(r.path for r in results if r.changed) == files[1::2]
+    assert all(r.output == 'assert a\n' for r in results if r.changed)
+
+
+def test_writes_in_a_process_pool(files):
+    with ProcessPoolExecutor(2) as executor:
+        asyncio.run(_collect(files, executor=executor, write=True))
+
+    with open(files[1]) as f:
+        assert f.read() == 'assert a\n'
+
+
+def test_reads_async_iterables(files):
+    async def paths():
+        for path in files:
+            await asyncio.sleep(0)
+            yield path
+
+    assert len(asyncio.run(_collect(paths()))) == len(files)
+
+
+def test_reports_syntax_errors(tmp_path):
+    path = tmp_path / 'bad.py'
+    path.write_text('class (:\n')
+    [result] = asyncio.run(_collect([str(path)]))
+
+    assert result.output is None
+    assert isinstance(result.error, SyntaxError)
+    assert not result.changed
+
+
+def test_reports_files_it_cant_fix(files, tmp_path, monkeypatch):
+    latin1 = tmp_path / 'latin1.py'
+    latin1.write_bytes(b'# \xff\n')
+    missing = str(tmp_path / 'missing.py')
+    fix_contents = pytestify._async.fix_contents
+
+    def fix(source, **kwargs):
+        if source == 'x = 1\n':
+            raise ValueError('oh no')
+        return fix_contents(source, **kwargs)
+
+    monkeypatch.setattr('pytestify._async.fix_contents', fix)
+    results = asyncio.run(_collect([str(latin1), missing, *files]))
+
+    errors = {r.path: type(r.error) for r in results if r.error}
+    assert errors == {
+        str(latin1): UnicodeDecodeError,
+        missing: FileNotFoundError,
+        **{path: ValueError for path in files[::2]},
+    }
+    # the rest are fixed as usual
+    assert sorted(r.path for r in results if r.changed) == files[1::2]
+
+
+def test_limits_concurrency(files, monkeypatch):
+    lock = threading.Lock()
+    running = []
+    most = []
+
+    def fix(source, **kwargs):
+        with lock:
+            running.append(source)
+            most.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return source
+
+    monkeypatch.setattr('pytestify._async.fix_contents', fix)
+    with ThreadPoolExecutor(8) as executor:
+        asyncio.run(_collect(files, executor=executor, limit=2))
+
+    assert max(most) == 2
+
+
+def test_cancels_promptly(files, monkeypatch):
+    release = threading.Event()
+    events = []
+
+    def fix(source, **kwargs):
+        events.append('fix')
+        # long enough to be sure cancelling didn't wait for it
+        release.wait(timeout=10)
+        events.append('fixed')
+        return source
+
+    monkeypatch.setattr('pytestify._async.fix_contents', fix)
+
+    async def cancel(executor):
+        asyncio.get_running_loop().set_default_executor(executor)
+        task = asyncio.ensure_future(_collect(files * 10, limit=4))
+        while events.count('fix') < 4:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        events.append('cancelled')
+        release.set()
+
+    with ThreadPoolExecutor(4) as executor:
+        try:
+            asyncio.run(cancel(executor))
+        finally:
+            release.set()
+
+    # before the files in progress finished, and without starting others
+    assert events == ['fix'] * 4 + ['cancelled'] + ['fixed'] * 4
+
+
+def test_rejects_bad_limit():
+    with pytest.raises(ValueError):
+        asyncio.run(_collect([], limit=0))
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from benchmarks import store
+from benchmarks.suite import MIN_SAMPLES, _mann_whitney, compare
+
+
+def _noisy(center, n, seed):
+    rng = random.Random(seed)
+    # timings: a floor, with the occasional much slower sample
+    return [
+        center * (1 + rng.uniform(0, 0.05) + (rng.random() < 0.2) * 0.5)
+        for _ in range(n)
+    ]
+
+
+def test_compare_same_distribution():
+    for seed in range(20):
+        base = {'fix': ('ms', _noisy(10, 10, seed))}
+        head = {'fix': ('ms', _noisy(10, 10, seed + 100))}
+        change, = compare(base, head)
+        assert not change.significant(0.05)
+
+
+def test_compare_finds_changes():
+    base = {
+        'fix': ('ms', _noisy(10, 10, 0)),
+        'main': ('files/s', _noisy(20, 10, 1)),
+    }
+    head = {
+        'fix': ('ms', _noisy(12, 10, 2)),
+        'main': ('files/s', _noisy(30, 10, 3)),
+    }
+    fix, main = compare(base, head)
+
+    assert fix.benchmark == 'fix'
+    assert fix.base == min(base['fix'][1])
+    assert fix.change == pytest.approx(0.2, abs=0.05)
+    assert fix.significant(0.05)
+    # more files per second is better
+    assert main.base == max(base['main'][1])
+    assert main.change == pytest.approx(-0.5, abs=0.05)
+    assert main.significant(0.05)
+    assert not main.significant(0.6)
+
+
+def test_compare_needs_enough_samples():
+    n = MIN_SAMPLES - 1
+    base = {'fix': ('ms', [10.0] * n), 'other': ('ms', [1.0] * 20)}
+    head = {'fix': ('ms', [20.0] * n), 'new': ('ms', [1.0] * 20)}
+    change, = compare(base, head)
+    assert change.change == 1
+    assert change.p_value is None
+    assert not change.significant(0.05)
+
+
+def test_mann_whitney():
+    assert _mann_whitney([1, 2, 3], [1, 2, 3]) == pytest.approx(1)
+    assert _mann_whitney([5] * 10, [5] * 10) == 1
+    separate = _mann_whitney(range(10), range(10, 20))
+    assert separate < 0.001
+    assert _mann_whitney(range(10, 20), range(10)) == separate
+    mixed = _mann_whitney(range(0, 20, 2), range(1, 20, 2))
+    assert mixed > 0.5
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = store.connect(tmp_path / 'results.sqlite')
+    yield db
+    db.close()
+
+
+def _add_run(db, label=None):
+    return store.add_run(
+        db,
+        started='2024-01-01T00:00:00',
+        label=label,
+        git_commit='abc123',
+        python='CPython 3.12.0',
+        platform='Linux',
+    )
+
+
+def test_store_samples(db, tmp_path):
+    run = _add_run(db, 'before')
+    store.add_samples(db, run, 'fix', 'ms', [3.0, 1.0, 2.0])
+    store.add_samples(db, run, 'main', 'files/s', [10.0])
+    other = _add_run(db)
+    store.add_samples(db, other, 'fix', 'ms', [4.0])
+
+    reopened = store.connect(tmp_path / 'results.sqlite')
+    assert store.samples(reopened, run) == {
+        'fix': ('ms', [3.0, 1.0, 2.0]),
+        'main': ('files/s', [10.0]),
+    }
+    assert store.samples(reopened, other) == {'fix': ('ms', [4.0])}
+    assert [r.label for r in store.runs(reopened)] == ['before', None]
+    reopened.close()
+
+
+def test_store_other_format(tmp_path):
+    path = tmp_path / 'results.sqlite'
+    db = store.connect(path)
+    db.execute('PRAGMA user_version = 99')
+    db.close()
+    with pytest.raises(ValueError, match='format 99'):
+        store.connect(path)
+
+
+def test_find_run(db):
+    with pytest.raises(LookupError, match='no latest run'):
+        store.find_run(db, 'latest')
+    first = _add_run(db, 'before')
+    with pytest.raises(LookupError, match='no previous run'):
+        store.find_run(db, 'previous')
+    second = _add_run(db, 'after')
+    third = _add_run(db, 'before')
+
+    assert store.find_run(db, 'latest').id == third
+    assert store.find_run(db, 'previous').id == second
+    assert store.find_run(db, str(first)).id == first
+    # the latest run with the label
+    assert store.find_run(db, 'before').id == third
+    with pytest.raises(LookupError, match="'nothing'"):
+        store.find_run(db, 'nothing')
@@ -0,0 +1,105 @@
+'''
+Pathological inputs, to check that fixing them takes time roughly
+proportional to their size. Each is timed at two sizes, and the test
+fails if doubling the input more than roughly doubles the time.
+'''
+from __future__ import annotations
+
+import gc
+import time
+from typing import Callable
+
+import pytest
+
+from pytestify._transform import fix_contents
+
+HEADER = '''\
+import unittest
+
+
+class ThingTest(unittest.TestCase):
+    def test_thing(self):
+'''
+
+
+def long_assert(n: int) -> str:
+    items = ''.join(f'                {i},\n' for i in range(n))
+    return HEADER + (
+        '        self.assertEqual(\n'
+        '            a,\n'
+        '            [\n'
+        f'{items}'
+        '            ],\n'
+        "            msg='oh no',\n"
+        '        )\n'
+    )
+
+
+def nested_brackets(n: int) -> str:
+    group = '([' * 25 + '])' * 25
+    return HEADER + (
+        f"        self.assertEqual(a, [{', '.join([group] * n)}], 'oh no')\n"
+    )
+
+
+def many_comments(n: int) -> str:
+    return HEADER + ''.join(
+        f'        # comment {i}\n'
+        '        self.assertIsNone(a)  # a comment\n'
+        '        self.assertIn(\n'
+        '            a,\n'
+        '            b)  # another comment\n'
+        for i in range(n)
+    )
+
+
+def long_line(n: int) -> str:
+    items = ', '.join(str(i) for i in range(n))
+    return HEADER + f'        self.assertEqual(a, [{items}])\n'
+
+
+def many_asserts(n: int) -> str:
+    asserts = [
+        'self.assertEqual(a, b)',
+        'self.assertTrue(a)',
+        'self.assertIsNone(\n            a\n        )',
+        "self.assertCountEqual(a, b, 'oh no')",
+        'self.assertAlmostEqual(a, b, places=2)',
+        'self.assertNotIn(\n            a,\n            b,\n        )',
+        'self.assertEqual(None, a)',
+    ]
+    return HEADER + ''.join(
+        f'        {asserts[i % len(asserts)]}\n' for i in range(n)
+    )
+
+
+def _seconds(contents: str) -> float:
+    best = float('inf')
+    # the collector's pauses depend on everything else that's alive
+    gc.disable()
+    try:
+        for _ in range(5):
+            start = time.perf_counter()
+            fix_contents(contents, with_count_equal=True)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+@pytest.mark.parametrize(
+    ('build', 'n'),
+    [
+        (long_assert, 1000),
+        (nested_brackets, 40),
+        (many_comments, 250),
+        (long_line, 2000),
+        (many_asserts, 500),
+    ],
+)
+def test_grows_linearly(build: Callable[[int], str], n: int) -> None:
+    small = _seconds(build(n))
+    large = _seconds(build(4 * n))
+    # linear growth doubles the time, and quadratic growth quadruples it
+    per_doubling = (large / small) ** 0.5
+    assert per_doubling < 2.8, f'{per_doubling:.2f}x per doubling'
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+
+import pytest
+
+from pytestify._git import CatFile, GitError, python_blobs, resolve_tree
+from pytestify._main import main
+
+pytestmark = pytest.mark.skipif(
+    shutil.which('git') is None,
+    reason='needs git',
+)
+
+ORIGINAL = 'self.assertTrue(a)\n'
+FIXED = 'assert a\n'
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ['git', '-C', str(repo), *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    tests = tmp_path / 'tests'
+    tests.mkdir()
+    for i in range(200):
+        # together, more than a pipe holds
+        padding = f'# {i}' + ' padding' * 100 + '\n'
+        (tests / f'test_{i:03}.py').write_text(padding + ORIGINAL)
+    (tmp_path / 'broken.py').write_text('x = (\n')
+    (tmp_path / 'latin1.py').write_bytes(b'# \xff\n' + ORIGINAL.encode())
+    (tmp_path / 'no_newline.py').write_text(ORIGINAL.rstrip())
+    (tmp_path / 'README.txt').write_text(ORIGINAL)
+    (tmp_path / 'link.py').symlink_to(tests / 'test_000.py')
+    _git(tmp_path, 'init', '-q')
+    _git(tmp_path, 'add', '-A')
+    _git(
+        tmp_path,
+        '-c', 'user.name=pytestify', '-c', 'user.email=pytestify@example.com',
+        'commit', '-q', '-m', 'tests',
+    )
+    # only what's committed is read
+    (tests / 'test_000.py').write_text('# uncommitted\n')
+    return tmp_path
+
+
+def test_python_blobs(repo):
+    paths = [blob.path for blob in python_blobs('HEAD', repo=str(repo))]
+    assert paths[:3] == ['broken.py', 'latin1.py', 'no_newline.py']
+    assert paths[3:] == [f'tests/test_{i:03}.py' for i in range(200)]
+
+    blobs = python_blobs('HEAD', ['tests/test_001.py'], repo=str(repo))
+    assert [blob.path for blob in blobs] == ['tests/test_001.py']
+
+
+def test_resolve_tree(repo):
+    assert resolve_tree('HEAD', repo=str(repo)) == resolve_tree(
+        'HEAD^{tree}', repo=str(repo),
+    )
+    with pytest.raises(GitError):
+        resolve_tree('no-such-branch', repo=str(repo))
+
+
+def test_cat_file(repo):
+    with CatFile(repo=str(repo)) as cat:
+        contents = dict(cat.read(python_blobs('HEAD', repo=str(repo))))
+    assert len(contents) == 203
+    for blob, data in contents.items():
+        if blob.path.startswith('tests/'):
+            assert data.endswith(ORIGINAL.encode())
+            assert data.startswith(f'# {int(blob.path[11:14])} '.encode())
+
+
+def test_cat_file_closed_early(repo):
+    with CatFile(repo=str(repo)) as cat:
+        contents = cat.read(python_blobs('HEAD', repo=str(repo)))
+        blob, data = next(contents)
+        contents.close()
+    assert (blob.path, data) == ('broken.py', b'x = (\n')
+
+
+def test_main_diff(repo, capsys):
+    assert main(['revision', 'HEAD', '-C', str(repo)]) == 201
+    out, err = capsys.readouterr()
+    assert 'Skipping broken.py due to the source file having invalid' in err
+    assert 'Skipping latin1.py because it is not UTF-8' in err
+    assert out.startswith(
+        'diff --git a/no_newline.py b/no_newline.py\n'
+        '--- a/no_newline.py\n'
+        '+++ b/no_newline.py\n'
+        '@@ -1 +1 @@\n'
+        '-self.assertTrue(a)\n'
+        '\\ No newline at end of file\n'
+        '+assert a\n'
+        'diff --git',
+    )
+
+    diff = repo / 'fixes.diff'
+    diff.write_text(out)
+    _git(repo, 'checkout', '.')
+    _git(repo, 'apply', str(diff))
+    assert (repo / 'tests' / 'test_007.py').read_text().endswith(FIXED)
+    assert (repo / 'no_newline.py').read_text() == FIXED
+
+
+def test_main_parallel_matches_serial(repo, capsys):
+    main(['revision', 'HEAD', '-C', str(repo), '--format', 'report'])
+    serial = capsys.readouterr().out
+    main([
+        'revision', '-j', '2', 'HEAD', '-C', str(repo), '--format', 'report',
+    ])
+    assert capsys.readouterr().out == serial
+
+
+def test_main_report(repo, capsys):
+    ret = main([
+        'revision', 'HEAD', 'no_newline.py', 'broken.py', 'tests/test_001.py',
+        '-C', str(repo), '--format', 'report',
+    ])
+
+    assert ret == 2
+    assert capsys.readouterr().out == (
+        'Skipping broken.py due to the source file having invalid syntax\n'
+        'Would fix no_newline.py (+1 -1)\n'
+        'Would fix tests/test_001.py (+1 -1)\n'
+        '2 of 3 files would change\n'
+        "\n(Hint: run again with '--show-traceback')\n"
+    )
+
+
+def test_main_bad_revision(repo, capsys):
+    assert main(['revision', 'no-such-branch', '-C', str(repo)]) == 1
+    assert capsys.readouterr().err
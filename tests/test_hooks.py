@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+import pytestify
+from pytestify import _hooks
+from pytestify._main import main
+
+
+class Recorder(pytestify.Subscriber):
+    def __init__(self):
+        self.events = []
+
+    def fixer_start(self, fixer):
+        self.events.append(('start', fixer))
+
+    def fixer_end(self, fixer):
+        self.events.append(('end', fixer))
+
+    def skip(self, path, reason):
+        self.events.append(('skip', os.path.basename(path)))
+
+    def write(self, path):
+        self.events.append(('write', os.path.basename(path)))
+
+
+@pytest.fixture
+def recorder():
+    recorder = Recorder()
+    pytestify.subscribe(recorder)
+    yield recorder
+    pytestify.unsubscribe(recorder)
+
+
+def test_sends_fixer_spans(recorder):
+    pytestify.fix_contents('self.assertTrue(a)\n')
+
+    fixers = [fixer for kind, fixer in recorder.events if kind == 'start']
+    assert fixers == [
+        'visit_all', 'remove_base_class', 'rewrite_asserts',
+        'visit_all', 'rewrite_method_name', 'rewrite_pytest_funcs',
+        'add_pytest_import',
+    ]
+    ends = [fixer for kind, fixer in recorder.events if kind == 'end']
+    assert ends == fixers
+
+
+def test_sends_skips_and_writes(recorder, tmp_path):
+    (tmp_path / 'a.py').write_text('self.assertTrue(a)\n')
+    (tmp_path / 'b.py').write_text('class (:\n')
+    main([str(tmp_path)])
+
+    files = [e for e in recorder.events if e[0] in ('skip', 'write')]
+    assert sorted(files) == [('skip', 'b.py'), ('write', 'a.py')]
+
+
+def test_unsubscribe(recorder):
+    pytestify.unsubscribe(recorder)
+    pytestify.fix_contents('self.assertTrue(a)\n')
+
+    assert recorder.events == []
+    assert _hooks.fixer('rewrite_asserts') is _hooks.fixer('add_pytest_import')
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_chrome_trace(tmp_path, jobs):
+    for i in range(4):
+        (tmp_path / f'{i}.py').write_text('self.assertTrue(a)\n')
+    trace = tmp_path / 'trace.json'
+    main([str(tmp_path), '--jobs', jobs, '--trace', str(trace)])
+
+    events = json.loads(trace.read_text())['traceEvents']
+    files = [e for e in events if e['cat'] == 'file' and e['ph'] == 'B']
+    assert len(files) == 4
+    assert sum(e['name'] == 'write' for e in events) == 4
+    assert sum(e['ph'] == 'B' for e in events) == sum(
+        e['ph'] == 'E' for e in events
+    )
+    assert any(e['name'] == 'rewrite_asserts' for e in events)
+    worker_pids = {e['pid'] for e in files}
+    assert (os.getpid() in worker_pids) == (jobs == '1')
+    assert _hooks.subscribers == ()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import importlib
+import inspect
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import pytestify
+from pytestify._import_hook import ConvertingLoader, install_import_hook
+
+MODULE = '''\
+import unittest
+
+
+class ThingTest(unittest.TestCase):
+    def testThing(self):
+        self.assertEqual(1 + 1, 3)
+'''
+
+
+@pytest.fixture
+def legacy(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    root = tmp_path / 'legacy'
+    root.mkdir()
+    monkeypatch.syspath_prepend(str(root))
+    yield root
+    for name in ('legacy_thing', 'other_thing'):
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def hook(legacy):
+    finder = install_import_hook([legacy])
+    yield finder
+    finder.uninstall()
+
+
+def _import(name):
+    sys.modules.pop(name, None)
+    importlib.invalidate_caches()
+    return importlib.import_module(name)
+
+
+def test_converts_modules_as_they_import(legacy, hook):
+    (legacy / 'legacy_thing.py').write_text(MODULE)
+    module = _import('legacy_thing')
+
+    assert isinstance(module.__loader__, ConvertingLoader)
+    assert module.TestThing.__bases__ == (object,)
+    source = inspect.getsource(module.TestThing)
+    assert 'assert 1 + 1 == 3' in source
+
+
+def test_caches_converted_code(legacy, hook, monkeypatch):
+    source = legacy / 'legacy_thing.py'
+    source.write_text(MODULE)
+    _import('legacy_thing')
+    cache = Path(hook.cache_path(str(source)))
+    assert cache.exists()
+
+    def fail(contents):
+        raise AssertionError('should be cached')
+
+    monkeypatch.setattr(hook, 'fix', fail)
+    assert hasattr(_import('legacy_thing'), 'TestThing')
+    # touching the source doesn't change its hash
+    os.utime(source, ns=(0, 0))
+    assert hasattr(_import('legacy_thing'), 'TestThing')
+
+
+def test_converts_changed_sources_again(legacy, hook):
+    source = legacy / 'legacy_thing.py'
+    source.write_text(MODULE)
+    _import('legacy_thing')
+    source.write_text(MODULE.replace('Thing', 'Other'))
+    os.utime(source, ns=(0, 0))
+
+    assert hasattr(_import('legacy_thing'), 'TestOther')
+
+
+def test_imports_unconvertible_modules_unchanged(legacy, hook, monkeypatch):
+    (legacy / 'legacy_thing.py').write_text(MODULE)
+
+    def fail(contents):
+        raise ValueError('oh no')
+
+    monkeypatch.setattr(hook, 'fix', fail)
+    assert hasattr(_import('legacy_thing'), 'ThingTest')
+
+
+def test_leaves_other_modules_alone(legacy, hook, tmp_path, monkeypatch):
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'other_thing.py').write_text(MODULE)
+    monkeypatch.syspath_prepend(str(other))
+
+    module = _import('other_thing')
+    assert not isinstance(module.__loader__, ConvertingLoader)
+    assert hasattr(module, 'ThingTest')
+
+
+def test_pytest_plugin(legacy):
+    (legacy / 'test_legacy.py').write_text(MODULE)
+    root = Path(pytestify.__file__).parent.parent
+    env = {
+        **os.environ,
+        'PYTHONPATH': str(root),
+        # once installed, its entry point would load the plugin again
+        'PYTEST_DISABLE_PLUGIN_AUTOLOAD': '1',
+    }
+    result = subprocess.run(
+        [
+            sys.executable, '-m', 'pytest', str(legacy),
+            '-p', 'pytestify._pytest_plugin', '-p', 'no:cacheprovider',
+            '--pytestify-path', str(legacy),
+        ],
+        cwd=legacy,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    assert 'test_legacy.py::TestThing::test_thing' in result.stdout
+    # pytest's own assertion messages
+    assert 'assert (1 + 1) == 3' in result.stdout
+    assert result.returncode == 1
+
+
+def test_pytest_plugin_imports_little():
+    root = Path(pytestify.__file__).parent.parent
+    code = (
+        'import sys, pytestify._pytest_plugin; '
+        'print(sorted(m for m in sys.modules if m.startswith("pytestify")))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        env={**os.environ, 'PYTHONPATH': str(root)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # every pytest run imports it, whether or not it's used
+    assert result.stdout == "['pytestify', 'pytestify._pytest_plugin']\n"
+
+
+def test_lazy_exports():
+    assert pytestify.fix_contents('self.assertTrue(a)\n') == 'assert a\n'
+    assert set(pytestify.__all__) <= set(dir(pytestify))
+    with pytest.raises(AttributeError):
+        pytestify.nothing
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import pytest
+
+import pytestify._incremental
+from pytestify._incremental import retransform, transform
+from pytestify._transform import fix_contents
+
+CLASS = '''
+
+class Thing{n}Test(unittest.TestCase):
+    def testCamelCase(self):
+        self.assertEqual(a, {n})
+        with self.assertRaises(OSError):
+            pass
+'''
+MODULE = 'import unittest\n' + ''.join(CLASS.format(n=n) for n in range(50))
+
+
+@pytest.fixture
+def found(monkeypatch):
+    found = []
+    find_tests = pytestify._incremental.find_tests
+
+    def spy(text, **kwargs):
+        found.append(text)
+        return find_tests(text, **kwargs)
+
+    monkeypatch.setattr(pytestify._incremental, 'find_tests', spy)
+    return found
+
+
+def test_transform_matches_fix_contents():
+    assert transform(MODULE).output == fix_contents(MODULE)
+
+
+@pytest.mark.parametrize(
+    'before, after', [
+        ('assertEqual(a, 7)', 'assertEqual(a, 70)'),
+        ('assertEqual(a, 0)', 'assertEqual(b, 0)'),
+        ('assertEqual(a, 49)', 'assertEqual(b, 49)'),
+        ('import unittest\n', 'import unittest\nimport pytest\n'),
+        ('\n\nclass Thing9Test', '\nclass Thing9Test'),
+        ('class Thing3Test', 'x = 1\nclass Thing3Test'),
+    ],
+)
+def test_retransform_matches_fix_contents(before, after):
+    new = MODULE.replace(before, after, 1)
+    result = retransform(transform(MODULE), new)
+
+    assert result.output == fix_contents(new)
+    assert retransform(result, MODULE).output == fix_contents(MODULE)
+
+
+def test_only_fixes_edited_blocks(found):
+    previous = transform(MODULE)
+    found.clear()
+    retransform(previous, MODULE.replace('(a, 7)', '(a, 70)'))
+
+    assert len(found) == 1
+    assert 'Thing7Test' in found[0]
+
+
+def test_refixes_everything_if_it_becomes_a_test_file():
+    module = MODULE.replace('unittest.TestCase', 'object')
+    module = module.replace('Test(', '(').replace('self.assertEqual', 'print')
+    previous = transform(module)
+    assert 'testCamelCase' in previous.output
+
+    new = module + CLASS.format(n=50)
+    result = retransform(previous, new)
+
+    assert result.output == fix_contents(new)
+    assert 'testCamelCase' not in result.output
+
+
+def test_raises_on_invalid_edits():
+    with pytest.raises(SyntaxError):
+        retransform(transform(MODULE), MODULE.replace('):', ')', 1))
+
+
+def test_raises_syntax_errors_like_fix_contents():
+    # the asserts fixer fails differently on a block than on the module
+    new = MODULE.replace('assertEqual(a, 37)', 'assertEqual(a37)')
+    with pytest.raises(SyntaxError):
+        fix_contents(new)
+    with pytest.raises(SyntaxError):
+        transform(new)
+    with pytest.raises(SyntaxError):
+        retransform(transform(MODULE), new)
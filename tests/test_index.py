@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import pytest
+
+from pytestify._index import ClassIndex, build_index
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / 'base.py').write_text(
+        'import unittest\n'
+        'class BaseTestCase(unittest.TestCase): pass\n'
+        'class Mixin: pass\n',
+    )
+    (tmp_path / 'mid.py').write_text(
+        'from base import BaseTestCase, Mixin\n'
+        'class ApiTestCase(Mixin, BaseTestCase): pass\n',
+    )
+    (tmp_path / 'test_x.py').write_text(
+        'import mid\n'
+        'class ThingTests(mid.ApiTestCase): pass\n'
+        'class Helper(Mixin): pass\n',
+    )
+    (tmp_path / 'broken.py').write_text('class (:\n')
+    return tmp_path
+
+
+def test_finds_indirect_test_classes(project):
+    index = build_index(str(p) for p in project.glob('*.py'))
+
+    assert index.test_bases() == {'BaseTestCase', 'ApiTestCase', 'ThingTests'}
+
+
+def test_builds_in_parallel(project):
+    paths = [str(p) for p in project.glob('*.py')]
+    assert build_index(paths, jobs=2).files == build_index(paths).files
+
+
+def test_reuses_cached_entries(project, tmp_path, monkeypatch):
+    cache = tmp_path / 'index.json'
+    paths = [str(p) for p in project.glob('*.py')]
+    build_index(paths, cache)
+    (project / 'mid.py').write_text('class ApiTestCase: pass\n')
+
+    parsed = []
+    monkeypatch.setattr(
+        'pytestify._index.ClassVisitor.visit',
+        lambda self, tree: parsed.append(tree),
+    )
+    index = build_index(paths, cache)
+
+    assert len(parsed) == 1
+    assert ClassIndex.load(cache).files == index.files
+
+
+def test_keeps_files_from_other_runs(project, tmp_path):
+    cache = tmp_path / 'index.json'
+    build_index([str(p) for p in project.glob('*.py')], cache)
+    (project / 'broken.py').unlink()
+
+    # a run on only some of the files still knows about the others
+    index = build_index([str(project / 'test_x.py')], cache)
+
+    assert index.test_bases() == {'BaseTestCase', 'ApiTestCase', 'ThingTests'}
+    assert sorted(ClassIndex.load(cache).files) == [
+        str(project / name) for name in ('base.py', 'mid.py', 'test_x.py')
+    ]
+
+
+def test_ignores_stale_cache(tmp_path):
+    cache = tmp_path / 'index.json'
+    cache.write_text('{"version": 0}')
+    assert ClassIndex.load(cache).files == {}
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+
+import pytest
+
+from pytestify._inventory import (
+    CAMEL_CASE_TESTS, FileInventory, inventory, scan, total,
+)
+from pytestify._main import main
+
+MODULE = '''\
+import unittest
+
+
+class ThingTest(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.addCleanup(print)
+
+    def testThing(self):
+        self.assertEqual(1, 1)
+        self.assertEqual(2, 2)
+        self.assertTrue(True)
+        with self.assertRaises(ValueError):
+            int('a')
+
+    @unittest.skip('reason')
+    def test_skipped(self):
+        with self.subTest(i=1):
+            self.assertLogs()
+
+
+class OtherTest(ThingTest):
+    def test_other(self):
+        self.fail()
+        self.assertRaisesRegex(ValueError, 'a')
+
+
+class Helper:
+    def run(self):
+        self.addCleanup(print)
+        self.assertEqual(1, 1)
+'''
+
+
+def test_scan():
+    assert scan(MODULE) == {
+        'methods': {'setUp': 1, CAMEL_CASE_TESTS: 1},
+        'unconvertible': {
+            'addCleanup': 1,
+            'subTest': 1,
+            'assertLogs': 1,
+            'assertRaisesRegex': 1,
+        },
+        'asserts': {'assertEqual': 3, 'assertTrue': 1},
+        'funcs': {'assertRaises': 1, 'skip': 1, 'fail': 1},
+    }
+
+
+@pytest.mark.parametrize(
+    'source, expected', [
+        ('@unittest.expectedFailure\ndef f(): ...', {'expectedFailure': 1}),
+        ("@unittest.skipUnless(a, 'b')\ndef f(): ...", {'skipUnless': 1}),
+        ('self.skipTest("reason")', {'skipTest': 1}),
+        ('other.skip()', None),
+    ],
+)
+def test_scan_funcs(source, expected):
+    assert scan(source).get('funcs') == expected
+
+
+def test_scan_only_counts_calls_to_id():
+    source = (
+        'class ThingTest(TestCase):\n'
+        '    def setUp(self):\n'
+        '        self.id = 1\n'
+        '\n'
+        '    def test_thing(self):\n'
+        '        print(self.id, self.id())\n'
+    )
+    assert scan(source)['unconvertible'] == {'id': 1}
+
+
+def test_scan_skips_files_without_unittest():
+    # not even parsed
+    assert scan('def f(:\n    return 1\n') == {}
+
+
+def test_total():
+    results = [
+        FileInventory('a.py', {'asserts': {'assertEqual': 2}}),
+        FileInventory('b.py', {}, error='SyntaxError: oh no'),
+        FileInventory(
+            'c.py',
+            {
+                'asserts': {'assertEqual': 1, 'assertIn': 1},
+                'funcs': {'fail': 1},
+            },
+        ),
+    ]
+    assert total(results) == {
+        'asserts': {'assertEqual': 3, 'assertIn': 1},
+        'funcs': {'fail': 1},
+    }
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(20):
+        (tmp_path / f'test_{i}.py').write_text(MODULE)
+    (tmp_path / 'test_plain.py').write_text('def test(): assert True\n')
+    return tmp_path
+
+
+def test_parallel_matches_serial(tree):
+    paths = sorted(str(p) for p in tree.iterdir())
+    assert list(inventory(paths, jobs=2)) == list(inventory(paths))
+
+
+def test_main_json(tree, capsys):
+    assert main(['inventory', str(tree), '--jobs', '2']) == 0
+
+    report = json.loads(capsys.readouterr().out)
+    assert report['files'] == 21
+    assert report['errors'] == {}
+    assert report['total']['asserts'] == {'assertEqual': 60, 'assertTrue': 20}
+    assert report['total']['methods'][CAMEL_CASE_TESTS] == 20
+    assert len(report['by_file']) == 20
+    counts = report['by_file'][str(tree / 'test_0.py')]
+    assert list(counts) == ['asserts', 'funcs', 'methods', 'unconvertible']
+    assert counts['unconvertible']['subTest'] == 1
+
+
+def test_main_csv(tmp_path):
+    (tmp_path / 'test_thing.py').write_text(MODULE)
+    (tmp_path / 'test_other.py').write_text('self.assertIn(a, b)\n')
+    out = tmp_path / 'inventory.csv'
+
+    ret = main(['inventory', str(tmp_path), '--format', 'csv', '-o', str(out)])
+
+    assert ret == 0
+    rows = list(csv.DictReader(io.StringIO(out.read_text())))
+    totals = {
+        (r['category'], r['name']): int(r['count'])
+        for r in rows if r['path'] == '*'
+    }
+    assert totals[('asserts', 'assertIn')] == 1
+    assert totals[('asserts', 'assertEqual')] == 3
+    assert {
+        'path': str(tmp_path / 'test_other.py'),
+        'category': 'asserts',
+        'name': 'assertIn',
+        'count': '1',
+    } in rows
+
+
+def test_main_reports_unparsable_files(tmp_path, capsys):
+    (tmp_path / 'test_thing.py').write_text(MODULE)
+    (tmp_path / 'test_broken.py').write_text(
+        'import unittest\nprint "python 2"\n',
+    )
+
+    assert main(['inventory', str(tmp_path)]) == 1
+
+    out, err = capsys.readouterr()
+    broken = str(tmp_path / 'test_broken.py')
+    assert list(json.loads(out)['errors']) == [broken]
+    assert f'Skipped {broken}: SyntaxError' in err
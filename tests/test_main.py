@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import io
+import json
+import re
+import sys
+import time
+
 import pytest
 
-from pytestify._main import main
+from pytestify._main import _read_paths, main
+from pytestify._transform import find_tests
 
 
 @pytest.fixture
@@ -67,3 +74,184 @@ class TestCliArgs:
 
         assert f.read_text() == 'self.assertCountEqual(a, b)\n'
         assert ret == 0
+
+
+class TestStreaming:
+    def test_fixes_stdin_to_stdout(self, monkeypatch, capsys):
+        stdin = io.TextIOWrapper(io.BytesIO(b'self.assertEqual(a, b)\n'))
+        monkeypatch.setattr(sys, 'stdin', stdin)
+        ret = main(['-'])
+
+        assert capsys.readouterr().out == 'assert a == b\n'
+        assert ret == 1
+
+    def test_passes_through_invalid_stdin(self, monkeypatch, capsys):
+        stdin = io.TextIOWrapper(io.BytesIO(b'def (:\n'))
+        monkeypatch.setattr(sys, 'stdin', stdin)
+        ret = main(['-'])
+
+        out, err = capsys.readouterr()
+        assert out == 'def (:\n'
+        assert 'Skipping <stdin>' in err
+        assert ret == 0
+
+    @pytest.mark.parametrize('sep', ['\n', '\0', '\r\n'])
+    def test_files_from(self, tmp_path, sep):
+        paths = [tmp_path / 'a.py', tmp_path / 'b.py']
+        for path in paths:
+            path.write_text('self.assertTrue(a)\n')
+        files_from = tmp_path / 'files.txt'
+        files_from.write_text(sep.join(str(p) for p in paths) + sep)
+
+        ret = main(['--files-from', str(files_from)])
+
+        assert [p.read_text() for p in paths] == ['assert a\n'] * 2
+        assert ret == 2
+
+    def test_files_from_stdin(self, f, monkeypatch):
+        f.write_text('self.assertTrue(a)\n')
+        stdin = io.TextIOWrapper(io.BytesIO(f'{f}\0'.encode()))
+        monkeypatch.setattr(sys, 'stdin', stdin)
+        ret = main(['--files-from', '-'])
+
+        assert f.read_text() == 'assert a\n'
+        assert ret == 1
+
+    def test_reads_paths_while_streaming(self):
+        class Stream:
+            chunks = [b'a.py\nb', b'.py\n', b'c.py']
+
+            def read1(self, size):
+                return self.chunks.pop(0) if self.chunks else b''
+
+        paths = _read_paths(Stream())
+        assert next(paths) == 'a.py'
+        assert Stream.chunks == [b'.py\n', b'c.py']
+        assert list(paths) == ['b.py', 'c.py']
+
+
+def _find_tests_or_hang(piece, **kwargs):
+    if '# hang' in piece:
+        time.sleep(60)
+    return find_tests(piece, **kwargs)
+
+
+class TestLimits:
+    def test_skips_large_files(self, f, capsys):
+        f.write_text('self.assertTrue(a)\n')
+        ret = main([str(f), '--max-file-size', '10'])
+
+        assert f.read_text() == 'self.assertTrue(a)\n'
+        assert 'larger than 10 bytes' in capsys.readouterr().out
+        assert ret == 0
+
+    def test_runs_in_parallel(self, tmp_path):
+        paths = [tmp_path / f'{i}.py' for i in range(5)]
+        for path in paths:
+            path.write_text('self.assertTrue(a)\n')
+        ret = main([str(tmp_path), '--jobs', '2', '--timeout-per-file', '30'])
+
+        assert [p.read_text() for p in paths] == ['assert a\n'] * 5
+        assert ret == 5
+
+    def test_reports_errors_in_workers(self, tmp_path, capsys):
+        paths = [tmp_path / f'{i}.py' for i in range(4)]
+        for path in paths:
+            path.write_text('self.assertTrue(a)\n')
+        latin1 = tmp_path / 'latin1.py'
+        latin1.write_bytes(b'# \xff\nself.assertTrue(a)\n')
+        ret = main([str(tmp_path), '--jobs', '2'])
+
+        assert ret == 4
+        assert [p.read_text() for p in paths] == ['assert a\n'] * 4
+        out = capsys.readouterr().out
+        assert f'Skipping {latin1} because of UnicodeDecodeError' in out
+        assert 'worker process died' not in out
+
+    def test_splits_large_files(self, tmp_path):
+        block = (
+            '\n\n'
+            'class ThingTest(unittest.TestCase):\n'
+            '    def testThing(self):\n'
+            '        self.assertTrue(a)\n'
+        )
+        whole, split = tmp_path / 'whole.py', tmp_path / 'split.py'
+        whole.write_text(block * 20)
+        split.write_text(block * 20)
+        main([str(whole)])
+        ret = main([str(split), '--jobs', '2', '--split-threshold', '100'])
+
+        assert split.read_text() == whole.read_text()
+        assert ret == 1
+
+    def test_skips_split_files_it_cant_fix(
+        self, tmp_path, monkeypatch, capsys,
+    ):
+        block = (
+            '\n\n'
+            'class ThingTest(unittest.TestCase):\n'
+            '    def testThing(self):\n'
+            '        self.assertTrue(a)\n'
+        )
+        stuck = tmp_path / 'stuck.py'
+        stuck.write_text(block * 20 + '# hang\n')
+        latin1 = tmp_path / 'latin1.py'
+        latin1.write_bytes(b'# \xff\n' + block.encode() * 20)
+        fine = tmp_path / 'fine.py'
+        fine.write_text(block * 20)
+        monkeypatch.setattr('pytestify._split.find_tests', _find_tests_or_hang)
+        ret = main([
+            str(tmp_path), '--jobs', '2', '--split-threshold', '100',
+            '--timeout-per-file', '1',
+        ])
+
+        assert ret == 1
+        assert fine.read_text().count('assert a\n') == 20
+        out = capsys.readouterr().out
+        assert f'Skipping {stuck} because it took longer than 1.0 ' in out
+        assert f'Skipping {latin1} because of UnicodeDecodeError' in out
+
+    def test_records_costs(self, tmp_path, capsys):
+        for i in range(5):
+            (tmp_path / f'{i}.py').write_text('self.assertTrue(a)\n' * i)
+        costs = tmp_path / 'costs.json'
+        args = [str(tmp_path), '--jobs', '2', '--costs', str(costs)]
+        main([*args, '--stats'])
+
+        assert len(json.loads(costs.read_text())) == 5
+        assert 'Fixed 5 files in' in capsys.readouterr().out
+        # a second run is scheduled from the recorded costs
+        assert main(args) == 0
+
+    def test_reports_cache_hits(self, tmp_path, capsys):
+        for i in range(5):
+            (tmp_path / f'{i}.py').write_text('self.assertTrue(a)\n' * 2)
+        main([str(tmp_path), '--jobs', '2', '--stats'])
+
+        out = capsys.readouterr().out
+        counts = re.search(r'assert cache: (\d+) hits, (\d+) misses', out)
+        assert counts is not None
+        assert int(counts[1]) + int(counts[2]) == 10
+
+
+def test_class_index(tmp_path):
+    (tmp_path / 'base.py').write_text(
+        'class BaseTestCase(unittest.TestCase):\n'
+        '    pass\n',
+    )
+    test_file = tmp_path / 'test_thing.py'
+    test_file.write_text(
+        'class TestThing(BaseTestCase):\n'
+        '    def testCamelCase(self):\n'
+        '        pass\n',
+    )
+    index = tmp_path / 'index.json'
+    ret = main([str(tmp_path), '--class-index', str(index)])
+
+    assert test_file.read_text() == (
+        'class TestThing(BaseTestCase):\n'
+        '    def test_camel_case(self):\n'
+        '        pass\n'
+    )
+    assert index.exists()
+    assert ret == 2
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import io
+import pstats
+import sys
+
+import pytest
+
+from pytestify._main import main
+from pytestify._profile import sampled
+
+
+def _calls(profile, function):
+    stats = pstats.Stats(str(profile)).stats
+    return sum(
+        calls
+        for (_, _, name), (_, calls, *_) in stats.items()
+        if name == function
+    )
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f'test_{i}.py'
+        path.write_text('self.assertTrue(a)\n')
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_merges_every_worker(files, tmp_path, jobs):
+    profile = tmp_path / 'fix.prof'
+    main([*map(str, files), '--jobs', jobs, '--cprofile-out', str(profile)])
+    assert _calls(profile, 'rewrite_asserts') == 20
+
+
+def test_samples_files(files, tmp_path):
+    profile = tmp_path / 'fix.prof'
+    main([
+        *map(str, files), '--jobs', '2',
+        '--cprofile-out', str(profile), '--cprofile-sample', '0.5',
+    ])
+
+    expected = sum(sampled(str(path), 0.5) for path in files)
+    assert 0 < expected < 20
+    assert _calls(profile, 'rewrite_asserts') == expected
+
+
+def test_profiles_pieces_of_split_files(tmp_path):
+    split = tmp_path / 'test_split.py'
+    split.write_text(
+        ''.join(
+            f'class Test{i}(unittest.TestCase):\n'
+            f'    def test_{i}(self):\n'
+            f'        self.assertTrue(a)\n\n\n'
+            for i in range(40)
+        ),
+    )
+    profile = tmp_path / 'fix.prof'
+    main([
+        str(split), '--jobs', '2', '--split-threshold', '100',
+        '--cprofile-out', str(profile),
+    ])
+
+    assert split.read_text().count('assert a\n') == 40
+    # the file is split in 8 pieces, each rewritten in a worker process
+    assert _calls(profile, 'rewrite_tests') == 8
+
+
+def test_sampled():
+    paths = [f'tests/test_{i}.py' for i in range(1000)]
+    assert all(sampled(path, 1) for path in paths)
+    some = [path for path in paths if sampled(path, 0.1)]
+    assert 50 < len(some) < 150
+    # a larger sample includes the smaller one
+    assert all(sampled(path, 0.2) for path in some)
+
+
+def test_stdin(tmp_path, monkeypatch, capsys):
+    profile = tmp_path / 'fix.prof'
+    stdin = io.TextIOWrapper(io.BytesIO(b'self.assertTrue(a)\n'))
+    monkeypatch.setattr(sys, 'stdin', stdin)
+    main(['-', '--cprofile-out', str(profile)])
+    assert capsys.readouterr().out == 'assert a\n'
+    assert _calls(profile, 'fix_contents') == 1
+
+
+def test_not_with_threads(tmp_path):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), '--threads', '2', '--cprofile-out', 'x.prof'])
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import io
+import time
+
+from pytestify._progress import Progress
+
+
+class Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def test_counts_files_as_discovered():
+    progress = Progress(io.StringIO(), enabled=False)
+    files = progress.discover(['a.py', 'b.py', 'c.py'])
+    next(files)
+    next(files)
+    progress.finish('a.py', size=0)
+
+    assert progress.line().startswith('1/2+ files')
+    assert 'ETA' not in progress.line()
+    list(files)
+    assert progress.line().startswith('1/3 files')
+    assert 'ETA' in progress.line()
+
+
+def test_shows_slowest_file():
+    progress = Progress(io.StringIO(), enabled=False)
+    progress.start('dir/slow.py')
+    progress.in_flight['dir/slow.py'] -= 75
+    progress.start('fast.py')
+    progress.finish('fast.py', size=0)
+
+    assert 'slowest: slow.py (1m15s)' in progress.line()
+
+
+def test_redraws_in_background():
+    out = Terminal()
+    with Progress(out, interval=0.01) as progress:
+        progress.start('a.py')
+        progress.finish('a.py', size=10)
+        time.sleep(0.1)
+
+    assert out.getvalue().count('\r\033[K') >= 2
+    assert '1/0+ files' in out.getvalue()
+    assert out.getvalue().endswith('\r\033[K')
+
+
+def test_prints_lines_outside_a_terminal():
+    out = io.StringIO()
+    with Progress(out, interval=0.01):
+        time.sleep(0.1)
+
+    assert '\r' not in out.getvalue()
+    assert out.getvalue().startswith('0/0+ files')
+
+
+def test_clears_line_before_other_output():
+    out = Terminal()
+    with Progress(out, interval=0.01) as progress:
+        time.sleep(0.05)
+        print('Fixing a.py', file=progress.above(out))
+
+    assert '\r\033[KFixing a.py\n' in out.getvalue()
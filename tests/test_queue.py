@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import pytestify
+from pytestify._main import _fix_file_contents, main
+from pytestify._queue import MAX_ATTEMPTS, Outcome, WorkQueue
+
+ORIGINAL = 'self.assertTrue(a)\n'
+FIXED = 'assert a\n'
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    with WorkQueue(tmp_path / 'queue.db', clock=clock) as queue:
+        queue.add({str(tmp_path / f'{i}.py'): i for i in range(5)})
+        yield queue
+
+
+def test_claims_costliest_first(queue, tmp_path):
+    tasks = queue.claim('a', 2, lease=10)
+    assert [t.path for t in tasks] == [
+        str(tmp_path / '4.py'), str(tmp_path / '3.py'),
+    ]
+    assert [t.path for t in queue.claim('b', 10, lease=10)] == [
+        str(tmp_path / f'{i}.py') for i in (2, 1, 0)
+    ]
+    assert queue.claim('c', 10, lease=10) == []
+    assert queue.counts() == {'pending': 0, 'leased': 5, 'done': 0}
+
+
+def test_expired_leases_are_requeued(queue, clock):
+    tasks = queue.claim('a', 2, lease=10)
+    queue.claim('b', 3, lease=30)
+    clock.now += 20
+
+    # only a's lease is up, and its files come back one at a time
+    assert queue.claim('c', 10, lease=10) == tasks[:1]
+    assert queue.claim('c', 10, lease=10) == tasks[1:]
+    # a finished late, after c took over
+    assert queue.complete('a', [Outcome(t.id, True) for t in tasks]) == 0
+    assert queue.complete('c', [Outcome(t.id, True) for t in tasks]) == 2
+    assert [r.owner for _, r in queue.finished()] == ['c', 'c']
+
+
+def test_renewed_leases_are_kept(queue, clock):
+    tasks = queue.claim('a', 5, lease=10)
+    clock.now += 8
+    queue.renew('a', tasks[2:], lease=10)
+    clock.now += 8
+
+    assert queue.claim('b', 5, lease=10) == tasks[:1]
+    assert queue.claim('b', 5, lease=10) == tasks[1:2]
+    # the renewed ones, 10s after they were renewed
+    assert queue.next_expiry() == clock.now + 2
+
+
+def test_keeps_leases_while_working(queue, clock):
+    tasks = queue.claim('a', 5, lease=10)
+    clock.now += 20
+    with queue.keep_leased('a', tasks, lease=0.03):
+        # renewed from the thread, by the time the block takes
+        for _ in range(1000):
+            if queue.next_expiry() == clock.now + 0.03:
+                break
+            time.sleep(0.01)
+        assert queue.claim('b', 5, lease=10) == []
+    assert queue.next_expiry() == clock.now + 0.03
+
+
+def test_gives_up_on_files_that_stop_workers(queue, clock):
+    for _ in range(MAX_ATTEMPTS):
+        tasks = queue.claim('a', 1, lease=10)
+        assert len(tasks) == 1
+        clock.now += 20
+    queue.claim('b', 0, lease=10)
+
+    (_, result), = queue.finished()
+    assert result.path == tasks[0].path
+    assert result.skipped.startswith('because its workers stopped')
+
+
+def test_only_blames_the_file_that_stops_workers(queue, clock):
+    killer = queue.claim('a', 3, lease=10)[0]
+    for _ in range(10):
+        clock.now += 20
+        tasks = queue.claim('b', 3, lease=10)
+        if not tasks:
+            break
+        # the files from the expired batch are retried one at a time
+        assert len(tasks) == 1 or killer not in tasks
+        outcomes = [Outcome(t.id, True) for t in tasks if t != killer]
+        queue.complete('b', outcomes)
+
+    results = {r.path: r for _, r in queue.finished()}
+    assert len(results) == 5
+    assert results.pop(killer.path).skipped.startswith(
+        'because its workers stopped',
+    )
+    assert all(r.changed for r in results.values())
+
+
+def test_requeueing_starts_over(queue, tmp_path):
+    tasks = queue.claim('a', 5, lease=10)
+    queue.complete('a', [Outcome(t.id, False) for t in tasks])
+    queue.add({str(tmp_path / '0.py'): 0}, {'with_count_equal': True})
+
+    assert queue.counts() == {'pending': 1, 'leased': 0, 'done': 4}
+    assert queue.settings == {'with_count_equal': True}
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(30):
+        path = tmp_path / 'tests' / f'test_{i}.py'
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(ORIGINAL)
+        paths.append(path)
+    (tmp_path / 'tests' / 'test_broken.py').write_text('x = (\n')
+    return paths
+
+
+def test_workers_share_the_queue(files, tmp_path, capsys):
+    db = str(tmp_path / 'queue.db')
+    assert main(['queue', db, str(tmp_path / 'tests')]) == 0
+    root = Path(pytestify.__file__).parent.parent
+    env = {**os.environ, 'PYTHONPATH': str(root)}
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable, '-m', 'pytestify', 'worker', db,
+                '--batch-size', '2', '--name', f'worker-{i}',
+            ],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for i in range(3)
+    ]
+    outputs = [worker.communicate()[0] for worker in workers]
+
+    assert [worker.returncode for worker in workers] == [
+        output.count('Fixing') for output in outputs
+    ]
+    assert sum(w.returncode for w in workers) == 30
+    assert [p.read_text() for p in files] == [FIXED] * 30
+
+    capsys.readouterr()
+    assert main(['queue', db, '--wait']) == 30
+    out = capsys.readouterr().out
+    assert f'Fixing {files[0]}' in out
+    assert 'test_broken.py due to the source file having invalid syntax' in out
+    # how many workers got a batch depends on how soon each one started
+    assert re.search(r'31 files done by [1-3] worker\(s\): 30 fixed\n$', out)
+
+
+def test_worker_takes_over_expired_leases(files, tmp_path, capsys):
+    db = tmp_path / 'queue.db'
+    main(['queue', str(db), str(tmp_path / 'tests'), '--with-count-equal'])
+    with WorkQueue(db) as queue:
+        # a worker that died after claiming a batch
+        queue.claim('dead', 10, lease=0.2)
+
+    ret = main(['worker', str(db), '--name', 'alive', '--poll', '0.05'])
+
+    assert ret == 30
+    assert [p.read_text() for p in files] == [FIXED] * 30
+    with WorkQueue(db) as queue:
+        assert {r.owner for _, r in queue.finished()} == {'alive'}
+        assert queue.settings['with_count_equal'] is True
+
+
+def _slow_fix(path, args, executor):
+    name = os.path.basename(path)
+    if name == 'test_slow.py':
+        time.sleep(1)
+        # another worker, looking for files whose lease is up
+        with WorkQueue(Path(path).parent.parent / 'queue.db') as queue:
+            assert queue.claim('thief', 40, lease=10) == []
+    elif name == 'test_stuck.py':
+        time.sleep(60)
+    return _fix_file_contents(path, args, executor)
+
+
+def test_worker_holds_slow_files(files, tmp_path, monkeypatch):
+    slow = tmp_path / 'tests' / 'test_slow.py'
+    slow.write_text(ORIGINAL)
+    db = tmp_path / 'queue.db'
+    main(['queue', str(db), str(tmp_path / 'tests')])
+    monkeypatch.setattr('pytestify._main._fix_file_contents', _slow_fix)
+
+    # each file takes longer than the lease
+    ret = main(['worker', str(db), '--batch-size', '40', '--lease', '0.3'])
+
+    assert ret == 31
+    with WorkQueue(db) as queue:
+        assert {r.skipped for _, r in queue.finished()} == {
+            None, 'due to the source file having invalid syntax',
+        }
+
+
+def test_worker_timeout(files, tmp_path, monkeypatch, capsys):
+    stuck = tmp_path / 'tests' / 'test_stuck.py'
+    stuck.write_text(ORIGINAL)
+    db = tmp_path / 'queue.db'
+    main(['queue', str(db), str(tmp_path / 'tests')])
+    monkeypatch.setattr('pytestify._main._fix_file_contents', _slow_fix)
+
+    ret = main([
+        'worker', str(db), '--batch-size', '40', '--timeout-per-file', '1',
+    ])
+
+    assert ret == 30
+    assert [p.read_text() for p in files] == [FIXED] * 30
+    with WorkQueue(db) as queue:
+        skipped = {r.path: r.skipped for _, r in queue.finished()}
+    assert skipped[str(stuck)] == 'because it took longer than 1.0 seconds'
+
+
+def test_worker_skips_files_it_cant_fix(files, tmp_path, capsys):
+    latin1 = tmp_path / 'tests' / 'test_latin1.py'
+    latin1.write_bytes(b'# \xff\n' + ORIGINAL.encode())
+    db = tmp_path / 'queue.db'
+    main(['queue', str(db), str(tmp_path / 'tests')])
+
+    assert main(['worker', str(db), '--batch-size', '4']) == 30
+    assert [p.read_text() for p in files] == [FIXED] * 30
+    with WorkQueue(db) as queue:
+        skipped = {r.path: r.skipped for _, r in queue.finished() if r.skipped}
+    assert skipped[str(latin1)].startswith('because of UnicodeDecodeError')
+
+
+def test_wait_gives_up_without_workers(tmp_path, capsys):
+    path = tmp_path / 'test_thing.py'
+    path.write_text(ORIGINAL)
+    db = tmp_path / 'queue.db'
+    main(['queue', str(db), str(path)])
+    with WorkQueue(db) as queue:
+        # workers that died on it, and left no one to notice
+        for _ in range(MAX_ATTEMPTS):
+            assert queue.claim('dead', 1, lease=-1)
+    capsys.readouterr()
+
+    assert main(['queue', str(db), '--wait', '--poll', '0.01']) == 0
+    out = capsys.readouterr().out
+    assert f'Skipping {path} because its workers stopped 3 times' in out
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pytestify._schedule import (
+    estimate_costs, load_costs, save_costs, schedule, utilization,
+)
+
+
+def test_schedules_largest_first():
+    costs = {'a.py': 1.0, 'b.py': 50.0, 'c.py': 20.0}
+    batches = schedule(costs, workers=1)
+
+    assert [path for batch in batches for path in batch] == [
+        'b.py', 'c.py', 'a.py',
+    ]
+
+
+def test_batches_small_files():
+    costs = {'big.py': 100.0, **{f'{i}.py': 0.01 for i in range(100)}}
+    batches = schedule(costs, workers=2)
+
+    assert batches[0] == ['big.py']
+    assert 1 < len(batches) < 20
+    assert sum(len(batch) for batch in batches) == 101
+
+
+def test_schedules_nothing():
+    assert schedule({}, workers=4) == []
+
+
+def test_estimates_from_sizes(tmp_path):
+    small, large = tmp_path / 'small.py', tmp_path / 'large.py'
+    small.write_text('a' * 10)
+    large.write_text('a' * 1000)
+    costs = estimate_costs([str(small), str(large)], {})
+
+    assert costs == {str(small): 10, str(large): 1000}
+
+
+def test_estimates_from_recorded_costs(tmp_path):
+    old, new = tmp_path / 'old.py', tmp_path / 'new.py'
+    old.write_text('a' * 100)
+    new.write_text('a' * 300)
+    recorded = {os.path.abspath(old): 2.0}
+    costs = estimate_costs([str(old), str(new)], recorded)
+
+    assert costs == {str(old): 2.0, str(new): pytest.approx(6.0)}
+
+
+def test_saves_costs(tmp_path):
+    path = tmp_path / 'costs.json'
+    assert load_costs(path) == {}
+    save_costs(path, {'a.py': 1.5})
+
+    assert load_costs(path) == {'a.py': 1.5}
+
+
+@pytest.mark.parametrize(
+    ('makespan', 'total', 'expected'), [
+        (10.0, 40.0, 1.0),
+        (10.0, 20.0, 0.5),
+        (0.0, 0.0, 1.0),
+    ],
+)
+def test_utilization(makespan, total, expected):
+    assert utilization(makespan, total, workers=4) == expected
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from pytestify._split import (
+    SENTINEL, block_starts, fix_contents_in_chunks, split_chunks,
+)
+from pytestify._transform import fix_contents
+
+MODULE = '''\
+from __future__ import annotations
+
+import unittest
+x = 1
+
+
+class ThingTest(unittest.TestCase):
+    def setUp(self):
+        self.assertEqual(
+            a,
+            b,
+            msg='oh no',
+        )
+
+    @unittest.skip('reason')
+    def testCamelCase(self):
+        self.assertAlmostEqual(a, b, places=2)
+        with self.assertRaises(OSError):
+            pass
+# a comment that sticks to the class above
+@unittest.expectedFailure
+class OtherTests(TestCase):
+    def test_thing(self):
+        self.assertIsNone(
+            a
+        )
+
+
+
+@unittest.skipIf(True, 'x')
+def helper():
+    self.fail('no')
+a = 1; b = 2
+
+def last():
+    self.assertTrue(a)
+
+
+'''
+
+
+@pytest.mark.parametrize(
+    'contents', [
+        MODULE,
+        MODULE.replace('\n', '\r\n'),
+        MODULE.replace('x = 1', 'x = 1\x0c'),
+        MODULE.replace('unittest.TestCase', 'object').replace('Tests', ''),
+        MODULE.rstrip('\n'),
+    ],
+)
+@pytest.mark.parametrize('chunks', [1, 2, 3, 5, 100])
+def test_chunks_match_whole_file(contents, chunks):
+    with ThreadPoolExecutor(2) as executor:
+        chunked = fix_contents_in_chunks(contents, executor, chunks=chunks)
+
+    assert chunked == fix_contents(contents)
+
+
+def test_chunks_in_processes():
+    with ProcessPoolExecutor(2) as executor:
+        chunked = fix_contents_in_chunks(MODULE * 10, executor, chunks=8)
+
+    assert chunked == fix_contents(MODULE * 10)
+
+
+def test_only_splits_at_blank_lines():
+    lines = MODULE.splitlines()
+    starts = block_starts(MODULE)
+
+    assert starts == [1, 4, 26, 33]
+    assert all(not lines[start].strip() for start in starts)
+
+
+def test_split_chunks():
+    chunks = split_chunks(MODULE, 100)
+
+    assert len(chunks) == 5
+    assert all(chunk.endswith('\n' + SENTINEL) for chunk in chunks[:-1])
+    assert ''.join(c.replace(SENTINEL, '') for c in chunks) == MODULE
+
+
+def test_doesnt_split_on_unusual_line_breaks():
+    contents = MODULE.replace('x = 1', 'x = 1\x0c')
+    assert split_chunks(contents, 100) == [contents]
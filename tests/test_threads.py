@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pytestify._main import main
+from pytestify._transform import fix_contents
+
+TEMPLATE = '''\
+import unittest
+
+
+class Thing{n}Test(unittest.TestCase):
+    def setUp(self):
+        self.thing = {n}
+
+    @unittest.skipIf(sys.platform == 'win32', 'no')
+    def testThing{n}(self):
+        self.assertEqual(self.thing, {n})
+        self.assertAlmostEqual(a, b, places={n})
+        self.assertIsNone(
+            {n},
+            msg='oh no',
+        )
+        self.assertCountEqual(a, [{n}])
+        with self.assertRaises(ValueError):
+            int('{n}')
+'''
+CORPUS = [TEMPLATE.format(n=n) for n in range(40)] + ['def (:', 'x = 1']
+
+
+def _fix(contents):
+    try:
+        return fix_contents(contents, with_count_equal=True)
+    except SyntaxError:
+        return SyntaxError
+
+
+def test_threads_match_serial():
+    serial = [_fix(contents) for contents in CORPUS]
+    start = threading.Barrier(16)
+
+    def fix_all(i):
+        start.wait()
+        # each thread walks the corpus in a different order
+        order = CORPUS[i:] + CORPUS[:i]
+        return [_fix(contents) for contents in order], i
+
+    with ThreadPoolExecutor(16) as executor:
+        for results, i in executor.map(fix_all, range(16)):
+            assert results == serial[i:] + serial[:i]
+
+
+def test_threads_cli(tmp_path):
+    paths = [tmp_path / f'test_{n}.py' for n in range(len(CORPUS))]
+    for path, contents in zip(paths, CORPUS):
+        path.write_text(contents)
+
+    ret = main([str(tmp_path), '--threads', '8', '--with-count-equal'])
+
+    assert ret == 40
+    for path, contents in zip(paths[:40], CORPUS):
+        assert path.read_text() == _fix(contents)
+
+
+def test_threads_report_errors(tmp_path, capsys):
+    paths = [tmp_path / f'{i}.py' for i in range(4)]
+    for path in paths:
+        path.write_text('self.assertTrue(a)\n')
+    latin1 = tmp_path / 'latin1.py'
+    latin1.write_bytes(b'# \xff\nself.assertTrue(a)\n')
+    ret = main([str(tmp_path), '--threads', '2'])
+
+    assert ret == 4
+    assert [p.read_text() for p in paths] == ['assert a\n'] * 4
+    out = capsys.readouterr().out
+    assert f'Skipping {latin1} because of UnicodeDecodeError' in out
+
+
+def test_threads_and_jobs_cant_be_combined(capsys):
+    with pytest.raises(SystemExit):
+        main(['--threads', '2', '--jobs', '2'])
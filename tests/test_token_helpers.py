@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from tokenize import TokenError
+
+import pytest
+from tokenize_rt import src_to_tokens
+
+from pytestify._token_helpers import Tokens
+
+
+@pytest.mark.parametrize(
+    'src', [
+        '',
+        'x = 1\n',
+        'x = 1',
+        'if x:\n    y = 1\n    ',
+        'x = 1\r\ny = 2\r\n',
+        'if x:\n    y = 1\n\n# comment\nz = 2\n',
+        'x = (\n    1,  # one\n    2,\n)\n',
+        "x = 'ü' + \"ñ\"  # ☃\ny = 1\n",
+        'x = 1 + \\\n    2\n',
+        'x = [  \\\n  \\\n 1]\n',
+        "x = '''\nmulti\nline''' + f'{y!r:>{z}}'\n",
+        "x = f'{{literal}} {y}'\n",
+        '\x0c\nclass A:\n\tdef f(self): pass\n',
+        'self.assertEqual(a, b)\n',
+    ],
+)
+def test_same_as_tokenize_rt(src):
+    assert list(Tokens(src)) == src_to_tokens(src)
+
+
+def test_accessors():
+    tokens = Tokens("x = 'ü'\n\nself.assertTrue(x)\n")
+    expected = src_to_tokens("x = 'ü'\n\nself.assertTrue(x)\n")
+
+    assert len(tokens) == len(expected)
+    assert tokens[-1] == expected[-1]
+    assert tokens[2:5] == expected[2:5]
+    for i, tok in enumerate(expected):
+        assert tokens.name_at(i) == tok.name
+        assert tokens.src_at(i) == tok.src
+        assert tokens.line_at(i) == tok.line
+    first = tokens.first_on_line(3)
+    assert tokens[first] == expected[first]
+    assert tokens.src_at(first) == 'self'
+    assert expected[first - 1].line == 2
+
+
+def test_compact():
+    src = 'self.assertEqual(a, [1, 2, 3])  # a comment\n' * 1000
+    tokens = Tokens(src)
+    # a `Token` and its string are over 100 bytes
+    assert tokens.nbytes < len(tokens) * 10
+
+
+def test_tokenize_errors():
+    with pytest.raises(TokenError):
+        Tokens('x = (\n')
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pytest
+
+from pytestify._main import main
+from pytestify._verify import MARKER, describe, verify
+
+MODULE = '''\
+import unittest
+
+from .helpers import VALUE
+
+
+class ThingTest(unittest.TestCase):
+    def testValue(self):
+        self.assertEqual(VALUE, 3)
+
+    @unittest.skip('reason')
+    def test_skip(self):
+        pass
+
+    @unittest.expectedFailure
+    def test_xfail(self):
+        self.assertEqual(1, 2)
+
+    def test_fail(self):
+        self.assertTrue(False)
+'''
+
+
+@pytest.fixture
+def package(tmp_path):
+    pkg = tmp_path / 'pkg'
+    pkg.mkdir()
+    (pkg / '__init__.py').write_text('')
+    (pkg / 'helpers.py').write_text('VALUE = 3\n')
+    (pkg / 'test_thing.py').write_text(MODULE)
+    return pkg
+
+
+def test_same_outcomes(package, capsys):
+    ret = main(['verify', str(package)])
+
+    assert ret == 0
+    assert 'Verified 1 modules (0 cached)' in capsys.readouterr().out
+    assert sorted(p.name for p in package.iterdir()) == [
+        '__init__.py', 'helpers.py', 'test_thing.py',
+    ]
+
+
+def test_different_outcomes(package):
+    def convert(contents):
+        return contents.replace('VALUE, 3', 'VALUE, 4')
+
+    [result] = verify([str(package / 'test_thing.py')], convert)
+
+    assert result.differs
+    assert describe(result.unittest) == (
+        '1 passed, 1 failed, 1 skipped, 1 xfailed'
+    )
+    assert describe(result.pytest) == '2 failed, 1 skipped, 1 xfailed'
+
+
+def test_swapped_outcomes(package):
+    def convert(contents):
+        return contents.replace('VALUE, 3', 'VALUE, 4').replace(
+            'assertTrue(False)', 'assertTrue(True)',
+        )
+
+    [result] = verify([str(package / 'test_thing.py')], convert)
+
+    # as many pass and fail, but not the same tests
+    assert describe(result.unittest) == describe(result.pytest)
+    assert result.differs
+    assert result.changes() == [
+        ('TestThing.test_fail', 'failed', 'passed'),
+        ('TestThing.test_value', 'passed', 'failed'),
+    ]
+
+
+def test_keeps_files_in_the_way(package, capsys):
+    mine = package / 'test_thing__pytestify_verify.py'
+    mine.write_text('# mine\n')
+
+    assert main(['verify', str(package)]) == 1
+    assert 'is in the way of its converted copy' in capsys.readouterr().out
+    assert mine.read_text() == '# mine\n'
+
+
+def test_replaces_copies_left_behind(package, capsys):
+    left = package / 'test_thing__pytestify_verify.py'
+    left.write_text(MARKER + 'oh no\n')
+
+    assert main(['verify', str(package)]) == 0
+    assert not left.exists()
+
+
+def test_caches_results(package, tmp_path, capsys):
+    cache = tmp_path / 'cache.json'
+    main(['verify', str(package), '--cache', str(cache)])
+    main(['verify', str(package), '--cache', str(cache)])
+
+    assert 'Verified 1 modules (1 cached)' in capsys.readouterr().out
+
+
+def test_describe():
+    assert describe({}) == 'no tests'
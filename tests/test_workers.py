@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import time
+
+from pytestify._workers import TaskError, WorkerError, WorkerPool
+
+
+def _double(item, args):
+    if item == 'crash':
+        os._exit(1)
+    if item == 'hang':
+        time.sleep(60)
+    return item * args
+
+
+def test_runs_every_item():
+    with WorkerPool(_double, 2, jobs=2) as pool:
+        results = dict(pool.imap_unordered(range(10)))
+
+    assert results == {i: i * 2 for i in range(10)}
+
+
+def test_replaces_stuck_worker():
+    start = time.monotonic()
+    with WorkerPool(_double, 2, jobs=1, timeout=0.5) as pool:
+        results = dict(pool.imap_unordered([1, 'hang', 3]))
+
+    assert time.monotonic() - start < 30
+    assert isinstance(results.pop('hang'), WorkerError)
+    assert results == {1: 2, 3: 6}
+
+
+def test_replaces_crashed_worker():
+    with WorkerPool(_double, 2, jobs=2) as pool:
+        results = dict(pool.imap_unordered([1, 'crash', 3]))
+
+    assert str(results.pop('crash')) == 'because its worker process died'
+    assert results == {1: 2, 3: 6}
+
+
+def test_runs_batches():
+    with WorkerPool(_double, 2, jobs=2) as pool:
+        results = dict(pool.imap_batches([[1, 2, 3], [4], [5, 6]]))
+
+    assert results == {i: i * 2 for i in range(1, 7)}
+
+
+def test_retries_rest_of_batch():
+    with WorkerPool(_double, 2, jobs=1, timeout=0.5) as pool:
+        results = dict(pool.imap_batches([[1, 'hang', 3, 4], ['crash', 5]]))
+
+    assert isinstance(results.pop('hang'), WorkerError)
+    assert isinstance(results.pop('crash'), WorkerError)
+    assert results == {1: 2, 3: 6, 4: 8, 5: 10}
+
+
+def _fail(item, args):
+    if item == 'error':
+        raise ValueError('oh no')
+    return os.getpid()
+
+
+def test_reports_exceptions_and_keeps_worker():
+    with WorkerPool(_fail, None, jobs=1) as pool:
+        results = list(pool.imap_batches([[1, 'error', 3], [4]]))
+
+    (_, error), = ((i, r) for i, r in results if i == 'error')
+    assert isinstance(error, TaskError)
+    assert str(error) == 'because of ValueError: oh no'
+    assert 'raise ValueError' in error.traceback
+    # the same worker fixed everything else
+    assert len({r for i, r in results if i != 'error'}) == 1
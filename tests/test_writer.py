@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+import stat
+
+import pytest
+
+from pytestify._main import main
+from pytestify._writer import FileWriter, Journal, rollback
+
+ORIGINAL = 'self.assertTrue(a)\n'
+FIXED = 'assert a\n'
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'test_{i}.py'
+        path.write_text(ORIGINAL)
+        paths.append(path)
+    return paths
+
+
+def _leftovers(directory):
+    return [p.name for p in directory.iterdir() if 'pytestify-tmp' in p.name]
+
+
+def test_writes_in_batches(files):
+    with FileWriter(batch_size=2) as writer:
+        for path in files:
+            assert writer.write(str(path), FIXED)
+        # the third is staged until the writer closes
+        contents = [p.read_text() for p in files]
+        assert contents == [FIXED, FIXED, ORIGINAL]
+    assert [p.read_text() for p in files] == [FIXED] * 3
+    assert _leftovers(files[0].parent) == []
+
+
+def test_skips_identical_bytes(files):
+    path = files[0]
+    inode = path.stat().st_ino
+    with FileWriter() as writer:
+        assert not writer.write(str(path), ORIGINAL)
+    assert path.stat().st_ino == inode
+
+
+def test_keeps_mode_and_symlinks(files, tmp_path):
+    path = files[0]
+    path.chmod(0o755)
+    link = tmp_path / 'link.py'
+    link.symlink_to(path)
+    with FileWriter() as writer:
+        writer.write(str(link), FIXED)
+
+    assert link.is_symlink()
+    assert path.read_text() == FIXED
+    assert stat.S_IMODE(path.stat().st_mode) == 0o755
+
+
+def test_same_file_twice(files):
+    with FileWriter() as writer:
+        writer.write(str(files[0]), FIXED)
+        writer.write(str(files[0]), 'assert b\n')
+    assert files[0].read_text() == 'assert b\n'
+
+
+def test_drops_the_batch_on_errors(files):
+    with pytest.raises(KeyboardInterrupt):
+        with FileWriter(batch_size=2) as writer:
+            for path in files:
+                writer.write(str(path), FIXED)
+            raise KeyboardInterrupt
+    assert [p.read_text() for p in files] == [FIXED, FIXED, ORIGINAL]
+    assert _leftovers(files[0].parent) == []
+
+
+@pytest.mark.parametrize('journal', [False, True])
+def test_only_syncs_with_a_journal(files, tmp_path, monkeypatch, journal):
+    synced = []
+    monkeypatch.setattr(os, 'fsync', synced.append)
+    monkeypatch.setattr(os, 'sync', lambda: synced.append('everything'))
+    with FileWriter(journal=tmp_path / 'journal' if journal else None) as w:
+        for path in files:
+            w.write(str(path), FIXED)
+
+    assert [p.read_text() for p in files] == [FIXED] * 3
+    assert 'everything' not in synced
+    assert bool(synced) == journal
+
+
+def test_rolls_back_an_interrupted_run(files, tmp_path):
+    journal = tmp_path / 'journal'
+    with pytest.raises(KeyboardInterrupt):
+        with FileWriter(journal=journal, batch_size=1) as writer:
+            writer.write(str(files[0]), FIXED)
+            raise KeyboardInterrupt
+    assert not Journal(journal).finished()
+
+    # the next run continues the same journal
+    with FileWriter(journal=journal) as writer:
+        for path in files:
+            writer.write(str(path), 'assert b\n')
+    assert Journal(journal).finished()
+    assert len(Journal(journal).entries()) == 4
+
+    restored = list(rollback(journal))
+    assert all(r.restored for r in restored)
+    assert [p.read_text() for p in files] == [ORIGINAL] * 3
+    assert not journal.exists()
+
+
+def test_a_finished_journal_is_replaced(files, tmp_path):
+    journal = tmp_path / 'journal'
+    with FileWriter(journal=journal) as writer:
+        writer.write(str(files[0]), FIXED)
+    with FileWriter(journal=journal) as writer:
+        writer.write(str(files[1]), FIXED)
+
+    list(rollback(journal))
+    assert [p.read_text() for p in files] == [FIXED, ORIGINAL, ORIGINAL]
+
+
+def test_main_rollback(files, tmp_path, capsys):
+    journal = tmp_path / 'journal'
+    assert main([str(tmp_path), '--journal', str(journal)]) == 3
+    assert [p.read_text() for p in files] == [FIXED] * 3
+    files[1].write_text('# edited since\n')
+    capsys.readouterr()
+
+    assert main(['--rollback', str(journal)]) == 1
+
+    out = capsys.readouterr().out
+    assert f'Restoring {os.path.realpath(files[0])}' in out
+    assert 'since it changed after pytestify rewrote it' in out
+    contents = [p.read_text() for p in files]
+    assert contents == [ORIGINAL, '# edited since\n', ORIGINAL]
+    # kept, since not everything was restored
+    assert journal.exists()
+
+
+def test_main_rollback_without_journal(tmp_path, capsys):
+    assert main(['--rollback', str(tmp_path / 'journal')]) == 1
+    assert 'There is no journal' in capsys.readouterr().err